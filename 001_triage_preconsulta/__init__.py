@@ -0,0 +1,87 @@
+import importlib
+
+# Las páginas hacen ``core = importlib.import_module("001_triage_preconsulta")`` y
+# acceden a ``core.<nombre>``; cada submódulo se importa recién cuando se usa.
+_EXPORTS = {
+    "MODELO": "recursos",
+    "cliente_openai": "recursos",
+    "obtener_cache_llm": "recursos",
+    "obtener_metricas": "recursos",
+    "obtener_gateway": "recursos",
+    "obtener_cliente_llm": "recursos",
+    "obtener_historial": "recursos",
+    "obtener_cola_correo": "recursos",
+    "obtener_indice_pdf": "recursos",
+    "obtener_progreso_lotes": "recursos",
+    "obtener_almacen_sesiones": "recursos",
+    "cerrar_recursos": "recursos",
+    "limpiar_emojis": "pdf",
+    "generar_pdf": "pdf",
+    "pdf_paciente": "pdf",
+    "descargar_pdf_button": "ui",
+    "enviar_por_correo": "ui",
+    "recordar_resultado": "ui",
+    "acciones_resultado": "ui",
+    "nombre_archivo_sesion": "ui",
+    "id_sesion": "ui",
+    "texto_documento": "ui",
+    "guardar_documento": "ui",
+    "enlace_whatsapp": "ui",
+    "completar": "ui",
+    "completar_lote": "ui",
+    "leer_pdf": "ui",
+    "extraer_texto": "extraccion_pdf",
+    "extraer_paginas": "extraccion_pdf",
+    "hash_contenido": "extraccion_pdf",
+    "extraer_paginas_progresivo": "extraccion_pdf",
+    "ocr_disponible": "extraccion_pdf",
+    "leer_pacientes": "lote_triaje",
+    "id_lote": "lote_triaje",
+    "procesar_lote": "lote_triaje",
+    "zip_pdfs": "lote_triaje",
+    "prompt_triaje": "prompts",
+    "prompt_diagnostico": "prompts",
+    "prompt_ordenes": "prompts",
+    "prompt_examenes": "prompts",
+    "prompt_chat_pdf": "prompts",
+    "prompt_reconfirmacion": "prompts",
+    "mensaje_reconfirmacion_local": "prompts",
+    "parsear_triaje": "estructurado",
+    "parsear_diagnostico": "estructurado",
+    "formatear_triaje": "estructurado",
+    "formatear_diagnostico": "estructurado",
+    "triaje_estructurado": "estructurado",
+    "diagnostico_estructurado": "estructurado",
+    "indice_cie10": "cie10",
+    "buscar_cie10": "cie10",
+    "validar_codigos": "cie10",
+    "renderizar_plan": "ordenes",
+    "extraer_valores": "laboratorio",
+    "nombre_analito": "laboratorio",
+    "rango_referencia": "laboratorio",
+    "cargar_reglas": "tamizaje",
+    "AgendaTamizaje": "tamizaje",
+    "pdf_ficha": "dossier",
+    "generar_dossier": "dossier",
+    "nombre_dossier": "dossier",
+    "zip_dossiers_dia": "dossier",
+    "contar_tokens": "presupuesto",
+    "presupuesto_tokens": "presupuesto",
+    "preparar_entrada": "presupuesto",
+    "resumir_documento": "presupuesto",
+    "Asistente": "servicio",
+    "crear_app": "api",
+}
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTS.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_EXPORTS))
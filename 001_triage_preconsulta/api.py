@@ -0,0 +1,212 @@
+"""API ASGI mínima sobre ``Asistente``, sin dependencias además de un servidor ASGI (p. ej. uvicorn).
+
+    POST /triaje            {"texto", "paciente"?}                 -> JSON
+    POST /diagnostico       {"resumen", "paciente"?}               -> JSON
+    POST /ordenes           {"plan", "paciente"?}                  -> JSON
+    POST /examenes          {"texto"?, "pdfs"? (base64), "paciente"?} -> JSON
+    POST /<tarea>/stream    igual que la tarea                     -> text/event-stream con los fragmentos
+    POST /<tarea>/lote      {"entradas": [...], "concurrencia"?}   -> NDJSON, una línea por entrada al terminar
+    POST /pdf               {"texto", "paciente"?}                 -> application/pdf
+    GET  /salud
+
+Uso: uvicorn 001_triage_preconsulta.api:app  (configuración por variables de entorno, ver ``Asistente.desde_entorno``)
+"""
+import asyncio
+import base64
+import binascii
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .pdf import pdf_paciente
+from .servicio import TAREAS, Asistente
+
+MAX_CUERPO = 50 * 2 ** 20
+MAX_LOTE = 1000
+ARGUMENTOS = {
+    "triaje": ("texto",),
+    "diagnostico": ("resumen",),
+    "ordenes": ("plan",),
+    "examenes": (),
+}
+
+_FIN = object()
+
+
+class ErrorAPI(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _json(datos):
+    return json.dumps(datos, ensure_ascii=False).encode("utf-8")
+
+
+def _paciente(cuerpo):
+    paciente = cuerpo.get("paciente")
+    if paciente is not None and not isinstance(paciente, dict):
+        raise ErrorAPI(400, "'paciente' debe ser un objeto con nombre y rut")
+    return paciente
+
+
+def _entrada(tarea, cuerpo):
+    if not isinstance(cuerpo, dict):
+        raise ErrorAPI(400, "Cada entrada debe ser un objeto JSON")
+    faltantes = [a for a in ARGUMENTOS[tarea] if not isinstance(cuerpo.get(a), str)]
+    if faltantes:
+        raise ErrorAPI(400, f"Faltan campos de texto: {', '.join(faltantes)}")
+    entrada = {a: cuerpo[a] for a in ARGUMENTOS[tarea]}
+    if cuerpo.get("paciente"):
+        entrada["paciente"] = _paciente(cuerpo)
+    if tarea == "examenes":
+        entrada["texto"] = cuerpo.get("texto") or ""
+        try:
+            entrada["pdfs"] = [base64.b64decode(p, validate=True) for p in cuerpo.get("pdfs") or []]
+        except (binascii.Error, TypeError):
+            raise ErrorAPI(400, "Los PDF deben ir codificados en base64")
+    return entrada
+
+
+def _error(e):
+    # ValueError/KeyError vienen de entradas inválidas; el resto, del modelo o del servidor
+    if isinstance(e, ErrorAPI):
+        return e.estado, str(e)
+    if isinstance(e, (ValueError, KeyError)):
+        return 400, str(e)
+    return 502, f"{type(e).__name__}: {e}"
+
+
+def crear_app(asistente=None, hilos=64):
+    """Devuelve la aplicación ASGI. Sin ``asistente``, se crea desde el entorno en la primera solicitud."""
+    estado = {"asistente": asistente}
+    lock = threading.Lock()
+    # Las tareas bloquean (modelo, PyMuPDF); se ejecutan en un pool propio y no en el de asyncio, que es pequeño
+    pool = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="api")
+
+    def obtener_asistente():
+        with lock:
+            if estado["asistente"] is None:
+                estado["asistente"] = Asistente.desde_entorno()
+            return estado["asistente"]
+
+    async def en_hilo(funcion, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, funcion, *args)
+
+    async def iterar(fabrica):
+        # Recorre un generador bloqueante sin frenar el event loop
+        iterador = await en_hilo(lambda: iter(fabrica()))
+        while True:
+            item = await en_hilo(next, iterador, _FIN)
+            if item is _FIN:
+                return
+            yield item
+
+    async def leer_cuerpo(receive):
+        partes, total = [], 0
+        while True:
+            mensaje = await receive()
+            partes.append(mensaje.get("body", b""))
+            total += len(partes[-1])
+            if total > MAX_CUERPO:
+                raise ErrorAPI(413, "Solicitud demasiado grande")
+            if not mensaje.get("more_body"):
+                break
+        try:
+            cuerpo = json.loads(b"".join(partes) or b"{}")
+        except ValueError:
+            raise ErrorAPI(400, "JSON inválido")
+        if not isinstance(cuerpo, dict):
+            raise ErrorAPI(400, "Se esperaba un objeto JSON")
+        return cuerpo
+
+    async def responder(send, codigo, cuerpo, tipo="application/json"):
+        await send({"type": "http.response.start", "status": codigo,
+                    "headers": [(b"content-type", tipo.encode()), (b"content-length", str(len(cuerpo)).encode())]})
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def responder_por_partes(send, tipo, partes):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", tipo.encode()), (b"cache-control", b"no-cache")]})
+        async for parte in partes:
+            await send({"type": "http.response.body", "body": parte, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def eventos(asistente, tarea, entrada):
+        try:
+            async for fragmento in iterar(lambda: asistente.stream(tarea, **entrada)):
+                yield b"data: " + _json(fragmento) + b"\n\n"
+            yield b"event: fin\ndata: {}\n\n"
+        except Exception as e:
+            codigo, mensaje = _error(e)
+            yield b"event: error\ndata: " + _json({"estado": codigo, "error": mensaje}) + b"\n\n"
+
+    async def lineas_lote(asistente, tarea, entradas, concurrencia):
+        try:
+            async for indice, resultado in iterar(lambda: asistente.lote(tarea, entradas, concurrencia)):
+                if isinstance(resultado, Exception):
+                    codigo, mensaje = _error(resultado)
+                    yield _json({"indice": indice, "estado": codigo, "error": mensaje}) + b"\n"
+                else:
+                    yield _json({"indice": indice, "estado": 200, "resultado": resultado}) + b"\n"
+        except Exception as e:
+            codigo, mensaje = _error(e)
+            yield _json({"indice": None, "estado": codigo, "error": mensaje}) + b"\n"
+
+    async def atender(scope, receive, send):
+        metodo, partes = scope["method"], [p for p in scope["path"].split("/") if p]
+        if metodo == "GET" and partes == ["salud"]:
+            return await responder(send, 200, _json({"estado": "ok"}))
+        if metodo != "POST" or not partes or len(partes) > 2:
+            raise ErrorAPI(404, "Ruta no encontrada")
+        cuerpo = await leer_cuerpo(receive)
+        if partes == ["pdf"]:
+            # No necesita el modelo
+            if not isinstance(cuerpo.get("texto"), str):
+                raise ErrorAPI(400, "Falta el campo de texto: texto")
+            datos = await en_hilo(pdf_paciente, cuerpo["texto"], _paciente(cuerpo))
+            return await responder(send, 200, datos, "application/pdf")
+        tarea = partes[0]
+        if tarea not in TAREAS:
+            raise ErrorAPI(404, "Ruta no encontrada")
+        # Se obtiene antes de empezar a responder: un error de configuración aún puede devolverse como JSON
+        asistente = await en_hilo(obtener_asistente)
+        if len(partes) == 1:
+            entrada = _entrada(tarea, cuerpo)
+            resultado = await en_hilo(asistente.ejecutar, tarea, entrada)
+            return await responder(send, 200, _json(resultado))
+        if partes[1] == "stream":
+            return await responder_por_partes(send, "text/event-stream; charset=utf-8", eventos(asistente, tarea, _entrada(tarea, cuerpo)))
+        if partes[1] == "lote":
+            entradas = cuerpo.get("entradas")
+            if not isinstance(entradas, list) or not 0 < len(entradas) <= MAX_LOTE:
+                raise ErrorAPI(400, f"'entradas' debe ser una lista de 1 a {MAX_LOTE} elementos")
+            entradas = [_entrada(tarea, e) for e in entradas]
+            concurrencia = max(1, min(int(cuerpo.get("concurrencia", 4)), 32))
+            return await responder_por_partes(send, "application/x-ndjson", lineas_lote(asistente, tarea, entradas, concurrencia))
+        raise ErrorAPI(404, "Ruta no encontrada")
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                mensaje = await receive()
+                if mensaje["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif mensaje["type"] == "lifespan.shutdown":
+                    if estado["asistente"] is not None:
+                        estado["asistente"].cerrar()
+                    pool.shutdown(wait=False)
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        try:
+            await atender(scope, receive, send)
+        except Exception as e:
+            codigo, mensaje = _error(e)
+            await responder(send, codigo, _json({"error": mensaje}))
+
+    return app
+
+
+app = crear_app()
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class CacheLLM:
+    """Caché persistente de respuestas del LLM indexada por hash de (modelo, temperatura, prompt, formato).
+
+    Las entradas expiran tras ``ttl`` segundos y, si el total almacenado supera
+    ``max_bytes``, se descartan primero las menos usadas recientemente (LRU).
+    """
+
+    def __init__(self, ruta="cache_llm.db", max_bytes=50 * 1024 * 1024, ttl=30 * 24 * 3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respuestas (
+                clave TEXT PRIMARY KEY,
+                texto TEXT NOT NULL,
+                bytes INTEGER NOT NULL,
+                creado REAL NOT NULL,
+                ultimo_uso REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_uso ON respuestas(ultimo_uso)")
+        self._conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def clave(modelo, temperatura, prompt, formato_json=False):
+        # Una respuesta en modo JSON no sirve a quien pidió texto libre, ni al revés. Las claves de
+        # texto libre no cambian, así que las entradas ya guardadas siguen valiendo
+        partes = [modelo, temperatura, prompt] + (["json"] if formato_json else [])
+        datos = json.dumps(partes, ensure_ascii=False)
+        return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+    def obtener(self, clave):
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT texto, creado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None or ahora - fila[1] > self.ttl:
+                self.fallos += 1
+                return None
+            self._conn.execute("UPDATE respuestas SET ultimo_uso = ? WHERE clave = ?", (ahora, clave))
+            self._conn.commit()
+            self.aciertos += 1
+            return fila[0]
+
+    def guardar(self, clave, texto):
+        ahora = time.time()
+        tamano = len(texto.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, texto, bytes, creado, ultimo_uso) VALUES (?, ?, ?, ?, ?)",
+                (clave, texto, tamano, ahora, ahora),
+            )
+            self._evictar(ahora)
+            self._conn.commit()
+
+    def _evictar(self, ahora):
+        self._conn.execute("DELETE FROM respuestas WHERE creado < ?", (ahora - self.ttl,))
+        total = self._conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM respuestas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        sobrante = total - self.max_bytes
+        descartar = []
+        for clave, tamano in self._conn.execute("SELECT clave, bytes FROM respuestas ORDER BY ultimo_uso"):
+            if sobrante <= 0:
+                break
+            descartar.append((clave,))
+            sobrante -= tamano
+        self._conn.executemany("DELETE FROM respuestas WHERE clave = ?", descartar)
+
+    def estadisticas(self):
+        with self._lock:
+            entradas, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM respuestas"
+            ).fetchone()
+        return {"aciertos": self.aciertos, "fallos": self.fallos, "entradas": entradas, "bytes": total}
@@ -0,0 +1,100 @@
+import bisect
+import os
+import re
+from array import array
+from collections import Counter
+from functools import lru_cache
+
+from .recuperacion import normalizar
+
+RUTA_TABLA = os.path.join(os.path.dirname(__file__), "datos", "cie10.tsv")
+
+_PARECE_CODIGO = re.compile(r"^[a-z]\d")
+
+
+def trigramas(texto):
+    trigramas_texto = set()
+    for palabra in re.findall(r"\w+", normalizar(texto)):
+        palabra = f"  {palabra} "
+        trigramas_texto.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return trigramas_texto
+
+
+class IndiceCIE10:
+    """Tabla CIE-10 ordenada por código, con búsqueda por prefijo de código y por trigramas de la descripción."""
+
+    def __init__(self, filas):
+        filas = sorted(filas)
+        self.codigos = [codigo for codigo, _ in filas]
+        self.descripciones = [descripcion for _, descripcion in filas]
+        self._normalizadas = [normalizar(d) for d in self.descripciones]
+        # Listas de posiciones compactas (uint16/uint32) en vez de listas de enteros Python
+        tipo = "H" if len(filas) < 2 ** 16 else "I"
+        self._trigramas = {}
+        for i, descripcion in enumerate(self.descripciones):
+            for trigrama in trigramas(descripcion):
+                self._trigramas.setdefault(trigrama, array(tipo)).append(i)
+
+    @classmethod
+    def desde_tsv(cls, ruta=RUTA_TABLA):
+        with open(ruta, encoding="utf-8") as archivo:
+            filas = [linea.rstrip("\n").split("\t", 1) for linea in archivo if linea.strip()]
+        return cls([(codigo.strip().upper(), descripcion.strip()) for codigo, descripcion in filas])
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def descripcion(self, codigo):
+        codigo = codigo.strip().upper()
+        i = bisect.bisect_left(self.codigos, codigo)
+        if i < len(self.codigos) and self.codigos[i] == codigo:
+            return self.descripciones[i]
+        return None
+
+    def por_prefijo(self, prefijo, k=10):
+        prefijo = prefijo.strip().upper()
+        inicio = bisect.bisect_left(self.codigos, prefijo)
+        fin = bisect.bisect_left(self.codigos, prefijo + "\uffff")
+        return [(self.codigos[i], self.descripciones[i]) for i in range(inicio, min(fin, inicio + k))]
+
+    def buscar(self, consulta, k=10):
+        consulta = consulta.strip()
+        if not consulta:
+            return []
+        if _PARECE_CODIGO.match(normalizar(consulta)):
+            return self.por_prefijo(consulta, k)
+        trigramas_consulta = trigramas(consulta)
+        coincidencias = Counter()
+        for trigrama in trigramas_consulta:
+            coincidencias.update(self._trigramas.get(trigrama, ()))
+        consulta_normalizada = normalizar(consulta)
+        # Proporción de trigramas de la consulta presentes; las subcadenas exactas van primero
+        puntajes = {
+            i: n / len(trigramas_consulta) + (1 if consulta_normalizada in self._normalizadas[i] else 0)
+            for i, n in coincidencias.items()
+        }
+        mejores = sorted((i for i, p in puntajes.items() if p >= 0.5), key=lambda i: (-puntajes[i], self.codigos[i]))
+        return [(self.codigos[i], self.descripciones[i]) for i in mejores[:k]]
+
+
+@lru_cache(maxsize=1)
+def indice_cie10():
+    return IndiceCIE10.desde_tsv()
+
+
+def buscar_cie10(consulta, k=10):
+    return indice_cie10().buscar(consulta, k)
+
+
+def validar_codigos(codigos):
+    # Marca los códigos sugeridos que no existen en la tabla y usa la descripción oficial de los que sí
+    indice = indice_cie10()
+    validados = []
+    for item in codigos:
+        oficial = indice.descripcion(item["codigo"])
+        validados.append({
+            "codigo": item["codigo"],
+            "descripcion": oficial or item["descripcion"],
+            "valido": oficial is not None,
+        })
+    return validados
@@ -0,0 +1,137 @@
+"""Línea de comandos para triaje, diagnóstico, órdenes, exámenes y PDF, sin Streamlit.
+
+    python -m 001_triage_preconsulta.cli triaje "Dolor pélvico hace 3 meses..." [--stream]
+    python -m 001_triage_preconsulta.cli ordenes - < plan.txt
+    python -m 001_triage_preconsulta.cli examenes --pdf informe.pdf "Colesterol 230"
+    python -m 001_triage_preconsulta.cli lote triaje entradas.jsonl --concurrencia 8 > salida.jsonl
+    python -m 001_triage_preconsulta.cli pdf - --salida resumen.pdf < resumen.txt
+    python -m 001_triage_preconsulta.cli servir --puerto 8000
+
+servir necesita uvicorn, que es opcional: pip install uvicorn, o poetry install --extras api.
+
+La configuración se lee del entorno (OPENAI_API_KEY, OPENAI_BASE_URL, LLM_CACHE_PATH,
+METRICAS_DB_PATH, HISTORIAL_DB_PATH...), con los mismos nombres que los secretos de la app.
+"""
+import argparse
+import json
+import sys
+
+# Texto principal de cada tarea cuando no se pide --json
+PRINCIPAL = {"triaje": "resumen", "diagnostico": "diagnostico", "ordenes": "documento", "examenes": "resumen"}
+CAMPO_ENTRADA = {"triaje": "texto", "diagnostico": "resumen", "ordenes": "plan", "examenes": "texto"}
+
+
+def _texto(valor):
+    return sys.stdin.read() if valor == "-" else valor
+
+
+def _paciente(args):
+    return {"nombre": args.paciente, "rut": args.rut or ""} if args.paciente else None
+
+
+def _escribir_json(datos):
+    sys.stdout.write(json.dumps(datos, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="001_triage_preconsulta.cli", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="comando", required=True)
+    for tarea in PRINCIPAL:
+        p = sub.add_parser(tarea)
+        p.add_argument("texto", nargs="?" if tarea == "examenes" else None, default="",
+                       help="texto de entrada, o - para leerlo de la entrada estándar")
+        p.add_argument("--stream", action="store_true", help="mostrar la respuesta a medida que llega")
+        p.add_argument("--json", action="store_true", help="imprimir el resultado completo en JSON")
+        p.add_argument("--paciente", help="guardar la ficha en el historial con este nombre")
+        p.add_argument("--rut")
+        if tarea == "examenes":
+            p.add_argument("--pdf", action="append", default=[], help="PDF de exámenes (se puede repetir)")
+    p = sub.add_parser("lote", help="una tarea para cada línea de un JSONL; escribe un JSONL con los resultados")
+    p.add_argument("tarea", choices=list(PRINCIPAL))
+    p.add_argument("archivo", help="JSONL con los mismos campos que la API (o - para la entrada estándar)")
+    p.add_argument("--concurrencia", type=int, default=4)
+    p = sub.add_parser("pdf")
+    p.add_argument("texto")
+    p.add_argument("--salida", required=True)
+    p.add_argument("--paciente")
+    p.add_argument("--rut")
+    p = sub.add_parser("servir", help="levanta la API ASGI con uvicorn")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--puerto", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    if args.comando == "servir":
+        try:
+            import uvicorn
+        except ImportError:
+            parser.exit(2, "error: 'servir' necesita uvicorn (pip install uvicorn, o poetry install --extras api)\n")
+
+        from .api import app
+
+        uvicorn.run(app, host=args.host, port=args.puerto)
+        return 0
+    if args.comando == "pdf":
+        from .pdf import pdf_paciente
+
+        with open(args.salida, "wb") as f:
+            f.write(pdf_paciente(_texto(args.texto), _paciente(args)))
+        return 0
+
+    from .api import ErrorAPI, _entrada
+    from .servicio import Asistente
+
+    if args.comando == "lote":
+        # Se valida todo el archivo antes de llamar al modelo
+        archivo = sys.stdin if args.archivo == "-" else open(args.archivo, encoding="utf-8")
+        entradas = []
+        with archivo:
+            for numero, linea in enumerate(archivo, 1):
+                if not linea.strip():
+                    continue
+                try:
+                    entradas.append(_entrada(args.tarea, json.loads(linea)))
+                except (ValueError, ErrorAPI) as e:
+                    parser.exit(2, f"{args.archivo}:{numero}: {e}\n")
+
+    asistente = Asistente.desde_entorno()
+    try:
+        if args.comando == "lote":
+            errores = 0
+            for indice, resultado in asistente.lote(args.tarea, entradas, args.concurrencia):
+                if isinstance(resultado, Exception):
+                    errores += 1
+                    _escribir_json({"indice": indice, "error": f"{type(resultado).__name__}: {resultado}"})
+                else:
+                    _escribir_json({"indice": indice, "resultado": resultado})
+            return 1 if errores else 0
+
+        entrada = {CAMPO_ENTRADA[args.comando]: _texto(args.texto)}
+        if args.comando == "examenes":
+            pdfs = []
+            for ruta in args.pdf:
+                with open(ruta, "rb") as f:
+                    pdfs.append(f.read())
+            entrada["pdfs"] = pdfs
+        if args.stream:
+            for fragmento in asistente.stream(args.comando, paciente=_paciente(args), **entrada):
+                sys.stdout.write(fragmento)
+                sys.stdout.flush()
+            sys.stdout.write("\n")
+            return 0
+        try:
+            resultado = asistente.ejecutar(args.comando, dict(entrada, paciente=_paciente(args)))
+        except ValueError as e:
+            parser.exit(2, f"error: {e}\n")
+        if args.json:
+            _escribir_json(resultado)
+        else:
+            print(resultado[PRINCIPAL[args.comando]])
+        return 0
+    finally:
+        asistente.cerrar()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
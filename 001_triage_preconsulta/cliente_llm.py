@@ -0,0 +1,53 @@
+import time
+
+from .cache_llm import CacheLLM
+from .llm_gateway import PRIORIDAD_INTERACTIVA
+
+
+class ClienteLLM:
+    """Caché de respuestas, gateway y métricas: el camino de cada llamada al modelo.
+
+    Lo comparten la app (``ui.completar``, ``ui.completar_lote``) y ``servicio.Asistente``,
+    así que una respuesta se busca, se pide y se registra igual venga de donde venga.
+    No usa Streamlit: mostrar los fragmentos es cosa de quien consume ``stream``.
+    """
+
+    def __init__(self, cache, gateway, metricas, modelo=None):
+        self.cache = cache
+        self.gateway = gateway
+        self.metricas = metricas
+        self.modelo = modelo or gateway.modelo
+
+    def _desde_cache(self, clave, funcion):
+        inicio = time.perf_counter()
+        texto = self.cache.obtener(clave)
+        if texto is not None:
+            latencia = time.perf_counter() - inicio
+            self.metricas.registrar(funcion, self.modelo, latencia=latencia, ttft=latencia, cache=True)
+        return texto
+
+    def completar(self, prompt, temperature=0.2, prioridad=PRIORIDAD_INTERACTIVA, funcion="general",
+                  formato_json=False, usar_cache=True):
+        # Los reintentos con backoff y las métricas de la llamada los gestiona el gateway
+        clave = CacheLLM.clave(self.modelo, temperature, prompt, formato_json)
+        texto = self._desde_cache(clave, funcion) if usar_cache else None
+        if texto is None:
+            texto = self.gateway.completar(prompt, temperature, prioridad=prioridad, funcion=funcion,
+                                           formato_json=formato_json)
+            self.cache.guardar(clave, texto)
+        return texto
+
+    def stream(self, prompt, temperature=0.2, prioridad=PRIORIDAD_INTERACTIVA, funcion="general",
+               formato_json=False, usar_cache=True):
+        # Una respuesta en caché llega en un solo fragmento; la nueva se guarda al terminar de leerla
+        clave = CacheLLM.clave(self.modelo, temperature, prompt, formato_json)
+        texto = self._desde_cache(clave, funcion) if usar_cache else None
+        if texto is not None:
+            yield texto
+            return
+        partes = []
+        for fragmento in self.gateway.stream(prompt, temperature, prioridad=prioridad, funcion=funcion,
+                                             formato_json=formato_json):
+            partes.append(fragmento)
+            yield fragmento
+        self.cache.guardar(clave, "".join(partes).strip())
@@ -0,0 +1,176 @@
+import io
+import sqlite3
+import threading
+import time
+
+
+class ColaCorreo:
+    """Cola persistente de correos salientes drenada por un hilo en segundo plano.
+
+    El hilo reutiliza una única conexión SMTP mientras haya envíos, la cierra tras
+    ``inactividad`` segundos sin trabajo y reintenta los fallos con backoff exponencial.
+    """
+
+    def __init__(self, ruta="cola_correo.db", usuario=None, password=None, host="smtp.gmail.com", port=None,
+                 smtp_starttls=None, smtp_ssl=True, omitir_login=False, max_intentos=5, espera_base=5.0,
+                 inactividad=60.0):
+        self.config_smtp = {
+            "user": usuario,
+            "password": password,
+            "host": host,
+            "smtp_starttls": smtp_starttls,
+            "smtp_ssl": smtp_ssl,
+            "smtp_skip_login": omitir_login,
+        }
+        if port is not None:
+            self.config_smtp["port"] = port
+        self.usuario = usuario
+        self.max_intentos = max_intentos
+        self.espera_base = espera_base
+        self.inactividad = inactividad
+        self._lock = threading.Lock()
+        self._despertar = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        self._smtp = None
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS correos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                destinatario TEXT NOT NULL,
+                asunto TEXT NOT NULL,
+                cuerpo TEXT NOT NULL,
+                adjunto BLOB,
+                nombre_adjunto TEXT,
+                estado TEXT NOT NULL DEFAULT 'pendiente',
+                intentos INTEGER NOT NULL DEFAULT 0,
+                proximo_intento REAL NOT NULL,
+                error TEXT,
+                creado REAL NOT NULL,
+                enviado REAL
+            );
+            CREATE INDEX IF NOT EXISTS idx_correos_estado ON correos(estado, proximo_intento);
+        """)
+        # Lo que quedó a medio enviar en una ejecución anterior vuelve a la cola
+        self._conn.execute("UPDATE correos SET estado = 'pendiente' WHERE estado = 'enviando'")
+        self._conn.commit()
+
+    def encolar(self, destinatario, asunto, cuerpo, adjunto=None, nombre_adjunto=None):
+        ahora = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO correos (destinatario, asunto, cuerpo, adjunto, nombre_adjunto, proximo_intento, creado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (destinatario, asunto, cuerpo, adjunto, nombre_adjunto, ahora, ahora),
+            )
+            self._conn.commit()
+        self._despertar.set()
+        return cursor.lastrowid
+
+    def estado(self, id_correo):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT estado, intentos, error FROM correos WHERE id = ?", (id_correo,)
+            ).fetchone()
+        return dict(zip(("estado", "intentos", "error"), fila)) if fila else None
+
+    def recientes(self, limite=20):
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT id, destinatario, nombre_adjunto, estado, intentos, error, creado, enviado "
+                "FROM correos ORDER BY id DESC LIMIT ?", (limite,)
+            ).fetchall()
+        columnas = ("id", "destinatario", "nombre_adjunto", "estado", "intentos", "error", "creado", "enviado")
+        return [dict(zip(columnas, fila)) for fila in filas]
+
+    def iniciar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._detener.clear()
+            self._hilo = threading.Thread(target=self._bucle, name="cola-correo", daemon=True)
+            self._hilo.start()
+        return self
+
+    def detener(self, timeout=5.0):
+        self._detener.set()
+        self._despertar.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        self._cerrar_smtp()
+
+    def cerrar(self):
+        self.detener()
+        with self._lock:
+            self._conn.close()
+
+    def _siguiente(self):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT id, destinatario, asunto, cuerpo, adjunto, nombre_adjunto, intentos FROM correos "
+                "WHERE estado = 'pendiente' AND proximo_intento <= ? ORDER BY proximo_intento LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+            if fila:
+                self._conn.execute("UPDATE correos SET estado = 'enviando' WHERE id = ?", (fila[0],))
+                self._conn.commit()
+            return fila
+
+    def _espera_hasta_siguiente(self):
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT MIN(proximo_intento) FROM correos WHERE estado = 'pendiente'"
+            ).fetchone()
+        if fila[0] is None:
+            return self.inactividad
+        return max(0.0, min(fila[0] - time.time(), self.inactividad))
+
+    def _cerrar_smtp(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _enviar(self, destinatario, asunto, cuerpo, adjunto, nombre_adjunto):
+        if self._smtp is None:
+            import yagmail
+
+            self._smtp = yagmail.SMTP(**self.config_smtp)
+        adjuntos = None
+        if adjunto is not None:
+            adjuntos = io.BytesIO(adjunto)
+            adjuntos.name = nombre_adjunto or "documento.pdf"
+        self._smtp.send(to=destinatario, subject=asunto, contents=cuerpo, attachments=adjuntos)
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            fila = self._siguiente()
+            if fila is None:
+                espera = self._espera_hasta_siguiente()
+                if not self._despertar.wait(espera) and espera >= self.inactividad:
+                    self._cerrar_smtp()
+                self._despertar.clear()
+                continue
+            id_correo, destinatario, asunto, cuerpo, adjunto, nombre_adjunto, intentos = fila
+            try:
+                self._enviar(destinatario, asunto, cuerpo, adjunto, nombre_adjunto)
+            except Exception as e:
+                # La conexión puede haber quedado inservible: se abre otra en el próximo intento
+                self._cerrar_smtp()
+                intentos += 1
+                estado = "error" if intentos >= self.max_intentos else "pendiente"
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE correos SET estado = ?, intentos = ?, proximo_intento = ?, error = ? WHERE id = ?",
+                        (estado, intentos, time.time() + self.espera_base * 2 ** intentos, str(e), id_correo),
+                    )
+                    self._conn.commit()
+            else:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE correos SET estado = 'enviado', intentos = ?, enviado = ?, error = NULL, adjunto = NULL "
+                        "WHERE id = ?",
+                        (intentos + 1, time.time(), id_correo),
+                    )
+                    self._conn.commit()
@@ -0,0 +1,112 @@
+import hashlib
+import io
+import os
+import threading
+import zipfile
+from datetime import date
+
+from .pdf import generar_pdf, limpiar_emojis
+
+CACHE_DIR = os.path.join(".cache", "pdf_fichas")
+
+# MuPDF no es seguro para usar desde varios hilos a la vez
+_lock = threading.Lock()
+
+
+def encabezado_ficha(ficha):
+    return (f"Paciente: {ficha['nombre'] or '---'}\nRUT: {ficha['rut'] or '---'}\n"
+            f"Fecha: {ficha['fecha']}\nDocumento: {ficha['tipo']}")
+
+
+def pdf_ficha(ficha, cache_dir=CACHE_DIR):
+    """PDF de una ficha del historial; se renderiza una sola vez y se reutiliza desde disco."""
+    encabezado = encabezado_ficha(ficha)
+    clave = hashlib.sha256(f"{encabezado}\n\n{ficha['contenido']}".encode("utf-8")).hexdigest()
+    ruta = os.path.join(cache_dir, f"{clave}.pdf")
+    try:
+        with open(ruta, "rb") as f:
+            return f.read()
+    except OSError:
+        pass
+    datos = generar_pdf(limpiar_emojis(ficha["contenido"]), encabezado)
+    os.makedirs(cache_dir, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, ruta)
+    return datos
+
+
+def _portada(nombre, rut, entradas, paginas_portada):
+    lineas = [
+        f"Dossier clínico de {nombre or '---'}",
+        f"RUT: {rut or '---'}",
+        f"Generado el {date.today().strftime('%d-%m-%Y')}",
+        "",
+        "Índice",
+    ]
+    lineas += [f"  pág. {pagina + paginas_portada:>3}  ·  {titulo}" for titulo, pagina in entradas]
+    return generar_pdf("\n".join(lineas))
+
+
+def generar_dossier(fichas, cache_dir=CACHE_DIR):
+    """Une en un solo PDF las fichas de un paciente (en orden cronológico) con portada e índice.
+
+    Las páginas de cada ficha se copian tal cual desde su PDF ya renderizado
+    (``insert_pdf``), sin volver a maquetar el texto.
+    """
+    import fitz
+
+    if not fichas:
+        raise ValueError("El paciente no tiene fichas en el historial")
+    fichas = sorted(fichas, key=lambda f: (f["fecha"], f["id"]))
+    pdfs = [pdf_ficha(ficha, cache_dir) for ficha in fichas]
+    with _lock:
+        fuentes = [fitz.open("pdf", datos) for datos in pdfs]
+        entradas, pagina = [], 1
+        for ficha, fuente in zip(fichas, fuentes):
+            entradas.append((f"{ficha['fecha']} · {ficha['tipo']}", pagina))
+            pagina += fuente.page_count
+        # La portada desplaza las páginas; si el índice ocupa más de una página se recalcula una vez
+        portada = fitz.open("pdf", _portada(fichas[0]["nombre"], fichas[0]["rut"], entradas, 1))
+        if portada.page_count > 1:
+            portada = fitz.open("pdf", _portada(fichas[0]["nombre"], fichas[0]["rut"], entradas, portada.page_count))
+        desplazamiento = portada.page_count
+
+        dossier = fitz.open()
+        dossier.insert_pdf(portada)
+        for fuente in fuentes:
+            dossier.insert_pdf(fuente)
+        dossier.set_toc([[1, "Portada e índice", 1]] + [[1, titulo, p + desplazamiento] for titulo, p in entradas])
+        # garbage=4 deja una sola copia de la fuente incrustada compartida por todas las fichas
+        datos = dossier.tobytes(garbage=4, deflate=True)
+        for doc in [portada, dossier, *fuentes]:
+            doc.close()
+    return datos
+
+
+def nombre_dossier(nombre):
+    return f"Dossier_{'_'.join((nombre or 'paciente').split()) or 'paciente'}.pdf"
+
+
+def zip_dossiers_dia(historial, fecha, cache_dir=CACHE_DIR):
+    """Devuelve los bytes de un zip con el dossier de cada paciente atendida en ``fecha`` (AAAA-MM-DD).
+
+    El zip se arma en memoria (``st.download_button`` necesita los bytes); cada dossier
+    se escribe en él antes de construir el siguiente, así que a lo más hay un dossier
+    suelto además del zip.
+    """
+    nombres = list(dict.fromkeys(f["nombre"] for f in historial.por_fechas(fecha, fecha) if f["nombre"]))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as archivo_zip:
+        usados = set()
+        for nombre in nombres:
+            archivo = nombre_dossier(nombre)
+            base, n = archivo[:-4], 1
+            while archivo in usados:
+                n += 1
+                archivo = f"{base}_{n}.pdf"
+            usados.add(archivo)
+            # Los PDF ya van comprimidos por dentro: se guardan sin volver a comprimir
+            archivo_zip.writestr(archivo, generar_dossier(historial.por_paciente(nombre), cache_dir))
+    return buffer.getvalue()
@@ -0,0 +1,139 @@
+import copy
+import json
+import math
+import re
+from functools import lru_cache
+
+from .cie10 import validar_codigos
+
+# Campos que el modelo debe devolver en cada tipo de respuesta estructurada
+ESQUEMA_TRIAJE = {
+    "edad": None,
+    "sintomas": [],
+    "antecedentes": [],
+    "motivo": "",
+    "preguntas": [],
+}
+
+ESQUEMA_DIAGNOSTICO = {
+    "diagnostico": "",
+    "cie10": [],
+}
+
+_CODIGO_CIE10 = re.compile(r"^[A-Z]\d{2}(\.\d{1,2})?$")
+_EDAD = re.compile(r"\d{1,3}")
+
+
+def _extraer_objeto(texto):
+    # Tolera texto alrededor del JSON y bloques ```json
+    inicio = texto.find("{")
+    fin = texto.rfind("}")
+    if inicio == -1 or fin <= inicio:
+        raise ValueError("La respuesta no contiene un objeto JSON")
+    return json.loads(texto[inicio:fin + 1])
+
+
+def _lista(valor):
+    if valor is None:
+        return []
+    if isinstance(valor, str):
+        return [valor] if valor.strip() else []
+    # Un solo elemento donde se esperaba una lista ("sintomas": 3, "cie10": {...})
+    if isinstance(valor, dict):
+        return [valor]
+    if not isinstance(valor, (list, tuple)):
+        return [str(valor)]
+    return [str(v).strip() if not isinstance(v, dict) else v for v in valor if v]
+
+
+def _normalizar_cie10(valor):
+    codigos = []
+    for item in _lista(valor):
+        if isinstance(item, dict):
+            codigo = str(item.get("codigo", "")).strip().upper()
+            descripcion = str(item.get("descripcion", "")).strip()
+        else:
+            codigo, _, descripcion = str(item).partition(" ")
+            codigo = codigo.strip().upper().rstrip(":-")
+            descripcion = descripcion.strip(" :-")
+        if _CODIGO_CIE10.match(codigo):
+            codigos.append({"codigo": codigo, "descripcion": descripcion})
+    return codigos
+
+
+def _edad(valor):
+    # El modelo a veces devuelve "34 años" o "aprox. 34" en vez de un número
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return int(valor) if math.isfinite(valor) else None
+    coincidencia = _EDAD.search(str(valor)) if valor is not None else None
+    return int(coincidencia.group()) if coincidencia else None
+
+
+@lru_cache(maxsize=512)
+def _parsear_triaje(texto):
+    datos = _extraer_objeto(texto)
+    return {
+        "edad": _edad(datos.get("edad")),
+        "sintomas": _lista(datos.get("sintomas")),
+        "antecedentes": _lista(datos.get("antecedentes")),
+        "motivo": str(datos.get("motivo") or "").strip(),
+        "preguntas": _lista(datos.get("preguntas")),
+    }
+
+
+@lru_cache(maxsize=512)
+def _parsear_diagnostico(texto):
+    datos = _extraer_objeto(texto)
+    return {
+        "diagnostico": str(datos.get("diagnostico") or "").strip(),
+        "cie10": validar_codigos(_normalizar_cie10(datos.get("cie10"))),
+    }
+
+
+# Las versiones en caché se comparten entre llamadas: se entrega una copia para que modificarla no altere la caché
+def parsear_triaje(texto):
+    return copy.deepcopy(_parsear_triaje(texto))
+
+
+def parsear_diagnostico(texto):
+    return copy.deepcopy(_parsear_diagnostico(texto))
+
+
+def _vinetas(valores):
+    return "\n".join(f"  - {v}" for v in valores) if valores else "  - (sin datos)"
+
+
+def formatear_triaje(datos):
+    edad = datos["edad"] if datos["edad"] is not None else "no indicada"
+    return (
+        f"Edad estimada: {edad}\n"
+        f"Motivo de consulta: {datos['motivo'] or '(sin datos)'}\n"
+        f"Síntomas principales:\n{_vinetas(datos['sintomas'])}\n"
+        f"Antecedentes:\n{_vinetas(datos['antecedentes'])}\n"
+        f"Preguntas de la paciente:\n{_vinetas(datos['preguntas'])}"
+    )
+
+
+def formatear_diagnostico(datos):
+    codigos = [
+        f"{c['codigo']} {c['descripcion']}".strip() + ("" if c.get("valido", True) else " ⚠️ (no está en la tabla CIE-10)")
+        for c in datos["cie10"]
+    ]
+    return f"Diagnóstico sugerido: {datos['diagnostico'] or '(sin datos)'}\nCódigos CIE-10:\n{_vinetas(codigos)}"
+
+
+def triaje_estructurado(texto):
+    # Devuelve (texto legible, datos); si el modelo no respetó el JSON se conserva el texto tal cual
+    try:
+        datos = parsear_triaje(texto)
+    except ValueError:
+        return texto, None
+    return formatear_triaje(datos), datos
+
+
+def diagnostico_estructurado(texto):
+    try:
+        datos = parsear_diagnostico(texto)
+    except ValueError:
+        return texto, None
+    return formatear_diagnostico(datos), datos
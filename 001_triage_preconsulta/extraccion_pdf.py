@@ -0,0 +1,281 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import types
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+
+CACHE_DIR = os.path.join(".cache", "pdf_texto")
+CACHE_OCR_DIR = os.path.join(".cache", "pdf_ocr")
+PAGINAS_POR_PROCESO = 16
+UMBRAL_PARALELO = 32
+MAX_DOCUMENTOS_EN_MEMORIA = 64
+MAX_BYTES_EN_MEMORIA = 128 * 2 ** 20
+# El pool es uno por proceso y lo comparten todas las sesiones: se acota para no copar la máquina
+MAX_PROCESOS = int(os.environ.get("PDF_MAX_PROCESOS", min(4, os.cpu_count() or 2)))
+
+# Páginas con menos caracteres que esto y alguna imagen se consideran escaneadas
+MIN_CARACTERES_TEXTO = 20
+# Tesseract rinde mejor cerca de 300 DPI; más resolución no mejora el reconocimiento y lo vuelve más lento
+DPI_OCR = int(os.environ.get("OCR_DPI", 300))
+DPI_OCR_MINIMO = 150
+IDIOMA_OCR = os.environ.get("OCR_IDIOMA", "spa")
+
+_memoria = OrderedDict()
+_bytes_memoria = 0
+_lock = threading.Lock()
+_pool = None
+_lock_main = threading.Lock()
+_MAIN_VACIO = types.ModuleType("__main__")
+
+
+def hash_contenido(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def _extraer_rango(datos, inicio, fin):
+    import fitz
+
+    with fitz.open(stream=datos, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(inicio, fin)]
+
+
+def _ocr_pagina(pagina_pdf, dpi, idioma):
+    import fitz
+
+    with fitz.open(stream=pagina_pdf, filetype="pdf") as doc:
+        pagina = doc[0]
+        return pagina.get_text(textpage=pagina.get_textpage_ocr(dpi=dpi, language=idioma, full=True))
+
+
+@lru_cache(maxsize=1)
+def ocr_disponible():
+    import fitz
+
+    try:
+        return bool(fitz.get_tessdata())
+    except RuntimeError:
+        return False
+
+
+def _dpi_pagina(pagina):
+    # No tiene sentido rasterizar por encima de la resolución del escaneo original
+    nativo = 0
+    for imagen in pagina.get_image_info():
+        ancho_pt = imagen["bbox"][2] - imagen["bbox"][0]
+        if ancho_pt > 0:
+            nativo = max(nativo, imagen["width"] * 72 / ancho_pt)
+    return int(max(DPI_OCR_MINIMO, min(DPI_OCR, nativo or DPI_OCR)))
+
+
+def _clave_pagina(doc, pagina, dpi):
+    # Se identifica la página por sus imágenes y su contenido, no por el documento que la trae
+    h = hashlib.sha256(f"{dpi}|{IDIOMA_OCR}|".encode())
+    for imagen in pagina.get_images(full=True):
+        h.update(doc.xref_stream_raw(imagen[0]) or b"")
+    h.update(pagina.read_contents())
+    return h.hexdigest()
+
+
+def _pagina_sola(doc, indice):
+    import fitz
+
+    with fitz.open() as nuevo:
+        nuevo.insert_pdf(doc, from_page=indice, to_page=indice)
+        return nuevo.tobytes(garbage=1)
+
+
+def _leer_texto(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _escribir_texto(ruta, texto):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporal, ruta)
+
+
+def _obtener_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # "spawn" y no fork: el servidor de Streamlit y el gateway tienen hilos, y un fork
+            # podría heredar locks tomados por ellos y bloquearse
+            _pool = ProcessPoolExecutor(max_workers=MAX_PROCESOS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _enviar(funcion, *args):
+    # Con "spawn" cada proceso nuevo del pool vuelve a ejecutar el __main__ del padre, y dentro de
+    # Streamlit ese __main__ es la página. Los trabajos solo necesitan este módulo: los procesos se
+    # lanzan (durante submit) con un __main__ vacío
+    pool = _obtener_pool()
+    with _lock_main:
+        principal = sys.modules["__main__"]
+        sys.modules["__main__"] = _MAIN_VACIO
+        try:
+            return pool.submit(funcion, *args)
+        finally:
+            if sys.modules["__main__"] is _MAIN_VACIO:
+                sys.modules["__main__"] = principal
+
+
+def _leer_cache(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _escribir_cache(ruta, paginas):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(paginas, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+
+
+def _capa_de_texto(datos):
+    import fitz
+
+    with fitz.open(stream=datos, filetype="pdf") as doc:
+        total = doc.page_count
+        if total < UMBRAL_PARALELO:
+            return [page.get_text() for page in doc]
+    # Documentos grandes: un bloque de páginas por proceso
+    futuros = [
+        _enviar(_extraer_rango, datos, inicio, min(inicio + PAGINAS_POR_PROCESO, total))
+        for inicio in range(0, total, PAGINAS_POR_PROCESO)
+    ]
+    return [texto for futuro in futuros for texto in futuro.result()]
+
+
+def _guardar_en_memoria(clave, paginas, pendientes=()):
+    global _bytes_memoria
+    # Se acota por número de documentos y por tamaño: unos pocos PDF enormes no deben llenar la memoria
+    bytes_paginas = sum(map(sys.getsizeof, paginas))
+    with _lock:
+        if clave in _memoria:
+            _bytes_memoria -= _memoria.pop(clave)[2]
+        _memoria[clave] = (paginas, tuple(pendientes), bytes_paginas)
+        _bytes_memoria += bytes_paginas
+        while len(_memoria) > MAX_DOCUMENTOS_EN_MEMORIA or (_bytes_memoria > MAX_BYTES_EN_MEMORIA and len(_memoria) > 1):
+            _bytes_memoria -= _memoria.popitem(last=False)[1][2]
+
+
+def _desde_disco(guardado):
+    # Formato anterior: solo la lista de páginas, sin OCR pendiente
+    if isinstance(guardado, list):
+        return guardado, ()
+    if isinstance(guardado, dict):
+        return guardado["paginas"], tuple(guardado.get("pendientes", ()))
+    return None
+
+
+def limpiar_memoria():
+    global _bytes_memoria
+    with _lock:
+        _memoria.clear()
+        _bytes_memoria = 0
+
+
+def extraer_paginas_progresivo(datos, cache_dir=CACHE_DIR, ocr_dir=CACHE_OCR_DIR):
+    """Genera ``(indice, texto, por_ocr)`` por página a medida que cada una está lista.
+
+    Las páginas con capa de texto salen de inmediato; las escaneadas (solo imagen) se
+    rasterizan y pasan por OCR en el pool de procesos, y se entregan según terminan.
+    El OCR se guarda por página, así que una hoja escaneada repetida en otro PDF no
+    se vuelve a procesar. Sin Tesseract instalado (o si el OCR falla) esas páginas
+    quedan vacías y marcadas como pendientes: el resto del documento se guarda igual
+    y en la próxima lectura solo se reintentan las pendientes.
+    """
+    clave = hash_contenido(datos)
+    with _lock:
+        guardado = _memoria.get(clave)
+        if guardado is not None:
+            _memoria.move_to_end(clave)
+    ruta = os.path.join(cache_dir, f"{clave}.json")
+    if guardado is None:
+        guardado = _desde_disco(_leer_cache(ruta))
+        if guardado is not None:
+            _guardar_en_memoria(clave, *guardado)
+    if guardado is not None:
+        paginas, pendientes = list(guardado[0]), set(guardado[1])
+        for indice, texto in enumerate(paginas):
+            if indice not in pendientes:
+                yield indice, texto, False
+        if not pendientes or not ocr_disponible():
+            for indice in sorted(pendientes):
+                yield indice, paginas[indice], True
+            return
+        nuevo = False
+    else:
+        paginas, pendientes, nuevo = _capa_de_texto(datos), None, True
+
+    import fitz
+
+    futuros, listas = {}, {}
+    with fitz.open(stream=datos, filetype="pdf") as doc:
+        if pendientes is None:
+            pendientes = {
+                i for i, texto in enumerate(paginas)
+                if len(texto.strip()) < MIN_CARACTERES_TEXTO and doc[i].get_images()
+            }
+        for i in sorted(pendientes) if ocr_disponible() else []:
+            dpi = _dpi_pagina(doc[i])
+            ruta_ocr = os.path.join(ocr_dir, f"{_clave_pagina(doc, doc[i], dpi)}.txt")
+            texto = _leer_texto(ruta_ocr)
+            if texto is not None:
+                listas[i] = texto
+            else:
+                futuros[_enviar(_ocr_pagina, _pagina_sola(doc, i), dpi, IDIOMA_OCR)] = (i, ruta_ocr)
+    faltaban = len(pendientes)
+    en_ocr = {indice for indice, _ in futuros.values()}
+    # Mientras el OCR avanza en segundo plano se entregan las páginas que ya tienen texto
+    for indice, texto in enumerate(paginas):
+        if indice in listas:
+            paginas[indice] = listas[indice]
+            pendientes.discard(indice)
+            yield indice, listas[indice], True
+        elif indice not in pendientes:
+            if nuevo:
+                yield indice, texto, False
+        elif indice not in en_ocr:
+            yield indice, texto, True
+    for futuro in as_completed(futuros):
+        indice, ruta_ocr = futuros[futuro]
+        try:
+            texto = futuro.result()
+        except Exception:
+            pass
+        else:
+            paginas[indice] = texto
+            pendientes.discard(indice)
+            _escribir_texto(ruta_ocr, texto)
+        yield indice, paginas[indice], True
+    if nuevo or len(pendientes) < faltaban:
+        _escribir_cache(ruta, {"paginas": paginas, "pendientes": sorted(pendientes)})
+        _guardar_en_memoria(clave, paginas, sorted(pendientes))
+
+
+def extraer_paginas(datos, cache_dir=CACHE_DIR):
+    """Devuelve el texto de cada página del PDF (con OCR en las escaneadas), reutilizando la caché."""
+    paginas = {}
+    for indice, texto, _ in extraer_paginas_progresivo(datos, cache_dir):
+        paginas[indice] = texto
+    return [paginas[i] for i in range(len(paginas))]
+
+
+def extraer_texto(datos, separador="", cache_dir=CACHE_DIR):
+    return separador.join(extraer_paginas(datos, cache_dir))
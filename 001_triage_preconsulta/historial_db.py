@@ -0,0 +1,325 @@
+import json
+import re
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+
+from .laboratorio import CUALITATIVOS, SerieLaboratorio, extraer_valores
+from .recuperacion import normalizar
+from .tamizaje import AgendaTamizaje
+
+_PERIODO = re.compile(
+    r"\b(?:en )?(?:los |las |el |la )?(?:ultim[oa]s?|pasad[oa]s?) (?:(\d+) )?(dias?|semanas?|mes(?:es)?|anos?)\b"
+)
+
+
+def _restar_meses(dia, meses):
+    mes = dia.month - 1 - meses
+    anio, mes = dia.year + mes // 12, mes % 12 + 1
+    for d in (dia.day, 30, 29, 28):
+        try:
+            return dia.replace(year=anio, month=mes, day=d)
+        except ValueError:
+            continue
+
+
+def interpretar_consulta(texto, hoy=None):
+    """Separa de la búsqueda un periodo relativo ("últimos 6 meses", "última semana").
+
+    Devuelve ``(términos, desde)`` con ``desde`` en formato ISO o None.
+    """
+    hoy = hoy or date.today()
+    normalizado = normalizar(texto)
+    coincidencia = _PERIODO.search(normalizado)
+    if not coincidencia:
+        return normalizado, None
+    cantidad = int(coincidencia.group(1) or 1)
+    unidad = coincidencia.group(2)
+    if unidad.startswith("dia"):
+        desde = hoy - timedelta(days=cantidad)
+    elif unidad.startswith("semana"):
+        desde = hoy - timedelta(weeks=cantidad)
+    elif unidad.startswith("mes"):
+        desde = _restar_meses(hoy, cantidad)
+    else:
+        desde = _restar_meses(hoy, 12 * cantidad)
+    terminos = (normalizado[:coincidencia.start()] + " " + normalizado[coincidencia.end():]).strip()
+    return terminos, desde.isoformat()
+
+
+def consulta_fts(terminos):
+    # Cada término va entre comillas: "BI-RADS" se busca como la frase "bi rads" y no como operadores FTS5
+    palabras = re.findall(r"\w+(?:[-/.]\w+)*", terminos)
+    return " ".join('"' + re.sub(r"[-/.]", " ", p) + '"' for p in palabras)
+
+
+class HistorialDB:
+    """Historial clínico persistente en SQLite (modo WAL) con índices por paciente, RUT, fecha y tipo.
+
+    Las fichas pueden llevar ``datos`` estructurados (JSON); sus códigos CIE-10 y sus
+    valores de laboratorio se indexan aparte para filtrar y graficar sin volver a leer el texto.
+    """
+
+    COLUMNAS = ("id", "nombre", "rut", "fecha", "tipo", "contenido", "datos")
+    _SELECT = "SELECT id, nombre, rut, fecha, tipo, contenido, datos FROM fichas"
+    MAX_SERIES_EN_MEMORIA = 256
+
+    def __init__(self, ruta="historial.db"):
+        self._lock = threading.Lock()
+        self._series_lab = OrderedDict()
+        self._agenda = None
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fichas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre TEXT NOT NULL,
+                rut TEXT,
+                fecha TEXT NOT NULL,
+                tipo TEXT NOT NULL,
+                contenido TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fichas_nombre ON fichas(nombre, id);
+            CREATE INDEX IF NOT EXISTS idx_fichas_rut ON fichas(rut);
+            CREATE INDEX IF NOT EXISTS idx_fichas_fecha ON fichas(fecha);
+            CREATE INDEX IF NOT EXISTS idx_fichas_tipo ON fichas(tipo, fecha);
+            CREATE TABLE IF NOT EXISTS fichas_cie10 (
+                ficha_id INTEGER NOT NULL REFERENCES fichas(id),
+                codigo TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_fichas_cie10_codigo ON fichas_cie10(codigo);
+        """)
+        columnas = {fila[1] for fila in self._conn.execute("PRAGMA table_info(fichas)")}
+        if "datos" not in columnas:
+            self._conn.execute("ALTER TABLE fichas ADD COLUMN datos TEXT")
+        if "origen" not in columnas:
+            self._conn.execute("ALTER TABLE fichas ADD COLUMN origen TEXT")
+        # Clave opcional de quien genera la ficha (p. ej. un ítem de lote): la misma clave no se inserta dos veces
+        self._conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_fichas_origen ON fichas(origen) WHERE origen IS NOT NULL")
+        # Índice invertido sobre el texto de las fichas, sin distinguir tildes ni mayúsculas
+        nuevo_fts = not self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fichas_fts'"
+        ).fetchone()
+        self._conn.executescript("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS fichas_fts USING fts5(
+                nombre, tipo, contenido,
+                content='fichas', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            CREATE TRIGGER IF NOT EXISTS fichas_fts_insertar AFTER INSERT ON fichas BEGIN
+                INSERT INTO fichas_fts (rowid, nombre, tipo, contenido) VALUES (new.id, new.nombre, new.tipo, new.contenido);
+            END;
+            CREATE TRIGGER IF NOT EXISTS fichas_fts_borrar AFTER DELETE ON fichas BEGIN
+                INSERT INTO fichas_fts (fichas_fts, rowid, nombre, tipo, contenido)
+                VALUES ('delete', old.id, old.nombre, old.tipo, old.contenido);
+            END;
+        """)
+        if nuevo_fts:
+            # Historiales creados antes de existir el índice
+            self._conn.execute("INSERT INTO fichas_fts (fichas_fts) VALUES ('rebuild')")
+        nuevo_lab = not self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'valores_lab'"
+        ).fetchone()
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS valores_lab (
+                ficha_id INTEGER NOT NULL REFERENCES fichas(id),
+                nombre TEXT NOT NULL,
+                fecha TEXT NOT NULL,
+                analito TEXT NOT NULL,
+                valor REAL,
+                unidad TEXT,
+                estado TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_valores_lab_nombre ON valores_lab(nombre, analito, fecha);
+        """)
+        if nuevo_lab:
+            # Exámenes guardados antes de existir la tabla: se extraen de los resúmenes, sin volver al modelo
+            for ficha_id, nombre, fecha, contenido in self._conn.execute(
+                "SELECT id, nombre, fecha, contenido FROM fichas WHERE tipo = 'Exámenes' AND nombre != ''"
+            ).fetchall():
+                self._insertar_valores(ficha_id, nombre, extraer_valores(contenido, fecha))
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Versiones anteriores guardaban plazos y años como resultados ("PAP hace 3 años" -> 3): se descartan una vez
+            self._conn.execute(
+                f"DELETE FROM valores_lab WHERE valor IS NOT NULL AND analito IN ({', '.join('?' * len(CUALITATIVOS))})",
+                sorted(CUALITATIVOS),
+            )
+            self._conn.execute("PRAGMA user_version = 1")
+        self._conn.commit()
+
+    def _insertar_valores(self, ficha_id, nombre, valores):
+        self._conn.executemany(
+            "INSERT INTO valores_lab (ficha_id, nombre, fecha, analito, valor, unidad, estado) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(ficha_id, nombre, v["fecha"], v["analito"], v["valor"], v["unidad"], v["estado"]) for v in valores],
+        )
+
+    def _filas(self, sql, parametros=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, parametros)
+            filas = [dict(zip(self.COLUMNAS, fila)) for fila in cursor.fetchall()]
+        for fila in filas:
+            fila["datos"] = json.loads(fila["datos"]) if fila["datos"] else None
+        return filas
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def agregar(self, ficha):
+        """Guarda la ficha y devuelve su id.
+
+        Si trae ``origen`` y ya hay una ficha con ese origen, no se duplica: se devuelve
+        la existente. Así, repetir un paso interrumpido (un ítem de lote) es seguro.
+        """
+        datos = ficha.get("datos")
+        origen = ficha.get("origen")
+        with self._lock:
+            if origen:
+                existente = self._conn.execute("SELECT id FROM fichas WHERE origen = ?", (origen,)).fetchone()
+                if existente:
+                    return existente[0]
+            cursor = self._conn.execute(
+                "INSERT INTO fichas (nombre, rut, fecha, tipo, contenido, datos, origen) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ficha["nombre"], ficha.get("rut", ""), ficha["fecha"], ficha["tipo"], ficha["contenido"],
+                 json.dumps(datos, ensure_ascii=False) if datos else None, origen),
+            )
+            if datos and datos.get("cie10"):
+                self._conn.executemany(
+                    "INSERT INTO fichas_cie10 (ficha_id, codigo) VALUES (?, ?)",
+                    [(cursor.lastrowid, c["codigo"]) for c in datos["cie10"]],
+                )
+            if datos and datos.get("laboratorio"):
+                self._insertar_valores(cursor.lastrowid, ficha["nombre"], datos["laboratorio"])
+                self._series_lab.pop(ficha["nombre"], None)
+                if self._agenda is not None:
+                    for v in datos["laboratorio"]:
+                        self._agenda.registrar(ficha["nombre"], v["fecha"], v["analito"], v["valor"], v["unidad"], v["estado"])
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def por_paciente(self, nombre):
+        return self._filas(f"{self._SELECT} WHERE nombre = ? ORDER BY id", (nombre,))
+
+    def por_rut(self, rut):
+        return self._filas(f"{self._SELECT} WHERE rut = ? ORDER BY id", (rut,))
+
+    def por_fechas(self, desde, hasta, tipo=None):
+        # Fechas en formato ISO (AAAA-MM-DD), ambos extremos incluidos
+        sql = f"{self._SELECT} WHERE fecha BETWEEN ? AND ?"
+        parametros = [desde, hasta]
+        if tipo:
+            sql += " AND tipo = ?"
+            parametros.append(tipo)
+        return self._filas(sql + " ORDER BY fecha, id", parametros)
+
+    def por_cie10(self, prefijo):
+        # "N95" encuentra N95, N95.1, N95.9...
+        return self._filas(
+            f"{self._SELECT} WHERE id IN (SELECT ficha_id FROM fichas_cie10 WHERE codigo >= ? AND codigo < ?) "
+            "ORDER BY fecha, id",
+            (prefijo.upper(), prefijo.upper() + "\uffff"),
+        )
+
+    def buscar(self, consulta, desde=None, hasta=None, tipos=None, limite=50):
+        """Búsqueda de texto completo; admite periodos como "BI-RADS 3 últimos 6 meses".
+
+        Devuelve las fichas ordenadas por relevancia, cada una con un ``extracto``
+        que resalta los términos encontrados.
+        """
+        terminos, desde_consulta = interpretar_consulta(consulta)
+        desde = max(filter(None, (desde, desde_consulta)), default=None)
+        expresion = consulta_fts(terminos)
+        condiciones, parametros = [], []
+        if expresion:
+            condiciones.append("fichas_fts MATCH ?")
+            parametros.append(expresion)
+        if desde:
+            condiciones.append("f.fecha >= ?")
+            parametros.append(desde)
+        if hasta:
+            condiciones.append("f.fecha <= ?")
+            parametros.append(hasta)
+        if tipos:
+            condiciones.append(f"f.tipo IN ({', '.join('?' * len(tipos))})")
+            parametros.extend(tipos)
+        if not expresion and not condiciones:
+            return []
+        if expresion:
+            sql = ("SELECT f.id, f.nombre, f.rut, f.fecha, f.tipo, f.contenido, f.datos, "
+                   "snippet(fichas_fts, 2, '**', '**', '…', 16) "
+                   "FROM fichas_fts JOIN fichas f ON f.id = fichas_fts.rowid "
+                   f"WHERE {' AND '.join(condiciones)} ORDER BY rank LIMIT ?")
+        else:
+            sql = (f"SELECT f.id, f.nombre, f.rut, f.fecha, f.tipo, f.contenido, f.datos, NULL "
+                   f"FROM fichas f WHERE {' AND '.join(condiciones)} ORDER BY f.fecha DESC, f.id DESC LIMIT ?")
+        with self._lock:
+            filas = self._conn.execute(sql, parametros + [limite]).fetchall()
+        resultados = []
+        for fila in filas:
+            ficha = dict(zip(self.COLUMNAS, fila[:-1]))
+            ficha["datos"] = json.loads(ficha["datos"]) if ficha["datos"] else None
+            ficha["extracto"] = fila[-1] or ficha["contenido"][:200]
+            resultados.append(ficha)
+        return resultados
+
+    def laboratorio(self, nombre):
+        """Serie columnar de los valores de laboratorio del paciente; se reconstruye solo si llegan valores nuevos."""
+        with self._lock:
+            serie = self._series_lab.get(nombre)
+            if serie is None:
+                serie = SerieLaboratorio(self._conn.execute(
+                    "SELECT fecha, analito, valor, unidad, estado FROM valores_lab WHERE nombre = ?", (nombre,)
+                ).fetchall())
+                self._series_lab[nombre] = serie
+                if len(self._series_lab) > self.MAX_SERIES_EN_MEMORIA:
+                    self._series_lab.popitem(last=False)
+            self._series_lab.move_to_end(nombre)
+            return serie
+
+    def agenda(self):
+        """Agenda de controles de todas las pacientes; se arma una vez y luego se actualiza con cada ficha."""
+        with self._lock:
+            if self._agenda is None:
+                agenda = AgendaTamizaje()
+                # Una fila por paciente y analito: la del resultado más reciente (SQLite toma las columnas de esa fila)
+                for nombre, analito, fecha, valor, unidad, estado in self._conn.execute(
+                    "SELECT nombre, analito, MAX(fecha), valor, unidad, estado FROM valores_lab GROUP BY nombre, analito"
+                ):
+                    agenda.registrar(nombre, fecha, analito, valor, unidad, estado)
+                self._agenda = agenda
+            return self._agenda
+
+    def controles_pendientes(self, hoy=None, dias=30):
+        agenda = self.agenda()
+        with self._lock:
+            return agenda.pendientes(hoy, dias)
+
+    def controles_paciente(self, nombre, hoy=None):
+        agenda = self.agenda()
+        with self._lock:
+            return agenda.de_paciente(nombre, hoy)
+
+    def tipos(self):
+        with self._lock:
+            return [fila[0] for fila in self._conn.execute("SELECT DISTINCT tipo FROM fichas ORDER BY tipo")]
+
+    def ultima(self, nombre, tipo=None):
+        sql = f"{self._SELECT} WHERE nombre = ?"
+        parametros = [nombre]
+        if tipo:
+            sql += " AND tipo = ?"
+            parametros.append(tipo)
+        filas = self._filas(sql + " ORDER BY id DESC LIMIT 1", parametros)
+        return filas[0] if filas else None
+
+    def pacientes(self, fecha=None):
+        """Nombres con fichas; con ``fecha`` (ISO), solo los atendidos ese día (usa el índice por fecha)."""
+        sql = "SELECT DISTINCT nombre FROM fichas WHERE nombre != ''"
+        parametros = ()
+        if fecha:
+            sql += " AND fecha = ?"
+            parametros = (fecha,)
+        with self._lock:
+            return [fila[0] for fila in self._conn.execute(sql + " ORDER BY nombre", parametros)]
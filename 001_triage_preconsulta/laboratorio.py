@@ -0,0 +1,277 @@
+import calendar
+import re
+from datetime import date, timedelta
+
+import numpy as np
+
+from .recuperacion import normalizar
+
+# clave: (nombre, alias en texto normalizado, unidad habitual, mínimo, máximo)
+# Rangos de referencia de mujer adulta; None = sin límite por ese lado
+ANALITOS = {
+    "colesterol_total": ("Colesterol total", ["colesterol total", "colesterol"], "mg/dL", None, 200),
+    "hdl": ("Colesterol HDL", ["colesterol hdl", "hdl"], "mg/dL", 50, None),
+    "ldl": ("Colesterol LDL", ["colesterol ldl", "ldl"], "mg/dL", None, 130),
+    "trigliceridos": ("Triglicéridos", ["trigliceridos"], "mg/dL", None, 150),
+    "glicemia": ("Glicemia", ["glicemia", "glucemia", "glucosa", "glicemia en ayunas"], "mg/dL", 70, 100),
+    "hba1c": ("Hemoglobina glicosilada", ["hba1c", "hemoglobina glicosilada", "hemoglobina a1c"], "%", None, 5.7),
+    "tsh": ("TSH", ["tsh"], "mUI/L", 0.4, 4.5),
+    "t4_libre": ("T4 libre", ["t4 libre", "t4l"], "ng/dL", 0.8, 1.8),
+    "hemoglobina": ("Hemoglobina", ["hemoglobina", "hb"], "g/dL", 12, 16),
+    "hematocrito": ("Hematocrito", ["hematocrito", "hto", "hcto"], "%", 36, 46),
+    "leucocitos": ("Leucocitos", ["leucocitos", "recuento de leucocitos"], "/mm3", 4000, 10500),
+    "plaquetas": ("Plaquetas", ["plaquetas", "recuento de plaquetas"], "/mm3", 150000, 450000),
+    "ferritina": ("Ferritina", ["ferritina"], "ng/mL", 15, 150),
+    "vitamina_d": ("Vitamina D", ["vitamina d", "25 oh vitamina d", "25-oh vitamina d", "25(oh)d"], "ng/mL", 30, 100),
+    "creatinina": ("Creatinina", ["creatinina"], "mg/dL", 0.5, 1.1),
+    "prolactina": ("Prolactina", ["prolactina"], "ng/mL", None, 25),
+    "fsh": ("FSH", ["fsh"], "mUI/mL", None, None),
+    "lh": ("LH", ["lh"], "mUI/mL", None, None),
+    "estradiol": ("Estradiol", ["estradiol"], "pg/mL", None, None),
+    "amh": ("Hormona antimülleriana", ["amh", "hormona antimulleriana"], "ng/mL", 1, None),
+    "ca125": ("CA-125", ["ca 125", "ca-125", "ca125"], "U/mL", None, 35),
+    "bhcg": ("β-hCG", ["b-hcg", "beta hcg", "beta-hcg", "β-hcg", "bhcg", "hcg"], "mUI/mL", None, None),
+    "pap": ("Papanicolaou", ["papanicolaou", "pap"], "", None, None),
+    "mamografia": ("Mamografía", ["mamografia", "mamografia bilateral"], "", None, None),
+    "birads": ("BI-RADS", ["bi-rads", "birads", "bi rads"], "", 1, 2),
+    "dmo_tscore": ("DMO (T-score)", ["t-score", "t score", "tscore", "dmo t-score"], "", -1, None),
+    "dmo": ("Densitometría ósea", ["dmo", "densitometria", "densitometria osea"], "", None, None),
+}
+CLAVES = list(ANALITOS)
+_CODIGO = {clave: i for i, clave in enumerate(CLAVES)}
+_MINIMOS = np.array([-np.inf if a[3] is None else a[3] for a in ANALITOS.values()])
+_MAXIMOS = np.array([np.inf if a[4] is None else a[4] for a in ANALITOS.values()])
+_NEGATIVOS = {"dmo_tscore"}
+# Exámenes cuyo resultado es cualitativo: un número tras su nombre es una fecha o un plazo, no un resultado
+CUALITATIVOS = {"pap", "mamografia", "dmo"}
+
+ESTADOS_ALTERADOS = {"alterado", "alterada", "elevado", "elevada", "alto", "alta", "bajo", "baja",
+                     "disminuido", "disminuida", "positivo", "positiva", "osteopenia", "osteoporosis"}
+
+_ALIAS = {alias: clave for clave, datos in ANALITOS.items() for alias in datos[1]}
+_PATRON_ALIAS = re.compile(
+    r"(?<!\w)(" + "|".join(re.escape(a) for a in sorted(_ALIAS, key=len, reverse=True)) + r")(?!\w)"
+)
+_UNIDADES = (r"mg/dl|g/dl|ng/ml|ng/dl|pg/ml|ug/dl|[uμ]ui/ml|mui/ml|mui/l|ui/l|u/ml|ui/ml|mmol/l"
+             r"|x\s?10\^?3/[uμ]l|10\^?3/[uμ]l|mil/mm3|/mm3|/[uμ]l|%")
+# Unidades equivalentes a la de referencia; las de miles se multiplican por 1000
+_EQUIVALENTES = {"uui/ml": "mui/l", "μui/ml": "mui/l", "/ul": "/mm3", "/μl": "/mm3"}
+_MILES = re.compile(r"x?\s?10\^?3/[uμ]l|mil/mm3")
+_ESTADOS = (r"normal|alterad[oa]|elevad[oa]|alt[oa]|baj[oa]|disminuid[oa]|negativ[oa]|positiv[oa]"
+            r"|osteopenia|osteoporosis")
+# Tras el nombre del analito: un resultado cualitativo o un número (con unidad opcional)
+_VALOR = re.compile(
+    r"[\s:=]*(?:(?P<estado>" + _ESTADOS + r")(?!\w)"
+    r"|[^\d\n,;.]{0,20}?(?P<valor>-?\d{1,3}(?:\.\d{3})+(?![\d,])|-?\d+(?:[.,]\d+)?)[a-c]?\s*(?P<unidad>"
+    + _UNIDADES + r")?)"
+)
+# "hace 3 anos", "2 meses": el número es un plazo, no un resultado
+_PLAZO = re.compile(r"\s*(?:dias?|semanas?|mes(?:es)?|anos?)(?!\w)")
+# Cuándo se hizo un examen: "hace 3 años", "del 12/03/2024" o un año suelto ("PAP 2023")
+_CUANDO = (
+    r"(?:(?:realizad[oa]|hech[oa]|tomad[oa]|del?|el|en)\s+)*"
+    r"(?:hace\s+(?P<cantidad>\d+|un|una|dos|tres|cuatro|cinco)\s+(?P<plazo>dias?|semanas?|mes(?:es)?|anos?)(?!\w)"
+    r"|(?P<fecha>\d{1,2}[/-]\d{1,2}[/-](?:\d{4}|\d{2})|\d{4}-\d{2}-\d{2})(?!\d)"
+    r"|(?P<anio>(?:19|20)\d\d)(?![\d/-]))"
+)
+# Examen de tamizaje con fecha: "PAP hace 3 años", "mamografía del 12/03/2024: normal"
+_REALIZADO = re.compile(r"[\s:=(]*" + _CUANDO + r"[\s:=),]*(?:(?P<estado>" + _ESTADOS + r")(?!\w))?")
+# Fecha escrita tras un resultado numérico: "triglicéridos 150 mg/dL hace 2 meses"
+_TOMADO = re.compile(r"[\s,:=(]*" + _CUANDO)
+_CANTIDADES = {"un": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5}
+# Estado de un examen del que se sabe la fecha pero no el resultado
+REALIZADO = "realizado"
+_FECHA = re.compile(r"(?<!\d)(?:(\d{1,2})[/-](\d{1,2})[/-](\d{4}|\d{2})|(\d{4})-(\d{2})-(\d{2}))(?!\d)")
+
+
+def _fecha(coincidencia):
+    dia, mes, anio, anio_iso, mes_iso, dia_iso = coincidencia.groups()
+    try:
+        if anio_iso:
+            return date(int(anio_iso), int(mes_iso), int(dia_iso)).isoformat()
+        anio = int(anio) + (2000 if len(anio) == 2 else 0)
+        return date(anio, int(mes), int(dia)).isoformat()
+    except ValueError:
+        return None
+
+
+def _hace(dia, cantidad, plazo):
+    if plazo.startswith("dia"):
+        return dia - timedelta(days=cantidad)
+    if plazo.startswith("semana"):
+        return dia - timedelta(weeks=cantidad)
+    mes = dia.month - 1 - cantidad * (12 if plazo.startswith("ano") else 1)
+    anio, mes = dia.year + mes // 12, mes % 12 + 1
+    return dia.replace(year=anio, month=mes, day=min(dia.day, calendar.monthrange(anio, mes)[1]))
+
+
+def _cuando(coincidencia, fecha):
+    # Fecha ISO de una mención de _CUANDO; los plazos se cuentan desde ``fecha`` (la del informe) u hoy
+    base = date.fromisoformat(fecha) if fecha else date.today()
+    if coincidencia.group("fecha"):
+        return _fecha(_FECHA.fullmatch(coincidencia.group("fecha")))
+    if coincidencia.group("anio"):
+        # Del año solo se sabe el año: se toma el 1 de enero, así el control no se da por vigente de más
+        anio = int(coincidencia.group("anio"))
+        return date(anio, 1, 1).isoformat() if anio <= base.year else None
+    cantidad = coincidencia.group("cantidad")
+    cantidad = int(cantidad) if cantidad.isdigit() else _CANTIDADES[cantidad]
+    return _hace(base, cantidad, coincidencia.group("plazo")).isoformat()
+
+
+def _realizado(normalizado, inicio, fin, fecha):
+    # Fecha (y resultado, si lo hay) de un examen de tamizaje mencionado sin resultado inmediato
+    coincidencia = _REALIZADO.match(normalizado, inicio, fin)
+    cuando = _cuando(coincidencia, fecha) if coincidencia else None
+    if cuando is None:
+        return None
+    return cuando, coincidencia.group("estado") or REALIZADO
+
+
+def _numero(texto):
+    if re.fullmatch(r"-?\d{1,3}(?:\.\d{3})+", texto):
+        # 250.000 plaquetas: el punto separa miles
+        return float(texto.replace(".", ""))
+    return float(texto.replace(",", "."))
+
+
+def _es_resultado(clave, resultado, normalizado):
+    # Descarta plazos ("hace 3 años") y años sueltos ("glicemia 2021") leídos como valores
+    if clave in CUALITATIVOS or _PLAZO.match(normalizado, resultado.end("valor")):
+        return False
+    anio = re.fullmatch(r"(19|20)\d\d", resultado.group("valor"))
+    return not (anio and not resultado.group("unidad") and ANALITOS[clave][2] != "/mm3")
+
+
+def extraer_valores(texto, fecha=None):
+    """Extrae ``{analito, valor, unidad, estado, fecha}`` de resultados escritos o del texto de un PDF.
+
+    Cada valor toma la fecha escrita a continuación ("150 mg/dL hace 2 meses") o, si no
+    la hay, la última que aparece antes en el texto (la del informe), o ``fecha`` si no
+    hay ninguna. Los resultados cualitativos ("glicemia normal") llevan ``valor`` None
+    y el resultado en ``estado``. PAP, mamografía y DMO solo aceptan resultados
+    cualitativos, y un número seguido de un plazo ("hace 3 años") o un año suelto no se
+    toma como resultado. Si de esos exámenes se indica cuándo se hicieron ("PAP hace
+    3 años", "mamografía del 12/03/2024", "PAP 2023 normal") se registran con esa fecha
+    y, sin resultado, con estado ``REALIZADO``.
+    """
+    normalizado = normalizar(texto)
+    fechas = [(m.start(), _fecha(m)) for m in _FECHA.finditer(normalizado)]
+    fechas = [(posicion, f) for posicion, f in fechas if f]
+    alias = list(_PATRON_ALIAS.finditer(normalizado))
+    valores, i_fecha, fecha_actual = [], 0, fecha
+    for n, coincidencia in enumerate(alias):
+        while i_fecha < len(fechas) and fechas[i_fecha][0] < coincidencia.start():
+            fecha_actual = fechas[i_fecha][1]
+            i_fecha += 1
+        # El valor debe estar antes del siguiente analito mencionado
+        fin = alias[n + 1].start() if n + 1 < len(alias) else len(normalizado)
+        limite = min(fin, coincidencia.end() + 60)
+        clave = _ALIAS[coincidencia.group(1)]
+        if clave in CUALITATIVOS:
+            realizado = _realizado(normalizado, coincidencia.end(), limite, fecha_actual)
+            if realizado:
+                valores.append({"analito": clave, "valor": None, "unidad": "", "estado": realizado[1],
+                                "fecha": realizado[0]})
+                continue
+        resultado = _VALOR.match(normalizado, coincidencia.end(), limite)
+        if not resultado or not (resultado.group("estado") or resultado.group("valor")):
+            continue
+        if resultado.group("estado"):
+            valor, estado = None, resultado.group("estado")
+        elif not _es_resultado(clave, resultado, normalizado):
+            continue
+        else:
+            valor, estado = _numero(resultado.group("valor")), None
+            if clave not in _NEGATIVOS:
+                valor = abs(valor)
+        unidad = ANALITOS[clave][2]
+        leida = resultado.group("unidad")
+        if leida and _MILES.fullmatch(leida):
+            valor, leida = valor * 1000, "/mm3"
+        leida = _EQUIVALENTES.get(leida, leida)
+        if leida and leida != unidad.lower():
+            unidad = leida
+        tomado = _TOMADO.match(normalizado, resultado.end(), limite)
+        cuando = _cuando(tomado, fecha_actual) if tomado else None
+        valores.append({"analito": clave, "valor": valor, "unidad": unidad, "estado": estado,
+                        "fecha": cuando or fecha_actual or date.today().isoformat()})
+    return valores
+
+
+def fuera_de_rango(analito, valor, unidad, estado):
+    """Lo mismo que ``SerieLaboratorio.fuera_de_rango`` para un solo valor."""
+    if estado:
+        return estado in ESTADOS_ALTERADOS
+    _, _, habitual, minimo, maximo = ANALITOS[analito]
+    if valor is None or unidad != habitual:
+        return False
+    return (minimo is not None and valor < minimo) or (maximo is not None and valor > maximo)
+
+
+def nombre_analito(clave):
+    return ANALITOS[clave][0]
+
+
+def rango_referencia(clave):
+    _, _, unidad, minimo, maximo = ANALITOS[clave]
+    if minimo is None and maximo is None:
+        return ""
+    if minimo is None:
+        return f"≤ {maximo:g} {unidad}".strip()
+    if maximo is None:
+        return f"≥ {minimo:g} {unidad}".strip()
+    return f"{minimo:g}–{maximo:g} {unidad}".strip()
+
+
+class SerieLaboratorio:
+    """Valores de laboratorio de un paciente en columnas NumPy, ordenados por analito y fecha.
+
+    ``filas`` son tuplas ``(fecha, analito, valor, unidad, estado)``. La marca de fuera
+    de rango se calcula una vez para todas las filas al construir la serie.
+    """
+
+    def __init__(self, filas):
+        filas = sorted((f for f in filas if f[1] in _CODIGO), key=lambda f: (_CODIGO[f[1]], f[0]))
+        self.codigos = np.fromiter((_CODIGO[f[1]] for f in filas), dtype=np.int16, count=len(filas))
+        self.fechas = np.array([f[0] for f in filas], dtype="datetime64[D]")
+        self.valores = np.array([np.nan if f[2] is None else f[2] for f in filas], dtype=np.float64)
+        self.unidades = np.array([f[3] or "" for f in filas], dtype=object)
+        self.estados = np.array([f[4] or "" for f in filas], dtype=object)
+        habitual = np.array([ANALITOS[CLAVES[c]][2] for c in self.codigos], dtype=object)
+        # Solo se compara con el rango si el valor viene en la unidad de referencia
+        misma_unidad = self.unidades == habitual
+        with np.errstate(invalid="ignore"):
+            numerico = (self.valores < _MINIMOS[self.codigos]) | (self.valores > _MAXIMOS[self.codigos])
+        cualitativo = np.array([e in ESTADOS_ALTERADOS for e in self.estados], dtype=bool)
+        self.fuera_de_rango = (numerico & misma_unidad) | cualitativo
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def _tramo(self, clave):
+        codigo = _CODIGO[clave]
+        return (np.searchsorted(self.codigos, codigo, side="left"),
+                np.searchsorted(self.codigos, codigo, side="right"))
+
+    def analitos(self):
+        return [CLAVES[c] for c in np.unique(self.codigos)]
+
+    def serie(self, clave):
+        """``(fechas, valores, fuera_de_rango)`` de un analito en orden cronológico."""
+        inicio, fin = self._tramo(clave)
+        return self.fechas[inicio:fin], self.valores[inicio:fin], self.fuera_de_rango[inicio:fin]
+
+    def ultimos(self):
+        """Último resultado de cada analito, con su rango de referencia y la marca de fuera de rango."""
+        if not len(self):
+            return []
+        # Como las filas van ordenadas por (analito, fecha), el último de cada analito es el final de su tramo
+        ultimas = np.flatnonzero(np.append(self.codigos[1:] != self.codigos[:-1], True))
+        return [{
+            "analito": nombre_analito(CLAVES[self.codigos[i]]),
+            "resultado": self.estados[i] if np.isnan(self.valores[i]) else f"{self.valores[i]:g} {self.unidades[i]}".strip(),
+            "referencia": rango_referencia(CLAVES[self.codigos[i]]),
+            "fecha": str(self.fechas[i]),
+            "fuera_de_rango": bool(self.fuera_de_rango[i]),
+        } for i in ultimas]
@@ -0,0 +1,191 @@
+import asyncio
+import concurrent.futures
+import itertools
+import queue
+import random
+import threading
+import time
+
+MODELO = "gpt-4"
+
+PRIORIDAD_INTERACTIVA = 0
+PRIORIDAD_LOTE = 10
+
+# Modelos que aceptan response_format={"type": "json_object"}; con el resto el
+# formato JSON se pide solo en el prompt y se valida al parsear.
+MODELOS_JSON = {"gpt-4-turbo", "gpt-4-turbo-preview", "gpt-4o", "gpt-4o-mini", "gpt-3.5-turbo"}
+
+_FIN = object()
+
+
+class GatewayLLM:
+    """Punto único de acceso al LLM compartido entre sesiones.
+
+    Mantiene un ``AsyncOpenAI`` con pool de conexiones en un event loop propio,
+    una cola de prioridad acotada (lo interactivo adelanta a los lotes), un
+    número fijo de solicitudes simultáneas, timeouts por solicitud y reintentos
+    con backoff exponencial ante 429 y errores 5xx.
+
+    Si se entrega ``metricas`` (un ``MetricasLLM``), cada llamada registra su
+    latencia, tiempo al primer token y tokens consumidos bajo su ``funcion``.
+    """
+
+    def __init__(self, api_key, base_url=None, modelo="gpt-4", max_concurrencia=4, max_cola=256,
+                 timeout=60.0, intentos=5, espera_base=1.0, metricas=None):
+        self.modelo = modelo
+        self.metricas = metricas
+        self.timeout = timeout
+        self.intentos = intentos
+        self.espera_base = espera_base
+        self._contador = itertools.count()
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever, name="gateway-llm", daemon=True)
+        self._hilo.start()
+        asyncio.run_coroutine_threadsafe(
+            self._iniciar(api_key, base_url, max_concurrencia, max_cola), self._loop
+        ).result()
+
+    async def _iniciar(self, api_key, base_url, max_concurrencia, max_cola):
+        from openai import AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+
+        self._reintentables = (RateLimitError, InternalServerError, APIConnectionError)
+        # Un único cliente asíncrono: sus conexiones HTTP se reutilizan entre solicitudes
+        self._client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=self.timeout, max_retries=0)
+        self._cola = asyncio.PriorityQueue(maxsize=max_cola)
+        self._trabajadores = [asyncio.ensure_future(self._trabajador()) for _ in range(max_concurrencia)]
+
+    async def _trabajador(self):
+        while True:
+            _, _, tarea = await self._cola.get()
+            try:
+                await tarea()
+            except Exception:
+                pass
+            finally:
+                self._cola.task_done()
+
+    def _encolar(self, prioridad, tarea):
+        # Bloquea al llamador mientras la cola esté llena
+        asyncio.run_coroutine_threadsafe(
+            self._cola.put((prioridad, next(self._contador), tarea)), self._loop
+        ).result()
+
+    def _espera(self, error, intento):
+        espera = self.espera_base * 2 ** intento
+        respuesta = getattr(error, "response", None)
+        retry_after = respuesta.headers.get("retry-after") if respuesta is not None else None
+        if retry_after:
+            try:
+                espera = max(espera, float(retry_after))
+            except ValueError:
+                pass
+        return espera + random.uniform(0, self.espera_base)
+
+    def _mensajes(self, prompt):
+        return [{"role": "user", "content": prompt}]
+
+    def _extra(self, formato_json):
+        if formato_json and self.modelo in MODELOS_JSON:
+            return {"response_format": {"type": "json_object"}}
+        return {}
+
+    def _registrar(self, funcion, inicio, ttft=None, usage=None, error=None):
+        if self.metricas is None:
+            return
+        self.metricas.registrar(
+            funcion,
+            self.modelo,
+            latencia=time.perf_counter() - inicio,
+            ttft=ttft,
+            tokens_prompt=usage.prompt_tokens if usage else None,
+            tokens_completion=usage.completion_tokens if usage else None,
+            error=type(error).__name__ if error else None,
+        )
+
+    def completar(self, prompt, temperature=0.2, prioridad=PRIORIDAD_INTERACTIVA, funcion="general", formato_json=False):
+        resultado = concurrent.futures.Future()
+        inicio = time.perf_counter()
+
+        async def tarea():
+            for intento in range(self.intentos):
+                try:
+                    response = await self._client.chat.completions.create(
+                        model=self.modelo,
+                        messages=self._mensajes(prompt),
+                        temperature=temperature,
+                        timeout=self.timeout,
+                        **self._extra(formato_json),
+                    )
+                    self._registrar(funcion, inicio, usage=response.usage)
+                    resultado.set_result(response.choices[0].message.content.strip())
+                    return
+                except self._reintentables as e:
+                    if intento == self.intentos - 1:
+                        self._registrar(funcion, inicio, error=e)
+                        resultado.set_exception(e)
+                        return
+                    await asyncio.sleep(self._espera(e, intento))
+                except Exception as e:
+                    self._registrar(funcion, inicio, error=e)
+                    resultado.set_exception(e)
+                    return
+
+        self._encolar(prioridad, tarea)
+        return resultado.result()
+
+    def stream(self, prompt, temperature=0.2, prioridad=PRIORIDAD_INTERACTIVA, funcion="general", formato_json=False):
+        salida = queue.Queue()
+        inicio = time.perf_counter()
+
+        async def tarea():
+            ttft = None
+            usage = None
+            for intento in range(self.intentos):
+                try:
+                    respuesta = await self._client.chat.completions.create(
+                        model=self.modelo,
+                        messages=self._mensajes(prompt),
+                        temperature=temperature,
+                        timeout=self.timeout,
+                        stream=True,
+                        stream_options={"include_usage": True},
+                        **self._extra(formato_json),
+                    )
+                    async for chunk in respuesta:
+                        if chunk.usage:
+                            usage = chunk.usage
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if ttft is None:
+                                ttft = time.perf_counter() - inicio
+                            salida.put(chunk.choices[0].delta.content)
+                    self._registrar(funcion, inicio, ttft=ttft, usage=usage)
+                    salida.put(_FIN)
+                    return
+                except self._reintentables as e:
+                    # Una vez enviado texto al usuario no se puede reintentar
+                    if ttft is not None or intento == self.intentos - 1:
+                        self._registrar(funcion, inicio, ttft=ttft, error=e)
+                        salida.put(e)
+                        return
+                    await asyncio.sleep(self._espera(e, intento))
+                except Exception as e:
+                    self._registrar(funcion, inicio, ttft=ttft, error=e)
+                    salida.put(e)
+                    return
+
+        self._encolar(prioridad, tarea)
+        while True:
+            item = salida.get()
+            if item is _FIN:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+    def cerrar(self):
+        async def _cerrar():
+            for trabajador in self._trabajadores:
+                trabajador.cancel()
+            await self._client.close()
+        asyncio.run_coroutine_threadsafe(_cerrar(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,145 @@
+import csv
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from .estructurado import diagnostico_estructurado, triaje_estructurado
+from .pdf import pdf_paciente
+from .prompts import prompt_diagnostico, prompt_triaje
+
+
+def _campo(fila, clave):
+    # En JSONL los valores pueden venir como números ({"rut": 12345678}); se leen como texto
+    valor = fila.get(clave)
+    return "" if valor is None else str(valor).strip()
+
+
+def leer_pacientes(datos, nombre_archivo):
+    """Lee un CSV o JSONL con columnas ``nombre``, ``rut`` (opcional) y ``texto``."""
+    contenido = datos.decode("utf-8-sig")
+    if nombre_archivo.lower().endswith((".jsonl", ".json")):
+        filas = [json.loads(linea) for linea in contenido.splitlines() if linea.strip()]
+    else:
+        filas = list(csv.DictReader(io.StringIO(contenido)))
+    pacientes = []
+    for fila in filas:
+        texto = _campo(fila, "texto") if isinstance(fila, dict) else ""
+        if not texto:
+            continue
+        pacientes.append({"nombre": _campo(fila, "nombre"), "rut": _campo(fila, "rut"), "texto": texto})
+    return pacientes
+
+
+def id_lote(datos):
+    return hashlib.sha256(datos).hexdigest()[:16]
+
+
+def clave_paciente(paciente):
+    datos = json.dumps([paciente["nombre"], paciente["rut"], paciente["texto"]], ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+def documento_consolidado(resultado):
+    contenido = resultado["triaje"]
+    if resultado.get("diagnostico"):
+        contenido += "\n\n---\n\n🩺 Diagnóstico sugerido:\n" + resultado["diagnostico"]
+    return contenido
+
+
+class ProgresoLotes:
+    """Resultados ya obtenidos por lote, para retomar un lote interrumpido sin repetir pacientes."""
+
+    def __init__(self, ruta="lotes_triaje.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS resultados (
+                lote TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                nombre TEXT NOT NULL,
+                rut TEXT,
+                triaje TEXT NOT NULL,
+                diagnostico TEXT,
+                PRIMARY KEY (lote, clave)
+            )
+        """)
+        self._conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def guardar(self, lote, clave, paciente, triaje, diagnostico):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO resultados (lote, clave, nombre, rut, triaje, diagnostico) VALUES (?, ?, ?, ?, ?, ?)",
+                (lote, clave, paciente["nombre"], paciente["rut"], triaje, diagnostico),
+            )
+            self._conn.commit()
+
+    def resultados(self, lote):
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT clave, nombre, rut, triaje, diagnostico FROM resultados WHERE lote = ?", (lote,)
+            ).fetchall()
+        return {f[0]: {"nombre": f[1], "rut": f[2], "triaje": f[3], "diagnostico": f[4]} for f in filas}
+
+
+def procesar_lote(pacientes, lote, completar, progreso, historial, con_diagnostico=False, concurrencia=4):
+    """Genera triaje (y opcionalmente CIE-10) para los pacientes aún no procesados del lote.
+
+    ``completar(prompt, funcion)`` debe poder llamarse desde varios hilos y pedir la
+    respuesta en JSON. Devuelve un
+    generador de ``(paciente, resultado o excepción)`` a medida que termina cada uno.
+    """
+    hechos = progreso.resultados(lote)
+    pendientes = [p for p in pacientes if clave_paciente(p) not in hechos]
+
+    def procesar(paciente):
+        triaje, datos_triaje = triaje_estructurado(completar(prompt_triaje(paciente["texto"]), "triaje_lote"))
+        diagnostico, datos_dx = None, None
+        if con_diagnostico:
+            diagnostico, datos_dx = diagnostico_estructurado(completar(prompt_diagnostico(triaje), "cie10_lote"))
+        hoy = date.today().isoformat()
+        clave = clave_paciente(paciente)
+        # El historial y el progreso son bases distintas: si se corta entre ambos, al retomar
+        # el ``origen`` evita duplicar las fichas ya guardadas
+        historial.agregar({"nombre": paciente["nombre"], "rut": paciente["rut"], "fecha": hoy,
+                           "tipo": "Triaje", "contenido": triaje, "datos": datos_triaje,
+                           "origen": f"lote:{lote}:{clave}:triaje"})
+        if diagnostico:
+            historial.agregar({"nombre": paciente["nombre"], "rut": paciente["rut"], "fecha": hoy,
+                               "tipo": "Diagnóstico CIE-10", "contenido": diagnostico, "datos": datos_dx,
+                               "origen": f"lote:{lote}:{clave}:cie10"})
+        progreso.guardar(lote, clave, paciente, triaje, diagnostico)
+        return {"nombre": paciente["nombre"], "rut": paciente["rut"], "triaje": triaje, "diagnostico": diagnostico}
+
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        futuros = {pool.submit(procesar, p): p for p in pendientes}
+        for futuro in as_completed(futuros):
+            try:
+                yield futuros[futuro], futuro.result()
+            except Exception as e:
+                yield futuros[futuro], e
+
+
+def zip_pdfs(resultados):
+    # Un PDF consolidado (triaje + diagnóstico) por paciente
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archivo_zip:
+        usados = set()
+        for resultado in resultados:
+            base = "_".join((resultado["nombre"] or "paciente").split()) or "paciente"
+            nombre, n = f"{base}.pdf", 1
+            while nombre in usados:
+                n += 1
+                nombre = f"{base}_{n}.pdf"
+            usados.add(nombre)
+            archivo_zip.writestr(nombre, pdf_paciente(documento_consolidado(resultado), resultado))
+    return buffer.getvalue()
@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import time
+
+# USD por cada 1.000 tokens (prompt, completion)
+PRECIOS = {
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+}
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+
+def costo(modelo, tokens_prompt, tokens_completion):
+    precio_prompt, precio_completion = PRECIOS.get(modelo, (0.0, 0.0))
+    return (tokens_prompt or 0) / 1000 * precio_prompt + (tokens_completion or 0) / 1000 * precio_completion
+
+
+class MetricasLLM:
+    """Registro persistente de cada llamada al LLM: latencia, tiempo al primer token, tokens y caché."""
+
+    def __init__(self, ruta="metricas_llm.db"):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS llamadas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                funcion TEXT NOT NULL,
+                modelo TEXT NOT NULL,
+                latencia REAL,
+                ttft REAL,
+                tokens_prompt INTEGER,
+                tokens_completion INTEGER,
+                cache INTEGER NOT NULL DEFAULT 0,
+                error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_llamadas_funcion ON llamadas(funcion, ts);
+        """)
+        self._conn.commit()
+
+    def cerrar(self):
+        with self._lock:
+            self._conn.close()
+
+    def registrar(self, funcion, modelo, latencia=None, ttft=None, tokens_prompt=None,
+                  tokens_completion=None, cache=False, error=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO llamadas (ts, funcion, modelo, latencia, ttft, tokens_prompt, tokens_completion, cache, error) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), funcion, modelo, latencia, ttft, tokens_prompt, tokens_completion, int(cache), error),
+            )
+            self._conn.commit()
+
+    def resumen(self, desde=None):
+        sql = "SELECT funcion, modelo, latencia, ttft, tokens_prompt, tokens_completion, cache, error FROM llamadas"
+        parametros = ()
+        if desde is not None:
+            sql += " WHERE ts >= ?"
+            parametros = (desde,)
+        with self._lock:
+            filas = self._conn.execute(sql, parametros).fetchall()
+
+        grupos = {}
+        for funcion, modelo, latencia, ttft, tp, tc, cache, error in filas:
+            g = grupos.setdefault(funcion, {
+                "latencias": [], "ttfts": [], "llamadas": 0, "aciertos_cache": 0, "errores": 0,
+                "tokens_prompt": 0, "tokens_completion": 0, "costo_usd": 0.0,
+            })
+            g["llamadas"] += 1
+            if cache:
+                g["aciertos_cache"] += 1
+                continue
+            if error:
+                g["errores"] += 1
+                continue
+            if latencia is not None:
+                g["latencias"].append(latencia)
+            if ttft is not None:
+                g["ttfts"].append(ttft)
+            g["tokens_prompt"] += tp or 0
+            g["tokens_completion"] += tc or 0
+            g["costo_usd"] += costo(modelo, tp, tc)
+
+        resumen = []
+        for funcion, g in sorted(grupos.items()):
+            resumen.append({
+                "funcion": funcion,
+                "llamadas": g["llamadas"],
+                "aciertos_cache": g["aciertos_cache"],
+                "errores": g["errores"],
+                "p50_s": percentil(g["latencias"], 50),
+                "p95_s": percentil(g["latencias"], 95),
+                "p99_s": percentil(g["latencias"], 99),
+                "ttft_p50_s": percentil(g["ttfts"], 50),
+                "tokens_prompt": g["tokens_prompt"],
+                "tokens_completion": g["tokens_completion"],
+                "costo_usd": round(g["costo_usd"], 4),
+            })
+        return resumen
@@ -0,0 +1,212 @@
+import re
+from functools import lru_cache
+
+from .recuperacion import normalizar
+
+# Abreviaturas habituales en los planes de la ficha -> nombre completo del examen
+EXAMENES = {
+    "mamo": "Mamografía bilateral",
+    "mamografia": "Mamografía bilateral",
+    "eco mamaria": "Ecografía mamaria bilateral",
+    "eco mamas": "Ecografía mamaria bilateral",
+    "eco tv": "Ecografía ginecológica transvaginal",
+    "eco transvaginal": "Ecografía ginecológica transvaginal",
+    "eco gine": "Ecografía ginecológica transvaginal",
+    "dmo": "Densitometría ósea (DMO) de columna lumbar y cadera",
+    "densitometria": "Densitometría ósea (DMO) de columna lumbar y cadera",
+    "pap": "Citología cervicovaginal (Papanicolaou)",
+    "papanicolaou": "Citología cervicovaginal (Papanicolaou)",
+    "vph": "Test de VPH (virus papiloma humano)",
+    "test vph": "Test de VPH (virus papiloma humano)",
+    "colpo": "Colposcopía",
+    "colposcopia": "Colposcopía",
+    "exs grales": "Exámenes generales: hemograma, perfil bioquímico, perfil lipídico, glicemia en ayunas, TSH y orina completa",
+    "exs generales": "Exámenes generales: hemograma, perfil bioquímico, perfil lipídico, glicemia en ayunas, TSH y orina completa",
+    "examenes generales": "Exámenes generales: hemograma, perfil bioquímico, perfil lipídico, glicemia en ayunas, TSH y orina completa",
+    "hemograma": "Hemograma",
+    "perfil lipidico": "Perfil lipídico",
+    "perfil bioquimico": "Perfil bioquímico",
+    "glicemia": "Glicemia en ayunas",
+    "hba1c": "Hemoglobina glicosilada (HbA1c)",
+    "tsh": "TSH (hormona tiroestimulante)",
+    "t4l": "T4 libre",
+    "prolactina": "Prolactina",
+    "fsh": "FSH (hormona folículo estimulante)",
+    "ferritina": "Ferritina",
+    "orina completa": "Orina completa",
+    "oc": "Orina completa",
+    "urocultivo": "Urocultivo",
+    "uc": "Urocultivo",
+    "bhcg": "β-hCG cuantitativa",
+    "b hcg": "β-hCG cuantitativa",
+}
+
+# "eco" a secas solo se expande si acompaña a la mamografía ("Mamo - eco")
+ECO_MAMARIA = "Ecografía mamaria bilateral"
+
+# Catálogo de fármacos: presentación ({} = concentración), unidad de la concentración, unidad de dosis
+# (singular, plural) y vía. Ni la concentración, ni la cantidad, ni la frecuencia se suponen: se toman
+# del plan o quedan para completar
+FARMACOS = {
+    "lenzetto": ("Estradiol {} mg/pulverización, spray transdérmico (Lenzetto)", "mg", ("pulverización", "pulverizaciones"),
+                 "transdérmica, en la cara interna del antebrazo"),
+    "oestrogel": ("Estradiol gel {}% (Oestrogel)", "%", ("pulsación", "pulsaciones"), "transdérmica"),
+    "estradiol gel": ("Estradiol gel {}% (Oestrogel)", "%", ("pulsación", "pulsaciones"), "transdérmica"),
+    "didrogesterona": ("Didrogesterona {} mg, comprimidos", "mg", ("comprimido", "comprimidos"), "oral"),
+    "duphaston": ("Didrogesterona {} mg, comprimidos (Duphaston)", "mg", ("comprimido", "comprimidos"), "oral"),
+    "progesterona": ("Progesterona micronizada {} mg, cápsulas", "mg", ("cápsula", "cápsulas"), "oral"),
+    "progendo": ("Progesterona micronizada {} mg, cápsulas (Progendo)", "mg", ("cápsula", "cápsulas"), "oral"),
+    "utrogestan": ("Progesterona micronizada {} mg, cápsulas (Utrogestan)", "mg", ("cápsula", "cápsulas"), "oral"),
+    "tibolona": ("Tibolona {} mg, comprimidos", "mg", ("comprimido", "comprimidos"), "oral"),
+    "acido folico": ("Ácido fólico {} mg, comprimidos", "mg", ("comprimido", "comprimidos"), "oral"),
+    "metformina": ("Metformina {} mg, comprimidos", "mg", ("comprimido", "comprimidos"), "oral"),
+}
+SIN_CONCENTRACION = "____"
+
+# Palabras que no cambian el contenido del documento
+RELLENO = {
+    "inicio", "iniciar", "inicia", "de", "del", "con", "y", "e", "mas", "terapia", "hormonal", "th", "thr", "tto",
+    "tratamiento", "solicitar", "solicito", "pedir", "se", "indica", "indico", "continuar", "mantener", "la", "el",
+}
+
+CANTIDADES = {"medio": "½", "media": "½", "un": "1", "una": "1", "uno": "1", "dos": "2", "tres": "3"}
+# Una cantidad en cifras solo se acepta pequeña y con su unidad escrita ("2 comprimidos"); un número
+# suelto ("metformina 850") puede ser dosis o concentración y se deja al modelo
+MAX_UNIDADES = 4
+# Frecuencias que se reconocen tal cual; si el plan no la indica no se completa
+FRECUENCIAS = {
+    ("al", "dia"): "al día",
+    ("diario",): "al día",
+    ("diaria",): "al día",
+    ("en", "la", "noche"): "en la noche",
+    ("cada", "noche"): "cada noche",
+    ("al", "acostarse"): "al acostarse",
+}
+
+_CONTROL = re.compile(
+    r"^(?:nuevo )?control(?: en (\d+) (dia|dias|semana|semanas|mes|meses|ano|anos))?"
+    r"(?: con (?:los )?(resultados|examenes|exs))?$"
+)
+_UNIDADES_TIEMPO = {"dia": "día", "dias": "días", "ano": "año", "anos": "años"}
+
+_LARGO_MAXIMO = max(len(alias.split()) for alias in list(EXAMENES) + list(FARMACOS))
+
+
+def _segmentos(plan):
+    plan = re.sub(r"\b1\s*/\s*2\b", "medio", plan)
+    # La coma entre dígitos es decimal ("2,5 mg"), no separa indicaciones
+    return [s.strip() for s in re.split(r"[\n/;+]|(?<!\d),|,(?!\d)", plan) if s.strip()]
+
+
+def _seguimiento(texto):
+    coincidencia = _CONTROL.match(" ".join(texto.split()))
+    if not coincidencia:
+        return None
+    numero, unidad, con = coincidencia.groups()
+    control = "Control"
+    if numero:
+        control += f" en {numero} {_UNIDADES_TIEMPO.get(unidad, unidad)}"
+    if con:
+        control += " con resultados de exámenes"
+    return control + "."
+
+
+def _receta(alias, concentracion, cantidad, frecuencia):
+    plantilla, _, (singular, plural), via = FARMACOS[alias]
+    presentacion = plantilla.format(concentracion.replace(".", ",") if concentracion else SIN_CONCENTRACION)
+    aviso = "" if concentracion else " ⚠️ Concentración no indicada en el plan: completar."
+    if cantidad is None:
+        dosis = "dosis según indicación médica"
+    else:
+        dosis = f"{cantidad} {singular if cantidad in ('½', '1') else plural}"
+    dosis = f"{dosis} {frecuencia}" if frecuencia else f"{dosis}, frecuencia según indicación médica"
+    return f"**{presentacion}** — {dosis}, vía {via}.{aviso}"
+
+
+def _cantidad(tokens, j, alias):
+    # Devuelve (cantidad o None, siguiente índice), o None si hay un número que no se puede interpretar con seguridad
+    _, _, unidades, _ = FARMACOS[alias]
+    unidades = {normalizar(u) for u in unidades}
+    siguiente = tokens[j] if j < len(tokens) else None
+    if siguiente in CANTIDADES:
+        j += 1
+        return CANTIDADES[siguiente], j + (j < len(tokens) and tokens[j] in unidades)
+    if siguiente and siguiente[0].isdigit():
+        if siguiente.isdigit() and 0 < int(siguiente) <= MAX_UNIDADES and j + 1 < len(tokens) and tokens[j + 1] in unidades:
+            return siguiente, j + 2
+        return None
+    return None, j
+
+
+def _frecuencia(tokens, j):
+    for palabras, frecuencia in FRECUENCIAS.items():
+        if tuple(tokens[j:j + len(palabras)]) == palabras:
+            return frecuencia, j + len(palabras)
+    if j + 2 < len(tokens) and tokens[j] == "cada" and tokens[j + 1].isdigit() and tokens[j + 2] == "horas":
+        return f"cada {tokens[j + 1]} horas", j + 3
+    return None, j
+
+
+def _interpretar(segmento):
+    # Devuelve (recetas, exámenes, seguimiento) o None si alguna palabra no se reconoce
+    texto = normalizar(segmento).replace("-", " ")
+    control = _seguimiento(texto)
+    if control:
+        return [], [], [control]
+    tokens = re.findall(r"\d+(?:[.,]\d+)?|%|\w+", texto)
+    recetas, examenes = [], []
+    i = 0
+    while i < len(tokens):
+        for largo in range(min(_LARGO_MAXIMO, len(tokens) - i), 0, -1):
+            alias = " ".join(tokens[i:i + largo])
+            if alias in FARMACOS:
+                j = i + largo
+                # Concentración solo si viene escrita con su unidad ("metformina 850 mg")
+                concentracion = None
+                if j + 1 < len(tokens) and tokens[j][0].isdigit() and tokens[j + 1] == FARMACOS[alias][1]:
+                    concentracion = tokens[j]
+                    j += 2
+                dosis = _cantidad(tokens, j, alias)
+                if dosis is None:
+                    return None
+                cantidad, j = dosis
+                frecuencia, j = _frecuencia(tokens, j)
+                recetas.append(_receta(alias, concentracion, cantidad, frecuencia))
+                i = j
+                break
+            if alias in EXAMENES:
+                examenes.append(EXAMENES[alias])
+                i += largo
+                break
+            if alias == "eco" and EXAMENES["mamo"] in examenes:
+                examenes.append(ECO_MAMARIA)
+                i += 1
+                break
+        else:
+            if tokens[i] not in RELLENO:
+                return None
+            i += 1
+    return recetas, examenes, []
+
+
+@lru_cache(maxsize=256)
+def renderizar_plan(plan):
+    """Expande un plan escrito en la jerga habitual a receta, órdenes y seguimiento.
+
+    Devuelve ``(documento, pendientes)``: el documento en markdown con lo reconocido y
+    las líneas que no se pudieron interpretar, para completarlas con el modelo.
+    """
+    recetas, examenes, seguimiento, pendientes = [], [], [], []
+    for segmento in _segmentos(plan):
+        interpretado = _interpretar(segmento)
+        if interpretado is None:
+            pendientes.append(segmento)
+            continue
+        recetas += interpretado[0]
+        examenes += [e for e in interpretado[1] if e not in examenes]
+        seguimiento += interpretado[2]
+    secciones = []
+    for titulo, items in (("📄 Receta médica", recetas), ("🧪 Órdenes de exámenes", examenes), ("📅 Seguimiento", seguimiento)):
+        if items:
+            secciones.append(f"### {titulo}\n" + "\n".join(f"- {item}" for item in items))
+    return "\n\n".join(secciones), tuple(pendientes)
@@ -0,0 +1,242 @@
+import os
+import re
+import zlib
+from datetime import date
+from functools import lru_cache
+
+# Primera fuente TTF disponible; PDF_FUENTE permite fijar otra (p. ej. la de la clínica)
+FUENTES_TTF = [
+    os.environ.get("PDF_FUENTE", ""),
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+    "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+]
+
+NOMBRE_CLINICA = os.environ.get("PDF_CLINICA", "Consulta ginecológica")
+
+# Caracteres que se incluyen en la fuente incrustada: latín, griego (β-hCG) y puntuación tipográfica
+REPERTORIO = "".join(chr(c) for c in (
+    *range(0x20, 0x7F), *range(0xA0, 0x180), *range(0x391, 0x3CA), *range(0x2010, 0x2027),
+    0x2030, 0x20AC, 0x2122, 0x2190, 0x2192, 0x2264, 0x2265,
+))
+
+ANCHO, ALTO = 595, 842  # A4 en puntos
+MARGEN = 56
+TAMANO_TEXTO = 11
+INTERLINEA = 1.4
+ALTO_ENCABEZADO = 40
+
+_EMOJIS = re.compile("[\U0001F000-\U0001FFFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]+")
+
+
+def limpiar_emojis(texto):
+    # Los acentos y la ñ se conservan; solo se quitan emojis y símbolos sin glifo en fuentes de texto
+    return _EMOJIS.sub("", texto)
+
+
+def _stream(diccionario, datos):
+    datos = zlib.compress(datos)
+    return b"<< " + diccionario + b" /Filter /FlateDecode /Length %d >>\nstream\n" % len(datos) + datos + b"\nendstream"
+
+
+class FuentePDF:
+    """Fuente preparada una sola vez por proceso.
+
+    Guarda los anchos y glifos de ``REPERTORIO`` y los objetos PDF de la fuente ya
+    serializados (números de objeto 3 a 7), de modo que generar un documento solo
+    requiere maquetar el texto. Sin TTF disponible se usa Helvetica con WinAnsi.
+    """
+
+    def __init__(self, ruta=None):
+        import fitz
+
+        self.ruta = ruta
+        font = fitz.Font(fontfile=ruta) if ruta else fitz.Font("helv")
+        if ruta:
+            self.codigos = {c: font.has_glyph(ord(c)) for c in REPERTORIO}
+            self.codigos = {c: gid for c, gid in self.codigos.items() if gid}
+        else:
+            self.codigos = {}
+            for c in REPERTORIO:
+                try:
+                    self.codigos[c] = c.encode("cp1252")[0]
+                except UnicodeEncodeError:
+                    pass
+        self.anchos = {c: font.glyph_advance(ord(c)) for c in self.codigos}
+        formato = "{:04X}" if ruta else "{:02X}"
+        self._tabla_hex = {ord(c): formato.format(codigo) for c, codigo in self.codigos.items()}
+        self._no_dibujables = re.compile("[^%s\n]" % re.escape("".join(self.codigos)))
+        self.objetos = self._objetos_ttf(fitz, font) if ruta else self._objetos_base14()
+
+    def _objetos_base14(self):
+        return {3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+
+    def _subconjunto(self, fitz, font):
+        # MuPDF conserva los índices de glifo al recortar la fuente, así que basta con el repertorio
+        doc = fitz.open()
+        pagina = doc.new_page()
+        escritor = fitz.TextWriter(pagina.rect)
+        escritor.append((10, 20), "".join(self.codigos), font=font, fontsize=8)
+        escritor.write_text(pagina)
+        doc.subset_fonts()
+        xref = doc.get_page_fonts(0)[0][0]
+        return doc.extract_font(xref)[3]
+
+    def _objetos_ttf(self, fitz, font):
+        # 3 fuente, 4 CIDFont, 5 descriptor, 6 archivo de fuente, 7 ToUnicode
+        try:
+            datos = self._subconjunto(fitz, font)
+        except Exception:
+            with open(self.ruta, "rb") as archivo:
+                datos = archivo.read()
+        nombre = re.sub(r"[^A-Za-z0-9-]", "", font.name) or "Fuente"
+        anchos = " ".join(f"{gid} [{self.anchos[c] * 1000:.0f}]" for c, gid in sorted(self.codigos.items(), key=lambda x: x[1]))
+        mapa = "\n".join(f"<{gid:04X}> <{ord(c):04X}>" for c, gid in self.codigos.items())
+        to_unicode = (
+            "/CIDInit /ProcSet findresource begin 12 dict begin begincmap\n"
+            "/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def\n"
+            "/CMapName /Adobe-Identity-UCS def /CMapType 2 def\n"
+            "1 begincodespacerange <0000> <FFFF> endcodespacerange\n"
+            f"{len(self.codigos)} beginbfchar\n{mapa}\nendbfchar\n"
+            "endcmap CMapName currentdict /CMap defineresource pop end end"
+        )
+        x0, y0, x1, y1 = (round(v * 1000) for v in fitz.Rect(font.bbox))
+        return {
+            3: f"<< /Type /Font /Subtype /Type0 /BaseFont /{nombre} /Encoding /Identity-H "
+               f"/DescendantFonts [4 0 R] /ToUnicode 7 0 R >>".encode(),
+            4: f"<< /Type /Font /Subtype /CIDFontType2 /BaseFont /{nombre} "
+               f"/CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> "
+               f"/FontDescriptor 5 0 R /CIDToGIDMap /Identity /DW 1000 /W [{anchos}] >>".encode(),
+            5: f"<< /Type /FontDescriptor /FontName /{nombre} /Flags 4 /FontBBox [{x0} {y0} {x1} {y1}] "
+               f"/ItalicAngle 0 /Ascent {font.ascender * 1000:.0f} /Descent {font.descender * 1000:.0f} "
+               f"/CapHeight 700 /StemV 80 /FontFile2 6 0 R >>".encode(),
+            6: _stream(b"/Length1 %d" % len(datos), datos),
+            7: _stream(b"", to_unicode.encode("ascii")),
+        }
+
+    def normalizar(self, texto):
+        # Lo que la fuente no puede dibujar se reemplaza para no romper el PDF
+        texto = texto.replace("\r", "").replace("\t", "    ")
+        return self._no_dibujables.sub("?", texto)
+
+    def hex(self, texto):
+        return "<" + texto.translate(self._tabla_hex) + ">"
+
+    def ancho(self, texto, tamano):
+        return sum(map(self.anchos.__getitem__, texto)) * tamano
+
+    def partir(self, texto, ancho_maximo, tamano):
+        # Maquetación de todo el texto de una vez: ajuste por palabras con los anchos ya calculados
+        espacio = self.anchos[" "] * tamano
+        lineas = []
+        for parrafo in texto.split("\n"):
+            actual, ancho_actual = [], 0.0
+            for palabra in parrafo.split(" "):
+                ancho_palabra = self.ancho(palabra, tamano)
+                while ancho_palabra > ancho_maximo:
+                    # Palabra más larga que la línea (URLs, códigos): se corta por caracteres
+                    if actual:
+                        lineas.append(" ".join(actual))
+                        actual, ancho_actual = [], 0.0
+                    corte = len(palabra)
+                    while corte > 1 and self.ancho(palabra[:corte], tamano) > ancho_maximo:
+                        corte -= 1
+                    lineas.append(palabra[:corte])
+                    palabra = palabra[corte:]
+                    ancho_palabra = self.ancho(palabra, tamano)
+                if actual and ancho_actual + espacio + ancho_palabra > ancho_maximo:
+                    lineas.append(" ".join(actual))
+                    actual, ancho_actual = [], 0.0
+                ancho_actual += ancho_palabra + (espacio if actual else 0)
+                actual.append(palabra)
+            lineas.append(" ".join(actual))
+        return lineas
+
+
+@lru_cache(maxsize=1)
+def fuente():
+    ruta = next((r for r in FUENTES_TTF if r and os.path.exists(r)), None)
+    return FuentePDF(ruta)
+
+
+@lru_cache(maxsize=1)
+def _plantilla_encabezado():
+    # Encabezado de la clínica como XObject (objeto 8): se serializa una vez y cada página lo reutiliza
+    f = fuente()
+    y = ALTO - 32
+    contenido = (
+        f"BT /F1 14 Tf {MARGEN} {y} Td {f.hex(f.normalizar(NOMBRE_CLINICA))} Tj ET\n"
+        f"0.4 G 0.5 w {MARGEN} {y - 8} m {ANCHO - MARGEN} {y - 8} l S"
+    )
+    return _stream(
+        f"/Type /XObject /Subtype /Form /BBox [0 0 {ANCHO} {ALTO}] /Resources << /Font << /F1 3 0 R >> >>".encode(),
+        contenido.encode("ascii"),
+    )
+
+
+def _bloque_paciente(encabezado, f):
+    # Plantilla del bloque de paciente: una línea por campo, separada del cuerpo
+    lineas = [f.normalizar(linea) for linea in encabezado.split("\n")]
+    return lineas + [""]
+
+
+def _contenido_pagina(lineas, f):
+    interlinea = TAMANO_TEXTO * INTERLINEA
+    y = ALTO - ALTO_ENCABEZADO - MARGEN / 2 - TAMANO_TEXTO
+    partes = [f"/Tpl Do\nBT /F1 {TAMANO_TEXTO} Tf {interlinea:.1f} TL {MARGEN} {y:.1f} Td"]
+    partes += [f"{f.hex(linea)} Tj T*" for linea in lineas]
+    partes.append("ET")
+    return "\n".join(partes).encode("ascii")
+
+
+def _documento(paginas):
+    f = fuente()
+    objetos = dict(f.objetos)
+    objetos[8] = _plantilla_encabezado()
+    primera = 9
+    hijos = []
+    for i, contenido in enumerate(paginas):
+        pagina, flujo = primera + 2 * i, primera + 2 * i + 1
+        hijos.append(f"{pagina} 0 R")
+        objetos[pagina] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ANCHO} {ALTO}] /Contents {flujo} 0 R "
+            f"/Resources << /Font << /F1 3 0 R >> /XObject << /Tpl 8 0 R >> >> >>"
+        ).encode()
+        objetos[flujo] = _stream(b"", contenido)
+    objetos[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[2] = f"<< /Type /Pages /Kids [{' '.join(hijos)}] /Count {len(hijos)} >>".encode()
+
+    salida = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    posiciones = {}
+    total = max(objetos) + 1
+    for numero in range(1, total):
+        posiciones[numero] = len(salida)
+        salida += b"%d 0 obj\n" % numero + objetos.get(numero, b"null") + b"\nendobj\n"
+    inicio_xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % total
+    salida += b"".join(b"%010d 00000 n \n" % posiciones[n] for n in range(1, total))
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (total, inicio_xref)
+    return bytes(salida)
+
+
+@lru_cache(maxsize=32)
+def generar_pdf(texto, encabezado=None):
+    # Genera el PDF en memoria y devuelve sus bytes
+    f = fuente()
+    lineas = _bloque_paciente(encabezado, f) if encabezado else []
+    lineas += f.partir(f.normalizar(texto), ANCHO - 2 * MARGEN, TAMANO_TEXTO)
+    por_pagina = int((ALTO - ALTO_ENCABEZADO - MARGEN / 2 - MARGEN) // (TAMANO_TEXTO * INTERLINEA))
+    paginas = [_contenido_pagina(lineas[i:i + por_pagina], f) for i in range(0, max(len(lineas), 1), por_pagina)]
+    return _documento(paginas)
+
+
+def encabezado_paciente(paciente_info):
+    return f"Paciente: {paciente_info.get('nombre', '---')}\nRUT: {paciente_info.get('rut', '---')}\nFecha: {date.today().strftime('%d-%m-%Y')}"
+
+
+def pdf_paciente(content, paciente_info=None):
+    encabezado = encabezado_paciente(paciente_info) if paciente_info else None
+    return generar_pdf(limpiar_emojis(content), encabezado)
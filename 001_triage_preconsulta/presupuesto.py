@@ -0,0 +1,186 @@
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from .prompts import prompt_combinar_resumenes, prompt_resumen_parcial
+
+CACHE_DIR = os.path.join(".cache", "resumenes")
+
+# Ventana de contexto de cada modelo (tokens)
+CONTEXTO = {
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-3.5-turbo": 16385,
+}
+# Tokens reservados para la respuesta y las instrucciones del prompt
+RESERVA = 2000
+# Rondas de combinación antes de recortar un resumen que el modelo no logra acortar
+MAX_RONDAS = 4
+TRUNCADO = "\n[… resumen recortado para respetar el límite de tokens del modelo]"
+
+
+@lru_cache(maxsize=8)
+def _codificador(modelo):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def contar_tokens(texto, modelo="gpt-4"):
+    codificador = _codificador(modelo)
+    if codificador is None:
+        # Sin tiktoken: estimación conservadora para texto en español (~3 caracteres por token)
+        return len(texto) // 3 + 1
+    return len(codificador.encode(texto, disallowed_special=()))
+
+
+def presupuesto_tokens(modelo="gpt-4"):
+    return CONTEXTO.get(modelo, 8192) - RESERVA
+
+
+def _partir_texto(texto, limite, modelo):
+    # Una página demasiado larga se corta por párrafos y, si hace falta, por palabras
+    separador = "\n" if "\n" in texto.strip() else " "
+    bloques, actual, tokens_actual = [], [], 0
+    for unidad in texto.split(separador):
+        tokens = contar_tokens(unidad, modelo) + 1
+        if tokens > limite and separador == "\n":
+            if actual:
+                bloques.append(separador.join(actual))
+                actual, tokens_actual = [], 0
+            bloques.extend(_partir_texto(unidad, limite, modelo))
+            continue
+        if actual and tokens_actual + tokens > limite:
+            bloques.append(separador.join(actual))
+            actual, tokens_actual = [], 0
+        actual.append(unidad)
+        tokens_actual += tokens
+    if actual:
+        bloques.append(separador.join(actual))
+    return bloques
+
+
+def agrupar_paginas(paginas, limite, modelo="gpt-4"):
+    """Agrupa páginas consecutivas en bloques que caben en ``limite`` tokens."""
+    bloques, actual, tokens_actual = [], [], 0
+    for pagina in paginas:
+        tokens = contar_tokens(pagina, modelo)
+        if tokens > limite:
+            if actual:
+                bloques.append("\n".join(actual))
+                actual, tokens_actual = [], 0
+            bloques.extend(_partir_texto(pagina, limite, modelo))
+            continue
+        if actual and tokens_actual + tokens > limite:
+            bloques.append("\n".join(actual))
+            actual, tokens_actual = [], 0
+        actual.append(pagina)
+        tokens_actual += tokens
+    if actual:
+        bloques.append("\n".join(actual))
+    return [b for b in bloques if b.strip()]
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _escribir(ruta, texto):
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        f.write(texto)
+    os.replace(temporal, ruta)
+
+
+def _recortar(texto, limite, modelo):
+    # Último recurso: se conserva el comienzo que cabe y se deja constancia del corte
+    bloques = _partir_texto(texto, limite - contar_tokens(TRUNCADO, modelo), modelo)
+    return (bloques[0] if bloques else "") + TRUNCADO
+
+
+def _reducir(resumenes, completar, modelo, concurrencia):
+    # Combina resúmenes parciales por grupos que caben en un prompt, hasta que el resultado cabe en el presupuesto
+    limite = presupuesto_tokens(modelo)
+    anterior = None
+    for _ in range(MAX_RONDAS):
+        texto = "\n".join(resumenes)
+        tokens = contar_tokens(texto, modelo)
+        if len(resumenes) <= 1 and tokens <= limite:
+            return texto
+        if anterior is not None and tokens >= anterior:
+            # El modelo no está acortando: otra ronda solo multiplicaría las llamadas
+            break
+        anterior = tokens
+        # agrupar_paginas corta los resúmenes que por sí solos superan el límite
+        grupos = agrupar_paginas(resumenes, limite, modelo)
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            resumenes = list(pool.map(lambda g: completar(prompt_combinar_resumenes(g), "examenes_reduce"), grupos))
+    texto = "\n".join(resumenes)
+    return texto if contar_tokens(texto, modelo) <= limite else _recortar(texto, limite, modelo)
+
+
+def resumir_documento(clave, paginas, completar, nombre="documento", modelo="gpt-4", concurrencia=4,
+                      cache_dir=CACHE_DIR):
+    """Resumen map-reduce de un documento largo, guardado por hash de contenido.
+
+    ``completar(prompt, funcion)`` debe poder llamarse desde varios hilos. Cada grupo de
+    páginas se resume en paralelo y luego los resúmenes parciales se combinan.
+    """
+    ruta = os.path.join(cache_dir, f"{clave}.txt")
+    resumen = _leer(ruta)
+    if resumen is not None:
+        return resumen
+    bloques = agrupar_paginas(paginas, presupuesto_tokens(modelo), modelo)
+    if not bloques:
+        return ""
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        parciales = list(pool.map(
+            lambda ib: completar(prompt_resumen_parcial(ib[1], nombre, ib[0] + 1, len(bloques)), "examenes_map"),
+            enumerate(bloques),
+        ))
+    resumen = _reducir(parciales, completar, modelo, concurrencia)
+    _escribir(ruta, resumen)
+    return resumen
+
+
+def preparar_entrada(documentos, texto_libre, completar, modelo="gpt-4", concurrencia=4, cache_dir=CACHE_DIR):
+    """Devuelve el texto a enviar en el prompt de exámenes respetando el presupuesto de tokens.
+
+    ``documentos`` es una lista de ``(nombre, clave, paginas)``. Si todo cabe, se usa el
+    texto completo; si no, cada documento se reemplaza por su resumen (en paralelo).
+    Devuelve ``(entrada, resumido)``.
+    """
+    completo = texto_libre.strip() + "\n" + "\n".join("\n".join(paginas) for _, _, paginas in documentos).strip()
+    if contar_tokens(completo, modelo) <= presupuesto_tokens(modelo):
+        return completo, False
+    partes = []
+    if texto_libre.strip():
+        clave = hashlib.sha256(texto_libre.encode("utf-8")).hexdigest()
+        if contar_tokens(texto_libre, modelo) > presupuesto_tokens(modelo) // 2:
+            partes.append(resumir_documento(clave, [texto_libre], completar, "resultados escritos", modelo,
+                                            concurrencia, cache_dir))
+        else:
+            partes.append(texto_libre.strip())
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resumenes = list(pool.map(
+            lambda d: resumir_documento(d[1], d[2], completar, d[0], modelo, concurrencia, cache_dir),
+            documentos,
+        ))
+    partes += [f"[{nombre}]\n{resumen}" for (nombre, _, _), resumen in zip(documentos, resumenes)]
+    entrada = "\n\n".join(partes)
+    if contar_tokens(entrada, modelo) > presupuesto_tokens(modelo):
+        entrada = _reducir(partes, completar, modelo, concurrencia)
+    return entrada, True
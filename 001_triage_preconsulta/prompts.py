@@ -0,0 +1,101 @@
+def prompt_triaje(entrada):
+    return f"""
+Eres un asistente clínico. Resume los síntomas de una paciente y genera un reporte estructurado.
+
+Responde únicamente con un objeto JSON con estas claves:
+- "edad": edad estimada en años (número) o null si no se menciona
+- "sintomas": lista de los principales síntomas
+- "antecedentes": lista de antecedentes médicos personales o familiares
+- "motivo": motivo de la consulta en una frase
+- "preguntas": lista de preguntas implícitas o explícitas de la paciente
+
+Texto:
+\"\"\"{entrada}\"\"\"
+"""
+
+
+def prompt_diagnostico(resumen):
+    return f"""
+Eres un asistente clínico que revisa un resumen de síntomas de una paciente.
+
+A partir del siguiente texto, responde únicamente con un objeto JSON con estas claves:
+- "diagnostico": un diagnóstico clínico sugerido
+- "cie10": lista con los códigos CIE-10 más probables (máximo 3), cada uno como {{"codigo": "N95.1", "descripcion": "..."}}
+
+Resumen clínico:
+{resumen}
+"""
+
+
+def prompt_ordenes(plan):
+    return f"""
+Eres un asistente médico. A partir del siguiente plan, genera:
+
+- Receta médica
+- Órdenes de exámenes
+- Seguimiento
+
+Texto:
+\"\"\"{plan}\"\"\"
+"""
+
+
+def prompt_examenes(resultados):
+    return f"""Eres un asistente clínico. Resume los resultados clínicos siguientes:
+\"\"\"{resultados}\"\"\"
+"""
+
+
+def prompt_resumen_parcial(texto, documento, parte, total):
+    return f"""Eres un asistente clínico. Este es el fragmento {parte} de {total} del documento "{documento}".
+Resume los resultados clínicos que contiene, conservando valores numéricos, unidades, fechas y hallazgos anormales.
+
+Fragmento:
+\"\"\"{texto}\"\"\"
+"""
+
+
+def prompt_combinar_resumenes(resumenes):
+    return f"""Eres un asistente clínico. Combina los siguientes resúmenes parciales de exámenes en un único resumen,
+sin repetir información y conservando valores numéricos, unidades, fechas y hallazgos anormales.
+
+Resúmenes parciales:
+\"\"\"{resumenes}\"\"\"
+"""
+
+
+def prompt_chat_pdf(contexto, pregunta):
+    return f"""
+Eres un asistente clínico. A continuación tienes fragmentos de un informe médico.
+Responde solo en base a ese contenido.
+
+INFORME:
+{contexto}
+
+PREGUNTA:
+{pregunta}
+"""
+
+
+def mensaje_reconfirmacion_local(nombre, datos):
+    # Con los campos del triaje estructurado no hace falta consultar al modelo
+    motivo = ((datos or {}).get("motivo") or "").strip().rstrip(".").strip()
+    if not motivo:
+        return None
+    motivo = motivo[0].lower() + motivo[1:]
+    return (
+        f"Hola {nombre} 😊, le escribimos de la consulta ginecológica para reconfirmar su hora de hoy "
+        f"por {motivo}. ¿Nos confirma su asistencia respondiendo este mensaje? ¡Muchas gracias!"
+    )
+
+
+def prompt_reconfirmacion(ficha):
+    return f"""
+Eres una asistente médica. A partir de esta ficha clínica, redacta un mensaje breve y cálido para reconfirmar la consulta agendada para hoy. Incluye:
+- Nombre de la paciente
+- Motivo clínico reciente
+- Solicita confirmación con tono humano, cordial y profesional.
+
+Ficha clínica:
+{ficha['contenido']}
+"""
@@ -0,0 +1,86 @@
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+
+CACHE_DIR = os.path.join(".cache", "indices")
+
+STOPWORDS = {
+    "a", "al", "algo", "con", "de", "del", "el", "en", "es", "esta", "este", "la", "las", "le", "lo",
+    "los", "me", "mi", "no", "o", "para", "por", "que", "se", "si", "su", "sus", "un", "una", "y",
+}
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    return [t for t in re.findall(r"\w+", normalizar(texto)) if t not in STOPWORDS]
+
+
+def fragmentar(texto, palabras=180, solapamiento=40):
+    tokens = texto.split()
+    if not tokens:
+        return []
+    paso = max(palabras - solapamiento, 1)
+    return [" ".join(tokens[i:i + palabras]) for i in range(0, max(len(tokens) - solapamiento, 1), paso)]
+
+
+class IndiceBM25:
+    """Índice BM25 sobre los fragmentos de un documento."""
+
+    def __init__(self, fragmentos, k1=1.5, b=0.75):
+        self.fragmentos = fragmentos
+        self.k1 = k1
+        self.b = b
+        self.frecuencias = [Counter(tokenizar(f)) for f in fragmentos]
+        self.longitudes = [sum(fr.values()) for fr in self.frecuencias]
+        self.longitud_media = (sum(self.longitudes) / len(self.longitudes)) if self.longitudes else 0.0
+        self.postings = {}
+        for i, fr in enumerate(self.frecuencias):
+            for termino in fr:
+                self.postings.setdefault(termino, []).append(i)
+
+    def _idf(self, termino):
+        n = len(self.postings.get(termino, ()))
+        return math.log(1 + (len(self.fragmentos) - n + 0.5) / (n + 0.5))
+
+    def buscar(self, consulta, k=4):
+        puntajes = Counter()
+        for termino in set(tokenizar(consulta)):
+            idf = self._idf(termino)
+            for i in self.postings.get(termino, ()):
+                tf = self.frecuencias[i][termino]
+                norma = 1 - self.b + self.b * self.longitudes[i] / (self.longitud_media or 1)
+                puntajes[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norma)
+        mejores = [i for i, _ in puntajes.most_common(k)]
+        # Conservar el orden original del documento
+        return [self.fragmentos[i] for i in sorted(mejores)]
+
+    def a_json(self):
+        return {"fragmentos": self.fragmentos, "k1": self.k1, "b": self.b}
+
+    @classmethod
+    def desde_json(cls, datos):
+        return cls(datos["fragmentos"], datos["k1"], datos["b"])
+
+
+def indice_documento(clave, texto, cache_dir=CACHE_DIR):
+    """Carga el índice asociado al hash del documento o lo construye y lo guarda junto a él."""
+    ruta = os.path.join(cache_dir, f"{clave}.json")
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            return IndiceBM25.desde_json(json.load(f))
+    except (OSError, ValueError, KeyError):
+        pass
+    indice = IndiceBM25(fragmentar(texto))
+    os.makedirs(cache_dir, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(indice.a_json(), f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    return indice
@@ -0,0 +1,122 @@
+import streamlit as st
+
+from .llm_gateway import MODELO
+
+# Recursos compartidos por todas las sesiones del proceso. Cada uno se crea la
+# primera vez que se usa, de modo que las páginas que no llaman al LLM o no
+# envían correos no pagan la importación de openai, yagmail o PyMuPDF.
+
+# Recursos con hilos o conexiones abiertas, en orden de creación, para cerrarlos en cerrar_recursos
+_abiertos = []
+
+
+def _abierto(recurso):
+    _abiertos.append(recurso)
+    return recurso
+
+
+def cerrar_recursos():
+    """Cierra el gateway, la cola de correo y las bases SQLite creadas y vacía ``st.cache_resource``.
+
+    Limpiar la caché sin cerrarlos deja vivos el hilo del event loop del gateway y sus
+    clientes HTTP; sirve para recrearlos con otra configuración (benchmarks, pruebas).
+    """
+    while _abiertos:
+        recurso = _abiertos.pop()
+        if hasattr(recurso, "cerrar"):
+            recurso.cerrar()
+        else:
+            recurso.close()
+    st.cache_resource.clear()
+
+
+@st.cache_resource
+def cliente_openai():
+    from openai import OpenAI
+
+    return _abierto(OpenAI(api_key=st.secrets["OPENAI_API_KEY"], base_url=st.secrets.get("OPENAI_BASE_URL")))
+
+
+@st.cache_resource
+def obtener_cache_llm():
+    from .cache_llm import CacheLLM
+
+    return _abierto(CacheLLM(st.secrets.get("LLM_CACHE_PATH", "cache_llm.db")))
+
+
+@st.cache_resource
+def obtener_metricas():
+    from .metricas_llm import MetricasLLM
+
+    return _abierto(MetricasLLM(st.secrets.get("METRICAS_DB_PATH", "metricas_llm.db")))
+
+
+@st.cache_resource
+def obtener_gateway():
+    from .llm_gateway import GatewayLLM
+
+    return _abierto(GatewayLLM(
+        api_key=st.secrets["OPENAI_API_KEY"],
+        base_url=st.secrets.get("OPENAI_BASE_URL"),
+        modelo=MODELO,
+        max_concurrencia=int(st.secrets.get("LLM_MAX_CONCURRENCIA", 4)),
+        timeout=float(st.secrets.get("LLM_TIMEOUT", 60)),
+        metricas=obtener_metricas()
+    ))
+
+
+@st.cache_resource
+def obtener_cliente_llm():
+    from .cliente_llm import ClienteLLM
+
+    return ClienteLLM(obtener_cache_llm(), obtener_gateway(), obtener_metricas(), modelo=MODELO)
+
+
+@st.cache_resource
+def obtener_historial():
+    from .historial_db import HistorialDB
+
+    return _abierto(HistorialDB(st.secrets.get("HISTORIAL_DB_PATH", "historial.db")))
+
+
+@st.cache_resource
+def obtener_cola_correo():
+    from .cola_correo import ColaCorreo
+
+    return _abierto(ColaCorreo(
+        st.secrets.get("COLA_CORREO_PATH", "cola_correo.db"),
+        usuario=st.secrets["EMAIL_USER"],
+        password=st.secrets.get("EMAIL_PASSWORD"),
+        host=st.secrets.get("EMAIL_HOST", "smtp.gmail.com"),
+        port=st.secrets.get("EMAIL_PORT"),
+        smtp_ssl=st.secrets.get("EMAIL_SSL", True),
+        smtp_starttls=st.secrets.get("EMAIL_STARTTLS"),
+        omitir_login=st.secrets.get("EMAIL_SKIP_LOGIN", False)
+    ).iniciar())
+
+
+@st.cache_resource
+def obtener_progreso_lotes():
+    from .lote_triaje import ProgresoLotes
+
+    return _abierto(ProgresoLotes(st.secrets.get("LOTES_DB_PATH", "lotes_triaje.db")))
+
+
+@st.cache_resource
+def obtener_almacen_sesiones():
+    from .sesiones import AlmacenSesiones
+
+    mb = 2 ** 20
+    return AlmacenSesiones(
+        max_bytes_sesion=int(st.secrets.get("SESION_MAX_MB", 50)) * mb,
+        max_bytes_total=int(st.secrets.get("SESIONES_MAX_MB", 500)) * mb,
+        inactividad=int(st.secrets.get("SESION_INACTIVA_MIN", 30)) * 60
+    )
+
+
+# Los índices que nadie consulta en una hora se descartan aunque no se llegue al máximo
+@st.cache_resource(max_entries=32, ttl=3600)
+def obtener_indice_pdf(clave, _texto):
+    from .recuperacion import indice_documento
+
+    return indice_documento(clave, _texto)
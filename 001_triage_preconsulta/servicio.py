@@ -0,0 +1,183 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+from .cache_llm import CacheLLM
+from .cliente_llm import ClienteLLM
+from .estructurado import diagnostico_estructurado, triaje_estructurado
+from .extraccion_pdf import extraer_paginas, hash_contenido
+from .laboratorio import extraer_valores
+from .llm_gateway import MODELO, PRIORIDAD_INTERACTIVA, PRIORIDAD_LOTE, GatewayLLM
+from .metricas_llm import MetricasLLM
+from .ordenes import renderizar_plan
+from .pdf import pdf_paciente
+from .presupuesto import preparar_entrada
+from .prompts import prompt_diagnostico, prompt_examenes, prompt_ordenes, prompt_triaje
+
+TAREAS = ("triaje", "diagnostico", "ordenes", "examenes")
+
+
+class Asistente:
+    """Triaje, diagnóstico CIE-10, órdenes y resumen de exámenes sin Streamlit.
+
+    Usa los mismos prompts, parsers, caché de respuestas y gateway que main9.py, así que
+    una integración (API, CLI, otro sistema) obtiene los mismos resultados que la app
+    sin pagar un rerun de Streamlit por llamada. Si se indica ``historial`` (un
+    ``HistorialDB``) y la llamada trae ``paciente``, la ficha se guarda como en la app.
+    """
+
+    def __init__(self, api_key, base_url=None, modelo=MODELO, cache_path="cache_llm.db",
+                 metricas_path="metricas_llm.db", max_concurrencia=4, timeout=60.0, historial=None):
+        self.modelo = modelo
+        self.cache = CacheLLM(cache_path)
+        self.metricas = MetricasLLM(metricas_path)
+        self.gateway = GatewayLLM(api_key=api_key, base_url=base_url, modelo=modelo,
+                                  max_concurrencia=max_concurrencia, timeout=timeout, metricas=self.metricas)
+        self.cliente = ClienteLLM(self.cache, self.gateway, self.metricas, modelo)
+        self.historial = historial
+
+    @classmethod
+    def desde_entorno(cls):
+        # Mismos nombres que los secretos de la app de Streamlit
+        historial = None
+        if os.environ.get("HISTORIAL_DB_PATH"):
+            from .historial_db import HistorialDB
+
+            historial = HistorialDB(os.environ["HISTORIAL_DB_PATH"])
+        return cls(
+            api_key=os.environ["OPENAI_API_KEY"],
+            base_url=os.environ.get("OPENAI_BASE_URL"),
+            cache_path=os.environ.get("LLM_CACHE_PATH", "cache_llm.db"),
+            metricas_path=os.environ.get("METRICAS_DB_PATH", "metricas_llm.db"),
+            max_concurrencia=int(os.environ.get("LLM_MAX_CONCURRENCIA", 4)),
+            timeout=float(os.environ.get("LLM_TIMEOUT", 60)),
+            historial=historial,
+        )
+
+    def cerrar(self):
+        self.gateway.cerrar()
+
+    def completar(self, prompt, funcion="general", formato_json=False, prioridad=PRIORIDAD_INTERACTIVA,
+                  temperature=0.2):
+        return self.cliente.completar(prompt, temperature, prioridad=prioridad, funcion=funcion,
+                                      formato_json=formato_json)
+
+    def stream_prompt(self, prompt, funcion="general", formato_json=False, temperature=0.2):
+        return self.cliente.stream(prompt, temperature, funcion=funcion, formato_json=formato_json)
+
+    def _guardar(self, paciente, tipo, contenido, datos=None):
+        if self.historial is not None and paciente and paciente.get("nombre"):
+            self.historial.agregar({"nombre": paciente["nombre"], "rut": paciente.get("rut", ""),
+                                    "fecha": date.today().isoformat(), "tipo": tipo, "contenido": contenido,
+                                    "datos": datos})
+
+    # --- Tareas ---
+
+    def triaje(self, texto, paciente=None, prioridad=PRIORIDAD_INTERACTIVA):
+        respuesta = self.completar(prompt_triaje(texto), "triaje", formato_json=True, prioridad=prioridad)
+        resumen, datos = triaje_estructurado(respuesta)
+        self._guardar(paciente, "Triaje", resumen, datos)
+        return {"resumen": resumen, "datos": datos}
+
+    def diagnostico(self, resumen, paciente=None, prioridad=PRIORIDAD_INTERACTIVA):
+        respuesta = self.completar(prompt_diagnostico(resumen), "cie10", formato_json=True, prioridad=prioridad)
+        diagnostico, datos = diagnostico_estructurado(respuesta)
+        self._guardar(paciente, "Diagnóstico CIE-10", diagnostico, datos)
+        return {"diagnostico": diagnostico, "datos": datos}
+
+    def ordenes(self, plan, paciente=None, prioridad=PRIORIDAD_INTERACTIVA):
+        # Como en la app: lo reconocido se expande localmente y solo el resto va al modelo
+        documento, no_reconocidas = renderizar_plan(plan)
+        if no_reconocidas:
+            adicional = self.completar(prompt_ordenes("\n".join(no_reconocidas)), "ordenes", prioridad=prioridad)
+            documento = f"{documento}\n\n### ✍️ Otras indicaciones\n{adicional}" if documento else adicional
+        self._guardar(paciente, "Plan", documento)
+        return {"documento": documento, "local": not no_reconocidas}
+
+    def _entrada_examenes(self, texto, pdfs):
+        documentos = [(f"documento_{i + 1}.pdf", hash_contenido(datos), extraer_paginas(datos))
+                      for i, datos in enumerate(pdfs)]
+        texto_pdfs = "".join("\n".join(paginas) + "\n" for _, _, paginas in documentos)
+        valores = extraer_valores(texto + "\n" + texto_pdfs, date.today().isoformat())
+        entrada, resumido = preparar_entrada(
+            documentos, texto, lambda prompt, funcion: self.completar(prompt, funcion, prioridad=PRIORIDAD_LOTE)
+        )
+        return entrada, resumido, valores
+
+    def examenes(self, texto="", pdfs=(), paciente=None, prioridad=PRIORIDAD_INTERACTIVA):
+        """Resumen de exámenes a partir de texto escrito y/o PDF (bytes), con los valores de laboratorio detectados."""
+        if not texto.strip() and not pdfs:
+            raise ValueError("Faltan los resultados: texto o al menos un PDF")
+        entrada, resumido, valores = self._entrada_examenes(texto, pdfs)
+        resumen = self.completar(prompt_examenes(entrada), "examenes", prioridad=prioridad)
+        self._guardar(paciente, "Exámenes", resumen, {"laboratorio": valores} if valores else None)
+        return {"resumen": resumen, "resumido": resumido, "valores": valores}
+
+    def pdf(self, texto, paciente=None):
+        return pdf_paciente(texto, paciente)
+
+    # --- Streaming y lotes ---
+
+    def stream(self, tarea, paciente=None, **entrada):
+        """Fragmentos de la respuesta del modelo a medida que llegan.
+
+        En triaje y diagnóstico los fragmentos forman el JSON que devuelve el modelo; en
+        órdenes se entrega primero la parte expandida localmente. Con ``paciente``, al
+        terminar la respuesta se guarda la misma ficha que guardaría ``ejecutar``.
+        """
+        partes = []
+        if tarea == "triaje":
+            for fragmento in self.stream_prompt(prompt_triaje(entrada["texto"]), "triaje", formato_json=True):
+                partes.append(fragmento)
+                yield fragmento
+            resumen, datos = triaje_estructurado("".join(partes))
+            self._guardar(paciente, "Triaje", resumen, datos)
+        elif tarea == "diagnostico":
+            for fragmento in self.stream_prompt(prompt_diagnostico(entrada["resumen"]), "cie10", formato_json=True):
+                partes.append(fragmento)
+                yield fragmento
+            diagnostico, datos = diagnostico_estructurado("".join(partes))
+            self._guardar(paciente, "Diagnóstico CIE-10", diagnostico, datos)
+        elif tarea == "ordenes":
+            documento, no_reconocidas = renderizar_plan(entrada["plan"])
+            if documento:
+                partes.append(documento)
+                yield documento
+            if no_reconocidas:
+                if documento:
+                    partes.append("\n\n### ✍️ Otras indicaciones\n")
+                    yield partes[-1]
+                for fragmento in self.stream_prompt(prompt_ordenes("\n".join(no_reconocidas)), "ordenes"):
+                    partes.append(fragmento)
+                    yield fragmento
+            self._guardar(paciente, "Plan", "".join(partes).strip())
+        elif tarea == "examenes":
+            texto, pdfs = entrada.get("texto", ""), entrada.get("pdfs", ())
+            if not texto.strip() and not pdfs:
+                raise ValueError("Faltan los resultados: texto o al menos un PDF")
+            entrada_final, _, valores = self._entrada_examenes(texto, pdfs)
+            for fragmento in self.stream_prompt(prompt_examenes(entrada_final), "examenes"):
+                partes.append(fragmento)
+                yield fragmento
+            self._guardar(paciente, "Exámenes", "".join(partes).strip(), {"laboratorio": valores} if valores else None)
+        else:
+            raise ValueError(f"Tarea desconocida: {tarea}")
+
+    def ejecutar(self, tarea, entrada, prioridad=PRIORIDAD_INTERACTIVA):
+        if tarea not in TAREAS:
+            raise ValueError(f"Tarea desconocida: {tarea}")
+        return getattr(self, tarea)(**entrada, prioridad=prioridad)
+
+    def lote(self, tarea, entradas, concurrencia=4):
+        """Ejecuta ``tarea`` para cada entrada (dicts con los mismos argumentos que el método).
+
+        Genera ``(indice, resultado o excepción)`` a medida que termina cada una; los
+        lotes ceden el paso a las llamadas interactivas en el gateway.
+        """
+        with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+            futuros = {pool.submit(self.ejecutar, tarea, entrada, PRIORIDAD_LOTE): i for i, entrada in enumerate(entradas)}
+            for futuro in as_completed(futuros):
+                try:
+                    yield futuros[futuro], futuro.result()
+                except Exception as e:
+                    yield futuros[futuro], e
@@ -0,0 +1,112 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+def tamano(texto):
+    return sys.getsizeof(texto)
+
+
+class AlmacenSesiones:
+    """Textos de documentos subidos por las sesiones, compartidos entre ellas y con memoria acotada.
+
+    Cada texto se guarda una sola vez aunque varias sesiones suban el mismo PDF; la
+    sesión solo guarda la clave (hash) en ``st.session_state``. Cada sesión tiene un
+    tope de bytes (al pasarlo se sueltan sus documentos más antiguos), el total del
+    proceso también, y las sesiones sin actividad durante ``inactividad`` segundos
+    se liberan en la siguiente limpieza.
+    """
+
+    def __init__(self, max_bytes_sesion=50 * 2 ** 20, max_bytes_total=500 * 2 ** 20, inactividad=1800,
+                 intervalo_limpieza=60):
+        self.max_bytes_sesion = max_bytes_sesion
+        self.max_bytes_total = max_bytes_total
+        self.inactividad = inactividad
+        self.intervalo_limpieza = intervalo_limpieza
+        self._lock = threading.Lock()
+        self._documentos = {}  # clave -> {"texto", "bytes", "sesiones"}
+        self._sesiones = OrderedDict()  # sesión -> {"visto", "claves": OrderedDict}, de menos a más reciente
+        self._bytes = 0
+        self._ultima_limpieza = time.monotonic()
+
+    def _sesion(self, sesion, ahora):
+        datos = self._sesiones.get(sesion)
+        if datos is None:
+            datos = self._sesiones[sesion] = {"visto": ahora, "claves": OrderedDict()}
+        datos["visto"] = ahora
+        self._sesiones.move_to_end(sesion)
+        return datos
+
+    def _soltar(self, sesion, clave):
+        self._sesiones[sesion]["claves"].pop(clave, None)
+        documento = self._documentos.get(clave)
+        if documento is None:
+            return
+        documento["sesiones"].discard(sesion)
+        if not documento["sesiones"]:
+            self._bytes -= documento["bytes"]
+            del self._documentos[clave]
+
+    def _bytes_sesion(self, sesion):
+        return sum(self._documentos[c]["bytes"] for c in self._sesiones[sesion]["claves"])
+
+    def _cerrar(self, sesion):
+        for clave in list(self._sesiones[sesion]["claves"]):
+            self._soltar(sesion, clave)
+        del self._sesiones[sesion]
+
+    def _limpiar(self, ahora):
+        # Sesiones inactivas primero; si aún se supera el total, las menos recientes
+        for sesion in [s for s, d in self._sesiones.items() if ahora - d["visto"] > self.inactividad]:
+            self._cerrar(sesion)
+        while self._bytes > self.max_bytes_total and len(self._sesiones) > 1:
+            self._cerrar(next(iter(self._sesiones)))
+        self._ultima_limpieza = ahora
+
+    def tocar(self, sesion):
+        """Marca actividad de la sesión; de paso libera, como mucho cada ``intervalo_limpieza`` s, las inactivas."""
+        ahora = time.monotonic()
+        with self._lock:
+            self._sesion(sesion, ahora)
+            if ahora - self._ultima_limpieza > self.intervalo_limpieza:
+                self._limpiar(ahora)
+
+    def guardar(self, sesion, clave, texto):
+        """Asocia el texto a la sesión. Devuelve False si por sí solo supera el tope de la sesión."""
+        bytes_texto = tamano(texto)
+        if bytes_texto > self.max_bytes_sesion:
+            return False
+        ahora = time.monotonic()
+        with self._lock:
+            datos = self._sesion(sesion, ahora)
+            documento = self._documentos.get(clave)
+            if documento is None:
+                documento = self._documentos[clave] = {"texto": texto, "bytes": bytes_texto, "sesiones": set()}
+                self._bytes += bytes_texto
+            documento["sesiones"].add(sesion)
+            datos["claves"][clave] = True
+            datos["claves"].move_to_end(clave)
+            while self._bytes_sesion(sesion) > self.max_bytes_sesion:
+                self._soltar(sesion, next(iter(datos["claves"])))
+            if self._bytes > self.max_bytes_total:
+                self._limpiar(ahora)
+        return True
+
+    def obtener(self, sesion, clave):
+        """Texto del documento o None si la sesión ya no lo tiene (por límite o por inactividad)."""
+        with self._lock:
+            datos = self._sesiones.get(sesion)
+            if datos is None or clave not in datos["claves"]:
+                return None
+            datos["claves"].move_to_end(clave)
+            return self._documentos[clave]["texto"]
+
+    def liberar(self, sesion):
+        with self._lock:
+            if sesion in self._sesiones:
+                self._cerrar(sesion)
+
+    def estadisticas(self):
+        with self._lock:
+            return {"sesiones": len(self._sesiones), "documentos": len(self._documentos), "bytes": self._bytes}
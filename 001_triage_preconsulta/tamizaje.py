@@ -0,0 +1,106 @@
+import bisect
+import os
+from datetime import date
+from functools import lru_cache
+
+from .laboratorio import fuera_de_rango
+
+RUTA_REGLAS = os.environ.get("TAMIZAJE_REGLAS") or os.path.join(os.path.dirname(__file__), "datos", "tamizaje.tsv")
+
+
+def sumar_meses(dia, meses):
+    mes = dia.month - 1 + meses
+    anio, mes = dia.year + mes // 12, mes % 12 + 1
+    for d in (dia.day, 30, 29, 28):
+        try:
+            return dia.replace(year=anio, month=mes, day=d)
+        except ValueError:
+            continue
+
+
+@lru_cache(maxsize=4)
+def cargar_reglas(ruta=RUTA_REGLAS):
+    """Lee las reglas de control: ``examen, nombre, analitos, meses, meses_si_alterado`` (TSV)."""
+    reglas = {}
+    with open(ruta, encoding="utf-8") as archivo:
+        for linea in archivo:
+            if not linea.strip() or linea.startswith("#"):
+                continue
+            examen, nombre, analitos, meses, meses_alterado = linea.rstrip("\n").split("\t")
+            reglas[examen] = {
+                "nombre": nombre,
+                "analitos": tuple(a.strip() for a in analitos.split(",")),
+                "meses": int(meses),
+                "meses_si_alterado": int(meses_alterado),
+            }
+    return reglas
+
+
+class AgendaTamizaje:
+    """Fecha del último examen de control de cada paciente y cuándo le toca el siguiente.
+
+    Se carga una vez con los últimos resultados de todo el historial y después se
+    actualiza valor a valor con ``registrar``: agregar una ficha solo toca las
+    entradas de ese paciente. Los vencimientos se mantienen ordenados, así que
+    listar los vencidos a una fecha es una búsqueda binaria.
+    """
+
+    def __init__(self, reglas=None):
+        self.reglas = reglas if reglas is not None else cargar_reglas()
+        self._examen_de = {analito: examen for examen, regla in self.reglas.items() for analito in regla["analitos"]}
+        self._ultimos = {}
+        self._vencimientos = []
+
+    def registrar(self, nombre, fecha, analito, valor=None, unidad="", estado=None):
+        examen = self._examen_de.get(analito)
+        # Solo cuenta como examen hecho si hay un resultado o al menos la constancia de que se realizó
+        if examen is None or not nombre or (valor is None and not estado):
+            return
+        clave = (nombre, examen)
+        alterado = fuera_de_rango(analito, valor, unidad, estado)
+        anterior = self._ultimos.get(clave)
+        if anterior:
+            if fecha < anterior["ultimo"]:
+                return
+            # Si el mismo día hay varios resultados del examen, basta uno alterado para adelantar el control
+            alterado = alterado or (fecha == anterior["ultimo"] and anterior["alterado"])
+            indice = bisect.bisect_left(self._vencimientos, (anterior["vence"], nombre, examen))
+            del self._vencimientos[indice]
+        regla = self.reglas[examen]
+        meses = regla["meses_si_alterado"] if alterado else regla["meses"]
+        vence = sumar_meses(date.fromisoformat(fecha), meses).isoformat()
+        self._ultimos[clave] = {"ultimo": fecha, "alterado": alterado, "vence": vence}
+        bisect.insort(self._vencimientos, (vence, nombre, examen))
+
+    def pendientes(self, hoy=None, dias=30):
+        """Controles vencidos y los que vencen en los próximos ``dias``, del más atrasado al más lejano."""
+        hoy = hoy or date.today()
+        limite = date.fromordinal(hoy.toordinal() + dias).isoformat()
+        fin = bisect.bisect_right(self._vencimientos, (limite, "\uffff"))
+        pendientes = []
+        for vence, nombre, examen in self._vencimientos[:fin]:
+            ultimo = self._ultimos[(nombre, examen)]
+            pendientes.append({
+                "nombre": nombre,
+                "examen": self.reglas[examen]["nombre"],
+                "ultimo": ultimo["ultimo"],
+                "alterado": ultimo["alterado"],
+                "vence": vence,
+                "dias": (date.fromisoformat(vence) - hoy).days,
+            })
+        return pendientes
+
+    def de_paciente(self, nombre, hoy=None):
+        hoy = hoy or date.today()
+        controles = []
+        for examen, regla in self.reglas.items():
+            ultimo = self._ultimos.get((nombre, examen))
+            if ultimo:
+                controles.append({
+                    "examen": regla["nombre"],
+                    "ultimo": ultimo["ultimo"],
+                    "alterado": ultimo["alterado"],
+                    "vence": ultimo["vence"],
+                    "dias": (date.fromisoformat(ultimo["vence"]) - hoy).days,
+                })
+        return sorted(controles, key=lambda c: c["vence"])
@@ -0,0 +1,117 @@
+import os
+import urllib.parse
+import uuid
+
+import streamlit as st
+
+from .extraccion_pdf import extraer_paginas_progresivo, ocr_disponible
+from .llm_gateway import PRIORIDAD_INTERACTIVA, PRIORIDAD_LOTE
+from .pdf import pdf_paciente
+from .recursos import obtener_almacen_sesiones, obtener_cliente_llm, obtener_cola_correo
+
+
+def id_sesion():
+    if "sesion_id" not in st.session_state:
+        st.session_state.sesion_id = uuid.uuid4().hex[:8]
+    return st.session_state.sesion_id
+
+
+def nombre_archivo_sesion(filename):
+    # Evita que sesiones concurrentes descarguen archivos con el mismo nombre
+    base, extension = os.path.splitext(filename)
+    return f"{base}_{id_sesion()}{extension}"
+
+
+def texto_documento(clave):
+    # Texto de un documento de esta sesión guardado en el almacén compartido (None si ya se liberó)
+    return obtener_almacen_sesiones().obtener(id_sesion(), clave)
+
+
+def guardar_documento(clave, texto):
+    return obtener_almacen_sesiones().guardar(id_sesion(), clave, texto)
+
+
+def descargar_pdf_button(content, filename, paciente_info=None):
+    # pdf_paciente guarda en caché los últimos PDF, así que los reruns no vuelven a maquetarlo
+    st.download_button(
+        "📄 Descargar PDF",
+        data=pdf_paciente(content, paciente_info),
+        file_name=nombre_archivo_sesion(filename),
+        mime="application/pdf",
+        key=f"descargar_{filename}"
+    )
+
+
+def enviar_por_correo(pdf, filename, destinatario):
+    # El envío real lo hace la cola en segundo plano; aquí solo se registra
+    obtener_cola_correo().encolar(
+        destinatario,
+        "Documento clínico generado",
+        "Adjunto encontrará el resumen generado por la consulta médica.",
+        adjunto=pdf,
+        nombre_adjunto=nombre_archivo_sesion(filename)
+    )
+    st.success(f"Correo a {destinatario} en cola de envío")
+
+
+def recordar_resultado(clave, contenido, filename, paciente_info=None):
+    # Lo generado queda en la sesión: los botones de descarga y correo sobreviven al rerun de su propio clic
+    st.session_state[clave] = {"contenido": contenido, "archivo": filename, "pdf": pdf_paciente(contenido, paciente_info)}
+
+
+def acciones_resultado(clave, destinatario=""):
+    # Se dibuja fuera del "if st.button('Generar…')": en el rerun del clic en "Enviar" ese botón ya es False
+    resultado = st.session_state.get(clave)
+    if not resultado:
+        return
+    st.download_button(
+        "📄 Descargar PDF",
+        data=resultado["pdf"],
+        file_name=nombre_archivo_sesion(resultado["archivo"]),
+        mime="application/pdf",
+        key=f"descargar_{resultado['archivo']}"
+    )
+    if destinatario and st.button("📤 Enviar por correo", key=f"mail_{clave}"):
+        enviar_por_correo(resultado["pdf"], resultado["archivo"], destinatario)
+
+
+def enlace_whatsapp(numero, mensaje):
+    return f"https://wa.me/{numero}?text={urllib.parse.quote(mensaje)}"
+
+
+def completar(prompt, temperature=0.2, contenedor=st, formato="markdown", usar_cache=True, funcion="general",
+              formato_json=False):
+    # Muestra la respuesta a medida que llega y devuelve el texto completo.
+    # Los prompts repetidos se sirven desde la caché local sin llamar al modelo.
+    stream = obtener_cliente_llm().stream(prompt, temperature, prioridad=PRIORIDAD_INTERACTIVA, funcion=funcion,
+                                          formato_json=formato_json, usar_cache=usar_cache)
+    if formato == "markdown":
+        return contenedor.write_stream(stream).strip()
+    placeholder = contenedor.empty()
+    partes = []
+    for fragmento in stream:
+        partes.append(fragmento)
+        placeholder.code("".join(partes), language=formato)
+    return "".join(partes).strip()
+
+
+def completar_lote(prompt, temperature=0.2, usar_cache=True, funcion="general", formato_json=False):
+    # Versión sin streaming ni llamadas a Streamlit, apta para ejecutarse en hilos.
+    # Los lotes ceden el paso a lo interactivo en el gateway.
+    return obtener_cliente_llm().completar(prompt, temperature, prioridad=PRIORIDAD_LOTE, funcion=funcion,
+                                           formato_json=formato_json, usar_cache=usar_cache)
+
+
+def leer_pdf(datos, nombre="PDF"):
+    # Extrae las páginas e informa el avance del OCR de las páginas escaneadas
+    paginas, escaneadas = {}, 0
+    estado = st.empty()
+    for indice, texto, por_ocr in extraer_paginas_progresivo(datos):
+        paginas[indice] = texto
+        if por_ocr:
+            escaneadas += 1
+            estado.caption(f"🔍 OCR de {nombre}: {escaneadas} página(s) escaneada(s) leída(s)")
+    estado.empty()
+    if escaneadas and not ocr_disponible():
+        st.warning(f"{nombre} tiene {escaneadas} página(s) escaneada(s) y Tesseract no está instalado: su texto no se pudo leer.")
+    return [paginas[i] for i in range(len(paginas))]
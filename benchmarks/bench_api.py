@@ -0,0 +1,185 @@
+"""Rendimiento de la biblioteca (``Asistente``) y de la API ASGI contra el servidor OpenAI falso.
+
+Mide solicitudes por segundo y latencias de triaje con distinta concurrencia (sin
+caché y con caché), lotes NDJSON, tiempo hasta el primer fragmento en streaming y
+PDF por segundo. Requiere uvicorn para el escenario de la API.
+
+Uso:
+    python benchmarks/bench_api.py --salida resultados_api.json
+    python benchmarks/bench_api.py --comparar base_api.json --tolerancia 0.25
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_app import PARRAFO, Resultados, comparar, core, cronometrar  # noqa: E402
+from servidor_falso import ServidorFalso  # noqa: E402
+
+_textos = count()
+
+
+def textos_unicos(n):
+    # Un texto distinto por solicitud para no medir la caché de respuestas
+    return [f"{PARRAFO} Consulta {next(_textos)}." for _ in range(n)]
+
+
+def nuevo_asistente(servidor, directorio, max_concurrencia):
+    return core.Asistente(api_key="falsa", base_url=servidor.url, cache_path=os.path.join(directorio, "cache_llm.db"),
+                          metricas_path=os.path.join(directorio, "metricas.db"), max_concurrencia=max_concurrencia)
+
+
+def rendimiento(resultados, escenario, metrica, funcion, entradas, concurrencia):
+    latencias = []
+
+    def medir(entrada):
+        latencias.append(cronometrar(lambda: funcion(entrada)))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        list(pool.map(medir, entradas))
+    resultados.agregar(escenario, f"{metrica}_c{concurrencia}", len(entradas) / (time.perf_counter() - inicio), "req/s")
+    resultados.tiempos(escenario, f"{metrica}_c{concurrencia}", latencias)
+
+
+def escenario_libreria(resultados, asistente, solicitudes, concurrencias):
+    for concurrencia in concurrencias:
+        rendimiento(resultados, "libreria", "triaje", lambda texto: asistente.triaje(texto),
+                    textos_unicos(solicitudes), concurrencia)
+    textos = textos_unicos(solicitudes)
+    for texto in textos:
+        asistente.triaje(texto)
+    rendimiento(resultados, "libreria", "triaje_cache", lambda texto: asistente.triaje(texto), textos, 4)
+
+    entradas = [{"texto": t} for t in textos_unicos(solicitudes)]
+    inicio = time.perf_counter()
+    errores = sum(isinstance(r, Exception) for _, r in asistente.lote("triaje", entradas, max(concurrencias)))
+    resultados.agregar("libreria", f"lote_triaje_c{max(concurrencias)}", len(entradas) / (time.perf_counter() - inicio), "req/s")
+    resultados.agregar("libreria", "lote_errores", errores, "n")
+    rendimiento(resultados, "libreria", "ordenes_local", lambda plan: asistente.ordenes(plan),
+                ["Hemograma\nPerfil lipídico\nTSH"] * solicitudes, 1)
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def iniciar_api(asistente):
+    import uvicorn
+
+    config = uvicorn.Config(core.crear_app(asistente), host="127.0.0.1", port=puerto_libre(), log_level="warning",
+                            lifespan="off")
+    servidor = uvicorn.Server(config)
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.01)
+    return servidor, config.port
+
+
+def post(puerto, ruta, cuerpo, primer_fragmento=False):
+    """POST y devuelve el cuerpo; con ``primer_fragmento``, también los ms hasta el primer byte."""
+    conexion = http.client.HTTPConnection("127.0.0.1", puerto, timeout=120)
+    inicio = time.perf_counter()
+    conexion.request("POST", ruta, json.dumps(cuerpo).encode(), {"content-type": "application/json"})
+    respuesta = conexion.getresponse()
+    if respuesta.status != 200:
+        raise RuntimeError(f"{ruta}: {respuesta.status} {respuesta.read()[:200]!r}")
+    primero = respuesta.read1(1)
+    ttfb = (time.perf_counter() - inicio) * 1000
+    datos = primero + respuesta.read()
+    conexion.close()
+    return (datos, ttfb) if primer_fragmento else datos
+
+
+def escenario_api(resultados, asistente, solicitudes, concurrencias):
+    servidor, puerto = iniciar_api(asistente)
+    try:
+        for concurrencia in concurrencias:
+            rendimiento(resultados, "api", "triaje", lambda texto: post(puerto, "/triaje", {"texto": texto}),
+                        textos_unicos(solicitudes), concurrencia)
+
+        entradas = [{"texto": t} for t in textos_unicos(solicitudes)]
+        inicio = time.perf_counter()
+        lineas = post(puerto, "/triaje/lote", {"entradas": entradas, "concurrencia": max(concurrencias)}).splitlines()
+        resultados.agregar("api", f"lote_triaje_c{max(concurrencias)}", len(entradas) / (time.perf_counter() - inicio), "req/s")
+        resultados.agregar("api", "lote_errores", sum(json.loads(l)["estado"] != 200 for l in lineas), "n")
+
+        ttfb, total = [], []
+        for texto in textos_unicos(min(solicitudes, 20)):
+            inicio = time.perf_counter()
+            datos, primero = post(puerto, "/triaje/stream", {"texto": texto}, primer_fragmento=True)
+            total.append((time.perf_counter() - inicio) * 1000)
+            ttfb.append(primero)
+            if b"event: fin" not in datos:
+                raise RuntimeError(f"stream sin fin: {datos[-200:]!r}")
+        resultados.tiempos("api", "stream_primer_fragmento", ttfb)
+        resultados.tiempos("api", "stream_total", total)
+
+        paciente = {"nombre": "Paciente Benchmark", "rut": "12.345.678-9"}
+        rendimiento(resultados, "api", "pdf", lambda texto: post(puerto, "/pdf", {"texto": texto, "paciente": paciente}),
+                    [PARRAFO * 20] * solicitudes, 4)
+    finally:
+        servidor.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--solicitudes", type=int, default=64, help="solicitudes por medición")
+    parser.add_argument("--concurrencias", default="1,4,16")
+    parser.add_argument("--max-concurrencia", type=int, default=16, help="llamadas simultáneas al modelo (gateway)")
+    parser.add_argument("--primer-token", type=float, default=0.05, help="latencia del servidor falso hasta el primer token (s)")
+    parser.add_argument("--por-token", type=float, default=0.002, help="latencia entre tokens (s)")
+    parser.add_argument("--escenarios", default="libreria,api")
+    parser.add_argument("--salida", help="archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    servidor = ServidorFalso(args.primer_token, args.por_token).iniciar()
+    resultados = Resultados()
+    escenarios = args.escenarios.split(",")
+    concurrencias = [int(c) for c in args.concurrencias.split(",")]
+    with tempfile.TemporaryDirectory(prefix="bench_api_") as directorio:
+        asistente = nuevo_asistente(servidor, directorio, args.max_concurrencia)
+        try:
+            if "libreria" in escenarios:
+                escenario_libreria(resultados, asistente, args.solicitudes, concurrencias)
+            if "api" in escenarios:
+                escenario_api(resultados, asistente, args.solicitudes, concurrencias)
+        finally:
+            asistente.cerrar()
+    servidor.detener()
+
+    informe = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "servidor_falso": {"primer_token_s": args.primer_token, "por_token_s": args.por_token,
+                           "solicitudes": servidor.solicitudes},
+        "metricas": resultados.metricas,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        regresiones = comparar(resultados.metricas, args.comparar, args.tolerancia)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion}")
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""Benchmarks de main9.py con AppTest y un servidor OpenAI falso.
+
+Mide el tiempo de rerun por pestaña, el rendimiento de generación y extracción de PDF,
+el historial con 10.000 fichas y varias sesiones simultáneas. Escribe los resultados en
+JSON y, con ``--comparar``, termina con código 1 si alguna métrica empeora más que la
+tolerancia respecto de una ejecución anterior.
+
+Uso:
+    python benchmarks/bench_app.py --salida resultados.json
+    python benchmarks/bench_app.py --comparar base.json --tolerancia 0.25
+"""
+import argparse
+import importlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+# Silencia los avisos de Streamlit en modo sin servidor (ScriptRunContext, use_container_width)
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from servidor_falso import ServidorFalso  # noqa: E402
+
+APP = os.path.join(RAIZ, "main9.py")
+core = importlib.import_module("001_triage_preconsulta")
+percentil = importlib.import_module("001_triage_preconsulta.metricas_llm").percentil
+
+PARRAFO = (
+    "Hemoglobina 12,5 g/dL, ferritina 9 ng/mL (baja), TSH 2,1 mUI/L. La señora Núñez refiere dolor "
+    "pélvico de 3 meses de evolución, sin fiebre. Mamografía BI-RADS 2."
+)
+
+
+class Resultados:
+    def __init__(self):
+        self.metricas = []
+
+    def agregar(self, escenario, metrica, valor, unidad):
+        self.metricas.append({"escenario": escenario, "metrica": metrica, "valor": round(valor, 3), "unidad": unidad})
+        print(f"{escenario:>14} · {metrica:<32} {valor:>10.2f} {unidad}")
+
+    def tiempos(self, escenario, metrica, muestras):
+        self.agregar(escenario, f"{metrica}_p50", statistics.median(muestras), "ms")
+        self.agregar(escenario, f"{metrica}_p95", percentil(muestras, 95), "ms")
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    funcion()
+    return (time.perf_counter() - inicio) * 1000
+
+
+def nueva_app(servidor, directorio):
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(APP, default_timeout=120)
+    app.secrets["OPENAI_API_KEY"] = "falsa"
+    app.secrets["OPENAI_BASE_URL"] = servidor.url
+    app.secrets["EMAIL_USER"] = "benchmark@example.com"
+    app.secrets["EMAIL_PASSWORD"] = "x"
+    for clave, archivo in (("HISTORIAL_DB_PATH", "historial.db"), ("LLM_CACHE_PATH", "cache_llm.db"),
+                           ("METRICAS_DB_PATH", "metricas.db"), ("COLA_CORREO_PATH", "cola_correo.db"),
+                           ("LOTES_DB_PATH", "lotes.db")):
+        app.secrets[clave] = os.path.join(directorio, archivo)
+    return app
+
+
+def reiniciar_recursos():
+    # Los recursos compartidos (historial, gateway...) se recrean con las rutas del escenario siguiente;
+    # antes se cierran, para no dejar hilos del gateway ni conexiones abiertas entre escenarios
+    core.cerrar_recursos()
+
+
+def verificar(app):
+    if app.exception:
+        raise RuntimeError(app.exception[0].value)
+
+
+def escenario_pestanas(resultados, servidor, directorio, repeticiones):
+    app = nueva_app(servidor, directorio)
+    resultados.agregar("pestanas", "primer_run", cronometrar(app.run), "ms")
+    verificar(app)
+    resultados.tiempos("pestanas", "rerun_sin_cambios", [cronometrar(app.run) for _ in range(repeticiones)])
+    app.sidebar.text_input[0].input("Paciente Benchmark").run()
+
+    muestras = {nombre: [] for nombre in ("triaje", "diagnostico", "ordenes_local", "ordenes_llm", "examenes",
+                                          "panel_paciente", "metricas")}
+    for i in range(repeticiones):
+        # Textos distintos en cada repetición para no medir la caché de respuestas
+        app.text_area(key="triaje_input").input(f"Dolor pélvico y sangrado irregular, caso {i}")
+        muestras["triaje"].append(cronometrar(app.button(key="triaje").click().run))
+        verificar(app)
+        muestras["diagnostico"].append(cronometrar(app.button(key="cie10_triaje").click().run))
+        app.text_area(key="plan_input").input(f"Mamo - eco / Dmo / Exs grales / Control en {i + 1} meses")
+        muestras["ordenes_local"].append(cronometrar(app.button(key="ordenes").click().run))
+        app.text_area(key="plan_input").input(f"Derivar a mastología, caso {i}")
+        muestras["ordenes_llm"].append(cronometrar(app.button(key="ordenes").click().run))
+        app.text_area(key="examen_input").input(f"Colesterol {200 + i} mg/dL")
+        muestras["examenes"].append(cronometrar(app.button(key="examenes").click().run))
+        muestras["panel_paciente"].append(cronometrar(app.selectbox[0].select("Paciente Benchmark").run))
+        periodo = ["Todo", "Últimos 7 días"][i % 2]
+        muestras["metricas"].append(cronometrar(app.selectbox(key="metricas_periodo").select(periodo).run))
+        verificar(app)
+    for nombre, valores in muestras.items():
+        resultados.tiempos("pestanas", nombre, valores)
+
+
+def escenario_pdf(resultados, directorio, repeticiones):
+    pdf = importlib.import_module("001_triage_preconsulta.pdf")
+    extraccion = importlib.import_module("001_triage_preconsulta.extraccion_pdf")
+
+    resultados.agregar("pdf", "preparar_fuente", cronometrar(pdf.fuente), "ms")
+    for parrafos in (10, 100):
+        texto = "\n".join([PARRAFO] * parrafos)
+        muestras = [cronometrar(lambda: pdf.generar_pdf.__wrapped__(texto, "Paciente: Benchmark")) for _ in range(repeticiones)]
+        resultados.tiempos("pdf", f"generar_{parrafos}_parrafos", muestras)
+        resultados.agregar("pdf", f"generar_{parrafos}_parrafos_por_s", 1000 / statistics.median(muestras), "docs/s")
+
+    datos = pdf.generar_pdf.__wrapped__("\n".join([PARRAFO] * 1200), "Paciente: Benchmark")
+    import fitz
+
+    with fitz.open("pdf", datos) as doc:
+        paginas = doc.page_count
+    frio = []
+    for i in range(repeticiones):
+        extraccion.limpiar_memoria()
+        frio.append(cronometrar(lambda: extraccion.extraer_paginas(datos, os.path.join(directorio, f"pdf_texto_{i}"))))
+    resultados.tiempos("pdf", f"extraer_{paginas}_paginas_sin_cache", frio)
+    resultados.agregar("pdf", "extraer_paginas_por_s", paginas * 1000 / statistics.median(frio), "paginas/s")
+    resultados.tiempos("pdf", "extraer_con_cache", [cronometrar(lambda: extraccion.extraer_paginas(datos)) for _ in range(repeticiones)])
+
+
+def poblar_historial(ruta, fichas=10000, pacientes=1000):
+    historial_db = importlib.import_module("001_triage_preconsulta.historial_db")
+    historial = historial_db.HistorialDB(ruta)
+    aleatorio = random.Random(7)
+    tipos = ["Triaje", "Diagnóstico CIE-10", "Plan", "Exámenes", "Chat PDF"]
+    hoy = date.today()
+    filas = []
+    for i in range(fichas):
+        # Una paciente concentra muchas fichas, como una paciente en control prolongado
+        nombre = "Paciente Frecuente" if i % 50 == 0 else f"Paciente {aleatorio.randrange(pacientes):04d}"
+        filas.append((nombre, "", (hoy - timedelta(days=aleatorio.randrange(730))).isoformat(),
+                      aleatorio.choice(tipos), PARRAFO))
+    with historial._lock:
+        historial._conn.executemany("INSERT INTO fichas (nombre, rut, fecha, tipo, contenido) VALUES (?, ?, ?, ?, ?)", filas)
+        historial._conn.commit()
+    return historial
+
+
+def escenario_historial(resultados, servidor, directorio, repeticiones):
+    reiniciar_recursos()
+    directorio = os.path.join(directorio, "historial_10k")
+    os.makedirs(directorio)
+    historial = poblar_historial(os.path.join(directorio, "historial.db"))
+    resultados.tiempos("historial_10k", "buscar", [cronometrar(lambda: historial.buscar("BI-RADS ferritina últimos 6 meses")) for _ in range(repeticiones)])
+    resultados.tiempos("historial_10k", "por_paciente", [cronometrar(lambda: historial.por_paciente("Paciente Frecuente")) for _ in range(repeticiones)])
+
+    app = nueva_app(servidor, directorio)
+    resultados.agregar("historial_10k", "primer_run", cronometrar(app.run), "ms")
+    verificar(app)
+    resultados.tiempos("historial_10k", "rerun", [cronometrar(app.run) for _ in range(repeticiones)])
+    resultados.tiempos("historial_10k", "sidebar_paciente",
+                       [cronometrar(app.sidebar.text_input[0].input(f"Paciente Frecuente{' ' * (i % 2)}").run) for i in range(repeticiones)])
+    resultados.tiempos("historial_10k", "panel_busqueda",
+                       [cronometrar(app.text_input(key="busqueda_historial").input(f"ferritina {i}").run) for i in range(repeticiones)])
+    verificar(app)
+
+
+def escenario_concurrencia(resultados, servidor, directorio, sesiones_por_prueba):
+    reiniciar_recursos()
+    directorio = os.path.join(directorio, "concurrencia")
+    os.makedirs(directorio)
+    for sesiones in sesiones_por_prueba:
+        latencias, errores = [], []
+        lock = threading.Lock()
+
+        def sesion(n):
+            try:
+                app = nueva_app(servidor, directorio)
+                app.run()
+                app.text_area(key="triaje_input").input(f"Sesión {sesiones}-{n}: dolor pélvico")
+                duracion = cronometrar(app.button(key="triaje").click().run)
+                verificar(app)
+                with lock:
+                    latencias.append(duracion)
+            except Exception as e:
+                with lock:
+                    errores.append(repr(e))
+
+        hilos = [threading.Thread(target=sesion, args=(n,)) for n in range(sesiones)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        total = (time.perf_counter() - inicio) * 1000
+        if latencias:
+            resultados.tiempos("concurrencia", f"triaje_{sesiones}_sesiones", latencias)
+        resultados.agregar("concurrencia", f"total_{sesiones}_sesiones", total, "ms")
+        resultados.agregar("concurrencia", f"errores_{sesiones}_sesiones", len(errores), "n")
+
+
+def comparar(actuales, ruta_base, tolerancia):
+    with open(ruta_base, encoding="utf-8") as f:
+        base = {(m["escenario"], m["metrica"]): m for m in json.load(f)["metricas"]}
+    regresiones = []
+    for m in actuales:
+        anterior = base.get((m["escenario"], m["metrica"]))
+        if not anterior or not anterior["valor"]:
+            continue
+        cambio = (m["valor"] - anterior["valor"]) / anterior["valor"]
+        # En tiempos y errores subir es peor; en rendimiento (x/s) bajar es peor
+        peor = -cambio if m["unidad"].endswith("/s") else cambio
+        if peor > tolerancia and (m["unidad"] != "n" or m["valor"] > anterior["valor"]):
+            regresiones.append(f"{m['escenario']}.{m['metrica']}: {anterior['valor']} -> {m['valor']} {m['unidad']}")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--primer-token", type=float, default=0.05, help="latencia del servidor falso hasta el primer token (s)")
+    parser.add_argument("--por-token", type=float, default=0.002, help="latencia entre tokens (s)")
+    parser.add_argument("--sesiones", default="1,4,8", help="sesiones simultáneas a probar")
+    parser.add_argument("--escenarios", default="pestanas,pdf,historial,concurrencia")
+    parser.add_argument("--salida", help="archivo JSON de resultados")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    servidor = ServidorFalso(args.primer_token, args.por_token).iniciar()
+    resultados = Resultados()
+    escenarios = args.escenarios.split(",")
+    with tempfile.TemporaryDirectory(prefix="bench_triage_") as directorio:
+        # Las cachés en disco (.cache/...) quedan dentro del directorio temporal
+        os.chdir(directorio)
+        if "pestanas" in escenarios:
+            escenario_pestanas(resultados, servidor, directorio, args.repeticiones)
+        if "pdf" in escenarios:
+            escenario_pdf(resultados, directorio, args.repeticiones)
+        if "historial" in escenarios:
+            escenario_historial(resultados, servidor, directorio, args.repeticiones)
+        if "concurrencia" in escenarios:
+            escenario_concurrencia(resultados, servidor, directorio, [int(s) for s in args.sesiones.split(",")])
+        os.chdir(RAIZ)
+    servidor.detener()
+
+    informe = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "servidor_falso": {"primer_token_s": args.primer_token, "por_token_s": args.por_token,
+                           "solicitudes": servidor.solicitudes},
+        "metricas": resultados.metricas,
+    }
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+    if args.comparar:
+        regresiones = comparar(resultados.metricas, args.comparar, args.tolerancia)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion}")
+        if regresiones:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
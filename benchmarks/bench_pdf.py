@@ -0,0 +1,79 @@
+"""Compara el motor de PDF actual con la implementación anterior basada en FPDF.
+
+Uso: python benchmarks/bench_pdf.py [--repeticiones N]
+Requiere fpdf, que ya no es dependencia de la app: poetry install --with bench
+"""
+import argparse
+import importlib
+import os
+import re
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+pdf = importlib.import_module("001_triage_preconsulta.pdf")
+
+PARRAFO = (
+    "Resumen de exámenes: hemoglobina 12,5 g/dL, ferritina 9 ng/mL (baja); β-hCG negativa. "
+    "La señora Núñez refiere dolor pélvico de 3 meses de evolución — sin fiebre ni sangrado."
+)
+ENCABEZADO = "Paciente: María José Ñúñez\nRUT: 12.345.678-9\nFecha: 01-01-2025"
+
+
+def generar_pdf_fpdf(texto, encabezado=None):
+    # Implementación anterior: fuente core "Arial" y un multi_cell por línea
+    from fpdf import FPDF
+
+    pdf_fpdf = FPDF()
+    pdf_fpdf.add_page()
+    pdf_fpdf.set_auto_page_break(auto=True, margin=15)
+    pdf_fpdf.set_font("Arial", size=12)
+    if encabezado:
+        pdf_fpdf.multi_cell(0, 10, encabezado)
+        pdf_fpdf.ln(5)
+    for line in texto.split('\n'):
+        pdf_fpdf.multi_cell(0, 10, line)
+    salida = pdf_fpdf.output(dest="S")
+    return salida.encode("latin-1") if isinstance(salida, str) else bytes(salida)
+
+
+def medir(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        salida = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos), salida
+
+
+def texto_correcto(datos):
+    import fitz
+
+    with fitz.open("pdf", datos) as doc:
+        return "Núñez" in doc[0].get_text() and "β-hCG" in doc[0].get_text()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticiones", type=int, default=20)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    pdf.fuente()
+    print(f"Preparación de la fuente (una vez por proceso): {(time.perf_counter() - inicio) * 1000:.1f} ms "
+          f"({pdf.fuente().ruta or 'Helvetica interna'})")
+    print(f"{'párrafos':>9} {'motor':>8} {'ms (mediana)':>13} {'KB':>7} {'texto correcto':>15}")
+    for parrafos in (10, 50, 300):
+        texto = "\n".join([PARRAFO] * parrafos)
+        casos = {
+            "fpdf": lambda: generar_pdf_fpdf(re.sub(r'[^\x00-\x7F]+', '', texto), ENCABEZADO),
+            "nuevo": lambda: pdf.generar_pdf.__wrapped__(texto, ENCABEZADO),
+        }
+        for nombre, funcion in casos.items():
+            ms, salida = medir(funcion, args.repeticiones)
+            print(f"{parrafos:>9} {nombre:>8} {ms:>13.2f} {len(salida) / 1024:>7.1f} {str(texto_correcto(salida)):>15}")
+
+
+if __name__ == "__main__":
+    main()
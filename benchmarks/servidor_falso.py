@@ -0,0 +1,122 @@
+"""Servidor local compatible con la API de chat de OpenAI, con latencia configurable.
+
+Responde JSON válido a los prompts de triaje y diagnóstico, y texto fijo al resto.
+Uso independiente: python benchmarks/servidor_falso.py --puerto 8001 --primer-token 0.3 --por-token 0.01
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPUESTA_TRIAJE = {
+    "edad": 45,
+    "sintomas": ["dolor pélvico", "sangrado irregular"],
+    "antecedentes": ["hipotiroidismo"],
+    "motivo": "Dolor pélvico y sangrado irregular",
+    "preguntas": ["¿Necesito una ecografía?"],
+}
+RESPUESTA_DIAGNOSTICO = {
+    "diagnostico": "Hemorragia uterina anormal",
+    "cie10": [{"codigo": "N93.9", "descripcion": "Hemorragia vaginal y uterina anormal, no especificada"}],
+}
+RESPUESTA_TEXTO = (
+    "Resumen: hemoglobina 12,5 g/dL, ferritina baja. Se sugiere control con ginecología en 2 meses "
+    "y repetir exámenes generales."
+)
+
+
+def respuesta_para(prompt):
+    if '"sintomas"' in prompt:
+        return json.dumps(RESPUESTA_TRIAJE, ensure_ascii=False)
+    if '"cie10"' in prompt:
+        return json.dumps(RESPUESTA_DIAGNOSTICO, ensure_ascii=False)
+    return RESPUESTA_TEXTO
+
+
+class _Servidor(ThreadingHTTPServer):
+    # La cola de conexiones por defecto (5) se desborda con ráfagas concurrentes y mete reintentos de ~1 s
+    request_queue_size = 128
+
+
+class ServidorFalso:
+    """Atiende /v1/chat/completions (con y sin streaming) en un hilo de fondo."""
+
+    def __init__(self, primer_token=0.0, por_token=0.0, puerto=0):
+        self.primer_token = primer_token
+        self.por_token = por_token
+        self.solicitudes = 0
+        self._lock = threading.Lock()
+        servidor = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                cuerpo = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+                with servidor._lock:
+                    servidor.solicitudes += 1
+                texto = respuesta_para(cuerpo["messages"][-1]["content"])
+                time.sleep(servidor.primer_token)
+                if cuerpo.get("stream"):
+                    self._stream(cuerpo, texto)
+                else:
+                    time.sleep(servidor.por_token * len(texto.split()))
+                    self._json({
+                        "id": "falso", "object": "chat.completion", "created": int(time.time()), "model": cuerpo["model"],
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": texto}, "finish_reason": "stop"}],
+                        "usage": {"prompt_tokens": 100, "completion_tokens": len(texto.split()), "total_tokens": 100 + len(texto.split())},
+                    })
+
+            def _json(self, datos):
+                datos = json.dumps(datos).encode()
+                self.send_response(200)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def _stream(self, cuerpo, texto):
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.send_header("connection", "close")
+                self.end_headers()
+                base = {"id": "falso", "object": "chat.completion.chunk", "created": int(time.time()), "model": cuerpo["model"]}
+                for palabra in texto.split(" "):
+                    fragmento = dict(base, choices=[{"index": 0, "delta": {"content": palabra + " "}, "finish_reason": None}])
+                    self.wfile.write(f"data: {json.dumps(fragmento)}\n\n".encode())
+                    time.sleep(servidor.por_token)
+                if (cuerpo.get("stream_options") or {}).get("include_usage"):
+                    uso = {"prompt_tokens": 100, "completion_tokens": len(texto.split()), "total_tokens": 100 + len(texto.split())}
+                    self.wfile.write(f"data: {json.dumps(dict(base, choices=[], usage=uso))}\n\n".encode())
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+        self._http = _Servidor(("127.0.0.1", puerto), Manejador)
+        self._http.daemon_threads = True
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._http.server_address[1]}/v1"
+
+    def iniciar(self):
+        threading.Thread(target=self._http.serve_forever, daemon=True).start()
+        return self
+
+    def detener(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--puerto", type=int, default=8001)
+    parser.add_argument("--primer-token", type=float, default=0.3, help="segundos hasta el primer token")
+    parser.add_argument("--por-token", type=float, default=0.01, help="segundos entre tokens")
+    args = parser.parse_args()
+    servidor = ServidorFalso(args.primer_token, args.por_token, args.puerto)
+    print(f"Servidor falso en {servidor.url}")
+    servidor._http.serve_forever()
@@ -1,8 +1,9 @@
 import streamlit as st
-from openai import OpenAI
+import importlib
 
+core = importlib.import_module("001_triage_preconsulta")
 # Configura el cliente con tu API Key
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+client = core.cliente_openai()
 
 st.set_page_config(page_title="Preconsulta Ginecológica", page_icon="🩺")
 st.title("🩺 Clasificador de síntomas para consulta ginecológica")
@@ -1,7 +1,8 @@
 import streamlit as st
-from openai import OpenAI
+import importlib
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+core = importlib.import_module("001_triage_preconsulta")
+client = core.cliente_openai()
 
 st.set_page_config(page_title="Generador de Recetas y Órdenes", page_icon="🧾")
 st.title("🧾 Generador automático de recetas y órdenes médicas")
@@ -1,38 +1,13 @@
 import streamlit as st
-from openai import OpenAI
-from fpdf import FPDF
-import base64
-import fitz  # PyMuPDF
-import re
+import importlib
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+core = importlib.import_module("001_triage_preconsulta")
+client = core.cliente_openai()
 
 st.set_page_config(page_title="Asistente Ginecológico IA", page_icon="🩺")
 st.title("🩺 Asistente clínico para ginecología")
 st.markdown("Selecciona un modo de uso:")
 
-# Función PDF común con limpieza de emojis
-def limpiar_emojis(texto):
-    return re.sub(r'[^\x00-\x7F]+', '', texto)
-
-def generar_pdf(texto, filename="documento_clinico.pdf"):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    for line in texto.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-    return filename
-
-def descargar_pdf_button(content, nombre_archivo):
-    texto_limpio = limpiar_emojis(content)
-    generar_pdf(texto_limpio, nombre_archivo)
-    with open(nombre_archivo, "rb") as f:
-        base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-        href = f'<a href="data:application/pdf;base64,{base64_pdf}" download="{nombre_archivo}">📄 Descargar PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-
 # Tabs
 
 tab1, tab2, tab3 = st.tabs([
@@ -74,7 +49,7 @@ Texto de la paciente:
             result = response.choices[0].message.content.strip()
             tab1.success("Resumen generado:")
             tab1.code(result, language="yaml")
-            descargar_pdf_button(result, "Resumen_triaje.pdf")
+            core.descargar_pdf_button(result, "Resumen_triaje.pdf")
 
 # TAB 2 - Órdenes y recetas
 tab2.subheader("🧾 Generador automático de recetas y órdenes")
@@ -106,7 +81,7 @@ Texto del plan:
             result = response.choices[0].message.content.strip()
             tab2.success("Documentos generados:")
             tab2.markdown(result)
-            descargar_pdf_button(result, "Ordenes_y_recetas.pdf")
+            core.descargar_pdf_button(result, "Ordenes_y_recetas.pdf")
 
 # TAB 3 - Exámenes previos
 tab3.subheader("📋 Resumen de exámenes previos")
@@ -127,7 +102,7 @@ Eres un asistente clínico que ayuda a una ginecóloga a revisar exámenes previ
 - DMO: interpretación y sugerencia
 - Exámenes generales: colesterol, glicemia, TSH u otros
 
-Indica si algún examen está vencido o si requiere seguimiento.
+Indica si algún resultado requiere seguimiento.
 
 Texto del paciente:
 """
@@ -141,7 +116,17 @@ Texto del paciente:
             result = response.choices[0].message.content.strip()
             tab3.success("Resumen generado:")
             tab3.markdown(result)
-            descargar_pdf_button(result, "Resumen_examenes.pdf")
+            core.descargar_pdf_button(result, "Resumen_examenes.pdf")
+            # Vencimiento de los controles calculado localmente con las reglas de tamizaje, sin pedírselo al modelo
+            agenda = core.AgendaTamizaje()
+            for valor in core.extraer_valores(user_input_examenes):
+                agenda.registrar("paciente", valor["fecha"], valor["analito"], valor["valor"], valor["unidad"], valor["estado"])
+            pendientes = agenda.pendientes()
+            if pendientes:
+                tab3.markdown("#### 📅 Controles vencidos y próximos")
+                for control in pendientes:
+                    estado = f"vencido hace {-control['dias']} días" if control["dias"] < 0 else f"vence el {control['vence']}"
+                    tab3.markdown(f"- {control['examen']}: último {control['ultimo']}, {estado}" + (" ⚠️ resultado alterado" if control["alterado"] else ""))
 
 # Subida de PDF
 tab3.markdown("---")
@@ -150,10 +135,7 @@ archivo_pdf = tab3.file_uploader("Subir examen en PDF", type=["pdf"], key="pdf_u
 
 if archivo_pdf:
     with st.spinner("Extrayendo texto del PDF..."):
-        doc = fitz.open(stream=archivo_pdf.read(), filetype="pdf")
-        texto_extraido = ""
-        for page in doc:
-            texto_extraido += page.get_text()
+        texto_extraido = core.extraer_texto(archivo_pdf.getvalue())
 
     tab3.text_area("Texto extraído del PDF:", texto_extraido, height=200, key="texto_extraido")
 
@@ -173,4 +155,4 @@ Texto del examen:
         resultado_pdf = response.choices[0].message.content.strip()
         tab3.success("Resumen del examen:")
         tab3.markdown(resultado_pdf)
-        descargar_pdf_button(resultado_pdf, "Resumen_examen_subido.pdf")
\ No newline at end of file
+        core.descargar_pdf_button(resultado_pdf, "Resumen_examen_subido.pdf")
\ No newline at end of file
@@ -1,43 +1,13 @@
 import streamlit as st
-from openai import OpenAI
-from fpdf import FPDF
-import base64
-import fitz  # PyMuPDF
-import re
-from datetime import date
+import importlib
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+core = importlib.import_module("001_triage_preconsulta")
+client = core.cliente_openai()
 
 st.set_page_config(page_title="Asistente Ginecológico IA", page_icon="🩺")
 st.title("🩺 Asistente clínico para ginecología")
 st.markdown("Selecciona un modo de uso:")
 
-# Función PDF común con limpieza de emojis y encabezado personalizado
-def limpiar_emojis(texto):
-    return re.sub(r'[^\x00-\x7F]+', '', texto)
-
-def generar_pdf(texto, filename="documento_clinico.pdf", encabezado=None):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    if encabezado:
-        pdf.multi_cell(0, 10, encabezado)
-        pdf.ln(5)
-    for line in texto.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-    return filename
-
-def descargar_pdf_button(content, nombre_archivo, paciente_info):
-    encabezado = f"Paciente: {paciente_info.get('nombre', '---')}\nRUT: {paciente_info.get('rut', '---')}\nFecha: {date.today().strftime('%d-%m-%Y')}"
-    texto_limpio = limpiar_emojis(content)
-    generar_pdf(texto_limpio, nombre_archivo, encabezado=encabezado)
-    with open(nombre_archivo, "rb") as f:
-        base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-        href = f'<a href="data:application/pdf;base64,{base64_pdf}" download="{nombre_archivo}">📄 Descargar PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-
 # Datos del paciente
 st.sidebar.markdown("### 🧍 Datos del paciente")
 nombre_paciente = st.sidebar.text_input("Nombre completo")
@@ -85,7 +55,7 @@ Texto de la paciente:
             result = response.choices[0].message.content.strip()
             tab1.success("Resumen generado:")
             tab1.code(result, language="yaml")
-            descargar_pdf_button(result, "Resumen_triaje.pdf", paciente_info)
+            core.descargar_pdf_button(result, "Resumen_triaje.pdf", paciente_info)
 
 # TAB 2 - Órdenes y recetas
 tab2.subheader("🧾 Generador automático de recetas y órdenes")
@@ -117,7 +87,7 @@ Texto del plan:
             result = response.choices[0].message.content.strip()
             tab2.success("Documentos generados:")
             tab2.markdown(result)
-            descargar_pdf_button(result, "Ordenes_y_recetas.pdf", paciente_info)
+            core.descargar_pdf_button(result, "Ordenes_y_recetas.pdf", paciente_info)
 
 # TAB 3 - Exámenes previos
 tab3.subheader("📋 Resumen de exámenes previos")
@@ -152,7 +122,7 @@ Texto del paciente:
             result = response.choices[0].message.content.strip()
             tab3.success("Resumen generado:")
             tab3.markdown(result)
-            descargar_pdf_button(result, "Resumen_examenes.pdf", paciente_info)
+            core.descargar_pdf_button(result, "Resumen_examenes.pdf", paciente_info)
 
 # Subida de PDF
 tab3.markdown("---")
@@ -161,10 +131,7 @@ archivo_pdf = tab3.file_uploader("Subir examen en PDF", type=["pdf"], key="pdf_u
 
 if archivo_pdf:
     with st.spinner("Extrayendo texto del PDF..."):
-        doc = fitz.open(stream=archivo_pdf.read(), filetype="pdf")
-        texto_extraido = ""
-        for page in doc:
-            texto_extraido += page.get_text()
+        texto_extraido = core.extraer_texto(archivo_pdf.getvalue())
 
     tab3.text_area("Texto extraído del PDF:", texto_extraido, height=200, key="texto_extraido")
 
@@ -184,4 +151,4 @@ Texto del examen:
         resultado_pdf = response.choices[0].message.content.strip()
         tab3.success("Resumen del examen:")
         tab3.markdown(resultado_pdf)
-        descargar_pdf_button(resultado_pdf, "Resumen_examen_subido.pdf", paciente_info)
+        core.descargar_pdf_button(resultado_pdf, "Resumen_examen_subido.pdf", paciente_info)
@@ -1,14 +1,9 @@
 import streamlit as st
-from openai import OpenAI
-from fpdf import FPDF
-import base64
-import fitz  # PyMuPDF
-import re
+import importlib
 from datetime import date
-import yagmail
-import traceback
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+core = importlib.import_module("001_triage_preconsulta")
+client = core.cliente_openai()
 
 st.set_page_config(page_title="Asistente Ginecológico IA", page_icon="🩺")
 st.title("🩺 Asistente clínico para ginecología")
@@ -17,45 +12,6 @@ st.markdown("Selecciona un modo de uso:")
 if "historial" not in st.session_state:
     st.session_state.historial = []
 
-def limpiar_emojis(texto):
-    return re.sub(r'[^\x00-\x7F]+', '', texto)
-
-def generar_pdf(texto, filename="documento_clinico.pdf", encabezado=None):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    if encabezado:
-        pdf.multi_cell(0, 10, encabezado)
-        pdf.ln(5)
-    for line in texto.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-    return filename
-
-def descargar_pdf_button(content, nombre_archivo, paciente_info):
-    encabezado = f"Paciente: {paciente_info.get('nombre', '---')}\nRUT: {paciente_info.get('rut', '---')}\nFecha: {date.today().strftime('%d-%m-%Y')}"
-    texto_limpio = limpiar_emojis(content)
-    generar_pdf(texto_limpio, nombre_archivo, encabezado=encabezado)
-    with open(nombre_archivo, "rb") as f:
-        base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-        href = f'<a href="data:application/pdf;base64,{base64_pdf}" download="{nombre_archivo}">📄 Descargar PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-
-def enviar_por_correo(archivo_pdf, destinatario):
-    try:
-        yag = yagmail.SMTP(user=st.secrets["EMAIL_USER"], password=st.secrets["EMAIL_PASSWORD"])
-        yag.send(
-            to=destinatario,
-            subject="Documento clínico generado",
-            contents="Adjunto encontrará el resumen generado por la consulta médica.",
-            attachments=archivo_pdf
-        )
-        st.success(f"Correo enviado a {destinatario}")
-    except Exception as e:
-        st.error(f"Error al enviar correo: {e}")
-        st.exception(traceback.format_exc())
-
 # Sidebar
 st.sidebar.markdown("### 🧍 Datos del paciente")
 nombre_paciente = st.sidebar.text_input("Nombre completo")
@@ -106,9 +62,9 @@ Texto de la paciente:
             tab1.success("Resumen generado:")
             tab1.code(result, language="yaml")
             archivo = "Resumen_triaje.pdf"
-            descargar_pdf_button(result, archivo, paciente_info)
+            core.descargar_pdf_button(result, archivo, paciente_info)
             if correo_paciente and tab1.button("📤 Enviar por correo", key="mail_triaje"):
-                enviar_por_correo(archivo, correo_paciente)
+                core.enviar_por_correo(core.pdf_paciente(result, paciente_info), archivo, correo_paciente)
             st.session_state.historial.append({
                 "nombre": nombre_paciente,
                 "rut": rut_paciente,
@@ -144,9 +100,9 @@ Texto del plan:
             tab2.success("Documentos generados:")
             tab2.markdown(result)
             archivo = "Ordenes_y_recetas.pdf"
-            descargar_pdf_button(result, archivo, paciente_info)
+            core.descargar_pdf_button(result, archivo, paciente_info)
             if correo_paciente and tab2.button("📤 Enviar por correo", key="mail_plan"):
-                enviar_por_correo(archivo, correo_paciente)
+                core.enviar_por_correo(core.pdf_paciente(result, paciente_info), archivo, correo_paciente)
             st.session_state.historial.append({
                 "nombre": nombre_paciente,
                 "rut": rut_paciente,
@@ -179,9 +135,9 @@ Texto proporcionado:
             tab3.success("Resumen generado:")
             tab3.markdown(result)
             archivo = "Resumen_examenes.pdf"
-            descargar_pdf_button(result, archivo, paciente_info)
+            core.descargar_pdf_button(result, archivo, paciente_info)
             if correo_paciente and tab3.button("📤 Enviar por correo", key="mail_exam"):
-                enviar_por_correo(archivo, correo_paciente)
+                core.enviar_por_correo(core.pdf_paciente(result, paciente_info), archivo, correo_paciente)
             st.session_state.historial.append({
                 "nombre": nombre_paciente,
                 "rut": rut_paciente,
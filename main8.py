@@ -1,14 +1,9 @@
 import streamlit as st
-from openai import OpenAI
-from fpdf import FPDF
-import base64
-import fitz
-import re
+import importlib
 from datetime import date
-import yagmail
-import traceback
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+core = importlib.import_module("001_triage_preconsulta")
+client = core.cliente_openai()
 
 st.set_page_config(page_title="Asistente Ginecológico IA", page_icon="🩺")
 st.title("🩺 Asistente clínico para ginecología")
@@ -22,45 +17,6 @@ if "pdf_texto" not in st.session_state:
     st.session_state.pdf_texto = ""
 
 # Funciones
-def limpiar_emojis(texto):
-    return re.sub(r'[^\x00-\x7F]+', '', texto)
-
-def generar_pdf(texto, filename="documento_clinico.pdf", encabezado=None):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    if encabezado:
-        pdf.multi_cell(0, 10, encabezado)
-        pdf.ln(5)
-    for line in texto.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-    return filename
-
-def descargar_pdf_button(content, filename, paciente_info):
-    encabezado = f"Paciente: {paciente_info.get('nombre', '---')}\nRUT: {paciente_info.get('rut', '---')}\nFecha: {date.today().strftime('%d-%m-%Y')}"
-    texto_limpio = limpiar_emojis(content)
-    generar_pdf(texto_limpio, filename, encabezado)
-    with open(filename, "rb") as f:
-        base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-        href = f'<a href="data:application/pdf;base64,{base64_pdf}" download="{filename}">📄 Descargar PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-
-def enviar_por_correo(filename, destinatario):
-    try:
-        yag = yagmail.SMTP(user=st.secrets["EMAIL_USER"], password=st.secrets["EMAIL_PASSWORD"])
-        yag.send(
-            to=destinatario,
-            subject="Documento clínico generado",
-            contents="Adjunto encontrará el resumen generado por la consulta médica.",
-            attachments=filename
-        )
-        st.success(f"Correo enviado a {destinatario}")
-    except Exception as e:
-        st.error(f"Error al enviar correo: {e}")
-        st.exception(traceback.format_exc())
-
 # Datos del paciente
 st.sidebar.markdown("### 🧍 Datos del paciente")
 nombre_paciente = st.sidebar.text_input("Nombre completo")
@@ -120,10 +76,10 @@ Texto:
                     resumen_completo += "\n\n---\n\n🩺 Diagnóstico sugerido:\n" + st.session_state["dx_triaje"]
 
                 archivo = "Resumen_triaje.pdf"
-                descargar_pdf_button(resumen_completo, archivo, paciente_info)
+                core.descargar_pdf_button(resumen_completo, archivo, paciente_info)
 
                 if correo_paciente and st.button("📤 Enviar por correo", key="mail_triaje"):
-                    enviar_por_correo(archivo, correo_paciente)
+                    core.enviar_por_correo(core.pdf_paciente(resumen_completo, paciente_info), archivo, correo_paciente)
 
                 st.session_state.historial.append({
                     "nombre": nombre_paciente,
@@ -194,9 +150,9 @@ Texto:
                 st.success("Documentos generados:")
                 st.markdown(resultado)
                 archivo = "Ordenes_y_recetas.pdf"
-                descargar_pdf_button(resultado, archivo, paciente_info)
+                core.descargar_pdf_button(resultado, archivo, paciente_info)
                 if correo_paciente and st.button("📤 Enviar por correo", key="mail_orden"):
-                    enviar_por_correo(archivo, correo_paciente)
+                    core.enviar_por_correo(core.pdf_paciente(resultado, paciente_info), archivo, correo_paciente)
                 st.session_state.historial.append({
                     "nombre": nombre_paciente,
                     "rut": rut_paciente,
@@ -213,10 +169,7 @@ with tab3:
     texto_extraido = ""
     if archivo_pdf_orden:
         with st.spinner("Extrayendo texto del PDF..."):
-            doc = fitz.open(stream=archivo_pdf_orden.read(), filetype="pdf")
-            texto_extraido = ""
-            for page in doc:
-                texto_extraido += page.get_text()
+            texto_extraido = core.extraer_texto(archivo_pdf_orden.getvalue())
             st.text_area("Texto extraído del PDF:", texto_extraido, height=150)
     entrada = st.text_area("Resultados de exámenes:", key="examen_input")
     if st.button("Generar resumen", key="examenes"):
@@ -238,9 +191,9 @@ Eres un asistente clínico. Resume los resultados médicos ingresados por la pac
                 st.success("Resumen generado:")
                 st.markdown(resultado)
                 archivo = "Resumen_examenes.pdf"
-                descargar_pdf_button(resultado, archivo, paciente_info)
+                core.descargar_pdf_button(resultado, archivo, paciente_info)
                 if correo_paciente and st.button("📤 Enviar por correo", key="mail_exam"):
-                    enviar_por_correo(archivo, correo_paciente)
+                    core.enviar_por_correo(core.pdf_paciente(resultado, paciente_info), archivo, correo_paciente)
                 st.session_state.historial.append({
                     "nombre": nombre_paciente,
                     "rut": rut_paciente,
@@ -255,10 +208,7 @@ with tab4:
     archivo_pdf = st.file_uploader("Sube un PDF de examen o informe médico", type=["pdf"])
     if archivo_pdf:
         with st.spinner("Leyendo PDF..."):
-            doc = fitz.open(stream=archivo_pdf.read(), filetype="pdf")
-            texto = ""
-            for page in doc:
-                texto += page.get_text()
+            texto = core.extraer_texto(archivo_pdf.getvalue())
             st.session_state.pdf_texto = texto
             st.text_area("Texto extraído:", texto, height=200)
 
@@ -1,65 +1,28 @@
 import streamlit as st
-from openai import OpenAI
-from fpdf import FPDF
-import base64
-import fitz
-import re
+import importlib
+import time
 from datetime import date
-import yagmail
-import traceback
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-client = OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+inicio_rerun = time.perf_counter()
+core = importlib.import_module("001_triage_preconsulta")
 
 st.set_page_config(page_title="Asistente Ginecológico IA", page_icon="🩺")
 st.title("🩺 Asistente clínico para ginecología")
 
 # Inicialización de estado
-if "historial" not in st.session_state:
-    st.session_state.historial = []
 if "chat_pdf" not in st.session_state:
     st.session_state.chat_pdf = []
-if "pdf_texto" not in st.session_state:
-    st.session_state.pdf_texto = ""
-
-# Funciones
-def limpiar_emojis(texto):
-    return re.sub(r'[^\x00-\x7F]+', '', texto)
-
-def generar_pdf(texto, filename="documento_clinico.pdf", encabezado=None):
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    pdf.set_font("Arial", size=12)
-    if encabezado:
-        pdf.multi_cell(0, 10, encabezado)
-        pdf.ln(5)
-    for line in texto.split('\n'):
-        pdf.multi_cell(0, 10, line)
-    pdf.output(filename)
-    return filename
-
-def descargar_pdf_button(content, filename, paciente_info):
-    encabezado = f"Paciente: {paciente_info.get('nombre', '---')}\nRUT: {paciente_info.get('rut', '---')}\nFecha: {date.today().strftime('%d-%m-%Y')}"
-    texto_limpio = limpiar_emojis(content)
-    generar_pdf(texto_limpio, filename, encabezado)
-    with open(filename, "rb") as f:
-        base64_pdf = base64.b64encode(f.read()).decode('utf-8')
-        href = f'<a href="data:application/pdf;base64,{base64_pdf}" download="{filename}">📄 Descargar PDF</a>'
-        st.markdown(href, unsafe_allow_html=True)
-
-def enviar_por_correo(filename, destinatario):
-    try:
-        yag = yagmail.SMTP(user=st.secrets["EMAIL_USER"], password=st.secrets["EMAIL_PASSWORD"])
-        yag.send(
-            to=destinatario,
-            subject="Documento clínico generado",
-            contents="Adjunto encontrará el resumen generado por la consulta médica.",
-            attachments=filename
-        )
-        st.success(f"Correo enviado a {destinatario}")
-    except Exception as e:
-        st.error(f"Error al enviar correo: {e}")
-        st.exception(traceback.format_exc())
+if "pdf_hash" not in st.session_state:
+    # El texto del PDF vive en el almacén compartido; la sesión solo guarda su hash
+    st.session_state.pdf_hash = ""
+MAX_PREGUNTAS_CHAT = 50
+PACIENTES_POR_PAGINA = 20
+
+historial = core.obtener_historial()
+almacen = core.obtener_almacen_sesiones()
+almacen.tocar(core.id_sesion())
 
 # Datos del paciente
 st.sidebar.markdown("### 🧍 Datos del paciente")
@@ -68,10 +31,24 @@ rut_paciente = st.sidebar.text_input("RUT (opcional)")
 correo_paciente = st.sidebar.text_input("✉️ Correo electrónico (opcional)")
 paciente_info = {"nombre": nombre_paciente, "rut": rut_paciente, "correo": correo_paciente}
 
+stats_cache = core.obtener_cache_llm().estadisticas()
+st.sidebar.caption(f"⚡ Caché LLM: {stats_cache['aciertos']} aciertos · {stats_cache['fallos']} fallos · {stats_cache['entradas']} respuestas guardadas")
+stats_sesiones = almacen.estadisticas()
+st.sidebar.caption(f"🧠 Documentos en memoria: {stats_sesiones['documentos']} ({stats_sesiones['bytes'] / 2 ** 20:.1f} MB) · "
+                   f"{stats_sesiones['sesiones']} sesiones activas")
+
+envios = core.obtener_cola_correo().recientes(5)
+if envios:
+    iconos = {"pendiente": "⏳", "enviando": "📤", "enviado": "✅", "error": "❌"}
+    with st.sidebar.expander("📬 Envíos de correo recientes"):
+        for envio in envios:
+            detalle = f" ({envio['error']})" if envio["estado"] != "enviado" and envio["error"] else ""
+            st.markdown(f"{iconos[envio['estado']]} {envio['destinatario']} · {envio['nombre_adjunto']}{detalle}")
+
 # Historial
 st.sidebar.markdown("---")
 if nombre_paciente:
-    fichas = [f for f in st.session_state.historial if f["nombre"] == nombre_paciente]
+    fichas = historial.por_paciente(nombre_paciente)
     if fichas:
         st.sidebar.markdown(f"### 📚 Historial de {nombre_paciente}")
         for ficha in fichas[::-1]:
@@ -79,12 +56,13 @@ if nombre_paciente:
                 st.code(ficha["contenido"], language="yaml")
 
 # Tabs
-tab1, tab2, tab3, tab4 , tab5 = st.tabs([
+tab1, tab2, tab3, tab4 , tab5, tab6 = st.tabs([
     "📝 Triaje de síntomas",
     "🧾 Generador de recetas y órdenes",
     "📋 Resumen de exámenes previos",
     "💬 Chat sobre examen PDF",
-    "📊 Panel clínico"
+    "📊 Panel clínico",
+    "⚙️ Métricas LLM"
 ])
 
 # --- PESTAÑA 1 ---
@@ -96,74 +74,117 @@ with tab1:
         if not entrada.strip():
             st.warning("Por favor escribe algo.")
         else:
-            prompt = f"""
-Eres un asistente clínico. Resume los síntomas de una paciente y genera un reporte estructurado.
-
-Texto:
-\"\"\"{entrada}\"\"\"
-"""
-            with st.spinner("Procesando..."):
-                response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2
-                )
-                resultado = response.choices[0].message.content.strip()
-                st.session_state["resultado_triaje"] = resultado
-                st.success("Resumen generado:")
-                st.code(resultado, language="yaml")
-                
-                # Si ya hay diagnóstico anterior, combínalo
-                resumen_completo = resultado
-                if "dx_triaje" in st.session_state:
-                    resumen_completo += "\n\n---\n\n🩺 Diagnóstico sugerido:\n" + st.session_state["dx_triaje"]
-
-                archivo = "Resumen_triaje.pdf"
-                descargar_pdf_button(resumen_completo, archivo, paciente_info)
-
-                if correo_paciente and st.button("📤 Enviar por correo", key="mail_triaje"):
-                    enviar_por_correo(archivo, correo_paciente)
-
-                st.session_state.historial.append({
-                    "nombre": nombre_paciente,
-                    "rut": rut_paciente,
-                    "fecha": date.today().isoformat(),
-                    "tipo": "Triaje",
-                    "contenido": resultado
-                })
+            st.success("Resumen generado:")
+            borrador = st.empty()
+            respuesta = core.completar(core.prompt_triaje(entrada), contenedor=borrador.container(), formato="json",
+                                       funcion="triaje", formato_json=True)
+            resultado, datos_triaje = core.triaje_estructurado(respuesta)
+            borrador.code(resultado, language="yaml")
+            st.session_state["resultado_triaje"] = resultado
+
+            # Si ya hay diagnóstico anterior, combínalo
+            resumen_completo = resultado
+            if "dx_triaje" in st.session_state:
+                resumen_completo += "\n\n---\n\n🩺 Diagnóstico sugerido:\n" + st.session_state["dx_triaje"]
+
+            core.recordar_resultado("documento_triaje", resumen_completo, "Resumen_triaje.pdf", paciente_info)
+
+            historial.agregar({
+                "nombre": nombre_paciente,
+                "rut": rut_paciente,
+                "fecha": date.today().isoformat(),
+                "tipo": "Triaje",
+                "contenido": resultado,
+                "datos": datos_triaje
+            })
+    core.acciones_resultado("documento_triaje", correo_paciente)
 
     # Botón diagnóstico solo si existe resumen previo
     if "resultado_triaje" in st.session_state:
         st.markdown("---")
         st.markdown("### 🔍 ¿Quieres sugerir un diagnóstico clínico con códigos CIE-10?")
         if st.button("Sugerir diagnóstico clínico + CIE-10", key="cie10_triaje"):
-            with st.spinner("Generando diagnóstico sugerido..."):
-                prompt_dx = f"""
-Eres un asistente clínico que revisa un resumen de síntomas de una paciente.
-
-A partir del siguiente texto, entrega:
-- Un diagnóstico clínico sugerido
-- Los códigos CIE-10 más probables (máximo 3)
-
-Resumen clínico:
-{st.session_state['resultado_triaje']}
-"""
-                response_dx = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt_dx}],
-                    temperature=0.2
-                )
-                dx = response_dx.choices[0].message.content.strip()
-                st.session_state["dx_triaje"] = dx  # lo guardamos para PDF
-                st.success("Diagnóstico sugerido:")
-                st.markdown(dx)
-                st.session_state.historial.append({
+            st.success("Diagnóstico sugerido:")
+            borrador = st.empty()
+            respuesta = core.completar(core.prompt_diagnostico(st.session_state['resultado_triaje']),
+                                       contenedor=borrador.container(), formato="json", funcion="cie10",
+                                       formato_json=True)
+            dx, datos_dx = core.diagnostico_estructurado(respuesta)
+            borrador.code(dx, language="yaml")
+            st.session_state["dx_triaje"] = dx  # lo guardamos para PDF
+            historial.agregar({
+                "nombre": nombre_paciente,
+                "rut": rut_paciente,
+                "fecha": date.today().isoformat(),
+                "tipo": "Diagnóstico CIE-10",
+                "contenido": dx,
+                "datos": datos_dx
+            })
+
+        # Selección manual de códigos desde la tabla local, sin llamar al modelo
+        with st.expander("🏷️ Elegir códigos CIE-10 manualmente"):
+            busqueda_cie10 = st.text_input("Buscar por código o descripción (ej. N95, dismenorrea)", key="buscar_cie10")
+            seleccionados = st.session_state.get("cie10_manual", [])
+            opciones = list(dict.fromkeys(seleccionados + [c for c, _ in core.buscar_cie10(busqueda_cie10, k=15)]))
+            indice_cie10 = core.indice_cie10()
+            elegidos = st.multiselect(
+                "Códigos", opciones, key="cie10_manual",
+                format_func=lambda codigo: f"{codigo} — {indice_cie10.descripcion(codigo)}"
+            )
+            if elegidos and st.button("Guardar códigos seleccionados", key="guardar_cie10"):
+                datos_manual = {
+                    "diagnostico": "",
+                    "cie10": core.validar_codigos([{"codigo": c, "descripcion": ""} for c in elegidos])
+                }
+                historial.agregar({
                     "nombre": nombre_paciente,
                     "rut": rut_paciente,
                     "fecha": date.today().isoformat(),
                     "tipo": "Diagnóstico CIE-10",
-                    "contenido": dx
+                    "contenido": core.formatear_diagnostico(datos_manual),
+                    "datos": datos_manual
                 })
+                st.success("Códigos guardados en el historial.")
+
+    # Triaje por lote de cuestionarios de preconsulta
+    st.markdown("---")
+    with st.expander("📥 Triaje por lote (CSV o JSONL con columnas nombre, rut, texto)"):
+        archivo_lote = st.file_uploader("Cuestionarios de preconsulta", type=["csv", "jsonl"], key="lote_upload")
+        lote_dx = st.checkbox("Incluir diagnóstico sugerido + CIE-10", key="lote_dx")
+        lote_concurrencia = st.number_input("Pacientes en paralelo", min_value=1, max_value=16, value=4, key="lote_concurrencia")
+        if archivo_lote:
+            datos_lote = archivo_lote.getvalue()
+            lote = core.id_lote(datos_lote)
+            pacientes_lote = core.leer_pacientes(datos_lote, archivo_lote.name)
+            progreso_lotes = core.obtener_progreso_lotes()
+            hechos = progreso_lotes.resultados(lote)
+            st.caption(f"{len(pacientes_lote)} pacientes en el archivo · {len(hechos)} ya procesadas")
+            if st.button("Procesar lote", key="lote_procesar"):
+                barra = st.progress(len(hechos) / max(len(pacientes_lote), 1), text="Procesando lote...")
+                estado_lote = st.empty()
+                completados = len(hechos)
+                for paciente, resultado in core.procesar_lote(
+                    pacientes_lote, lote,
+                    lambda prompt, funcion: core.completar_lote(prompt, funcion=funcion, formato_json=True),
+                    progreso_lotes, historial,
+                    con_diagnostico=lote_dx, concurrencia=int(lote_concurrencia)
+                ):
+                    completados += 1
+                    if isinstance(resultado, Exception):
+                        estado_lote.markdown(f"❌ {paciente['nombre']}: {resultado}")
+                    else:
+                        estado_lote.markdown(f"✅ {paciente['nombre']}")
+                    barra.progress(completados / len(pacientes_lote), text=f"{completados}/{len(pacientes_lote)} pacientes")
+                hechos = progreso_lotes.resultados(lote)
+            # El zip se arma solo al pedirlo, no en cada rerun
+            if hechos and st.button("📦 Preparar PDFs del lote (.zip)", key="lote_preparar_zip"):
+                st.download_button(
+                    "Descargar PDFs del lote (.zip)",
+                    data=core.zip_pdfs(list(hechos.values())),
+                    file_name=core.nombre_archivo_sesion(f"Triaje_lote_{lote}.zip"),
+                    mime="application/zip",
+                    key="lote_zip"
+                )
 
 # --- PESTAÑA 2 ---
 with tab2:
@@ -173,36 +194,27 @@ with tab2:
         if not entrada.strip():
             st.warning("Por favor escribe un plan.")
         else:
-            prompt = f"""
-Eres un asistente médico. A partir del siguiente plan, genera:
-
-- Receta médica
-- Órdenes de exámenes
-- Seguimiento
-
-Texto:
-\"\"\"{entrada}\"\"\"
-"""
-            with st.spinner("Procesando..."):
-                response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2
-                )
-                resultado = response.choices[0].message.content.strip()
-                st.success("Documentos generados:")
+            st.success("Documentos generados:")
+            # Las abreviaturas conocidas se expanden localmente; solo lo no reconocido va al modelo
+            resultado, no_reconocidas = core.renderizar_plan(entrada)
+            if resultado:
                 st.markdown(resultado)
-                archivo = "Ordenes_y_recetas.pdf"
-                descargar_pdf_button(resultado, archivo, paciente_info)
-                if correo_paciente and st.button("📤 Enviar por correo", key="mail_orden"):
-                    enviar_por_correo(archivo, correo_paciente)
-                st.session_state.historial.append({
-                    "nombre": nombre_paciente,
-                    "rut": rut_paciente,
-                    "fecha": date.today().isoformat(),
-                    "tipo": "Plan",
-                    "contenido": resultado
-                })
+            if no_reconocidas:
+                if resultado:
+                    st.markdown("### ✍️ Otras indicaciones")
+                adicional = core.completar(core.prompt_ordenes("\n".join(no_reconocidas)), funcion="ordenes")
+                resultado = f"{resultado}\n\n### ✍️ Otras indicaciones\n{adicional}" if resultado else adicional
+            else:
+                st.caption("⚡ Generado localmente, sin consultar al modelo.")
+            core.recordar_resultado("documento_ordenes", resultado, "Ordenes_y_recetas.pdf", paciente_info)
+            historial.agregar({
+                "nombre": nombre_paciente,
+                "rut": rut_paciente,
+                "fecha": date.today().isoformat(),
+                "tipo": "Plan",
+                "contenido": resultado
+            })
+    core.acciones_resultado("documento_ordenes", correo_paciente)
 
 # --- PESTAÑA 3 ---
 with tab3:
@@ -210,77 +222,113 @@ with tab3:
     st.markdown("### 📎 Adjuntar examen en PDF (opcional)")
     archivos_pdf = st.file_uploader("Sube uno o más PDF de referencia clínica", type=["pdf"], accept_multiple_files=True, key="pdf_orden_upload")
     texto_extraido = ""
+    documentos = []
     if archivos_pdf:
         with st.spinner("Extrayendo texto de los PDFs..."):
+            usados = 0
             for archivo in archivos_pdf:
-                doc = fitz.open(stream=archivo.read(), filetype="pdf")
-                for page in doc:
-                    texto_extraido += page.get_text() + "\n"
+                # Tope de memoria por sesión: los archivos que no caben se omiten
+                if usados + archivo.size > almacen.max_bytes_sesion:
+                    st.warning(f"{archivo.name} se omitió: se superaría el límite de {almacen.max_bytes_sesion // 2 ** 20} MB por sesión.")
+                    continue
+                usados += archivo.size
+                datos_pdf = archivo.getvalue()
+                documentos.append((archivo.name, core.hash_contenido(datos_pdf), core.leer_pdf(datos_pdf, archivo.name)))
+            texto_extraido = "".join("\n".join(paginas) + "\n" for _, _, paginas in documentos)
         st.text_area("Texto extraído de los PDF:", texto_extraido, height=150)
     entrada = st.text_area("Resultados de exámenes:", key="examen_input")
+    if texto_extraido:
+        st.caption(f"≈ {core.contar_tokens(entrada + texto_extraido, core.MODELO)} tokens · "
+                   f"límite por consulta {core.presupuesto_tokens(core.MODELO)}")
+    # Valores de laboratorio leídos localmente de lo escrito y de los PDF; se guardan con la ficha
+    valores_lab = core.extraer_valores(entrada + "\n" + texto_extraido, date.today().isoformat())
+    if valores_lab:
+        with st.expander(f"🧪 {len(valores_lab)} valores de laboratorio detectados"):
+            st.dataframe([
+                {"analito": core.nombre_analito(v["analito"]), "resultado": v["estado"] or f"{v['valor']:g} {v['unidad']}",
+                 "fecha": v["fecha"]}
+                for v in valores_lab
+            ], use_container_width=True)
     if st.button("Generar resumen", key="examenes"):
         if not entrada.strip() and not texto_extraido.strip():
             st.warning("Por favor escribe los resultados o sube al menos un archivo.")
         else:
-            entrada_final = entrada.strip() + "\n" + texto_extraido.strip()
-            prompt = f"""Eres un asistente clínico. Resume los resultados clínicos siguientes:
-\"\"\"{entrada_final}\"\"\"
-"""
-            with st.spinner("Resumiendo..."):
-                response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2
+            # Si no cabe en un solo prompt, cada documento se resume por partes en paralelo
+            with st.spinner("Preparando los documentos..."):
+                entrada_final, resumido = core.preparar_entrada(
+                    documentos, entrada,
+                    lambda prompt, funcion: core.completar_lote(prompt, funcion=funcion)
                 )
-                resultado = response.choices[0].message.content.strip()
-                st.success("Resumen generado:")
-                st.markdown(resultado)
-                archivo = "Resumen_examenes.pdf"
-                descargar_pdf_button(resultado, archivo, paciente_info)
-                if correo_paciente and st.button("📤 Enviar por correo", key="mail_exam"):
-                    enviar_por_correo(archivo, correo_paciente)
-                st.session_state.historial.append({
-                    "nombre": nombre_paciente,
-                    "rut": rut_paciente,
-                    "fecha": date.today().isoformat(),
-                    "tipo": "Exámenes",
-                    "contenido": resultado
-                })
+            if resumido:
+                st.info("Los documentos superaban el límite del modelo: se resumieron por partes antes del resumen final.")
+            st.success("Resumen generado:")
+            resultado = core.completar(core.prompt_examenes(entrada_final), funcion="examenes")
+            core.recordar_resultado("documento_examenes", resultado, "Resumen_examenes.pdf", paciente_info)
+            historial.agregar({
+                "nombre": nombre_paciente,
+                "rut": rut_paciente,
+                "fecha": date.today().isoformat(),
+                "tipo": "Exámenes",
+                "contenido": resultado,
+                "datos": {"laboratorio": valores_lab} if valores_lab else None
+            })
+            # Vencimiento de los controles calculado localmente con las reglas de tamizaje, sin pedírselo al modelo
+            controles = historial.controles_paciente(nombre_paciente) if nombre_paciente else []
+            if controles:
+                st.markdown("#### 📅 Próximos controles")
+                for control in controles:
+                    estado = f"vencido hace {-control['dias']} días" if control["dias"] < 0 else f"vence el {control['vence']}"
+                    st.markdown(f"- {control['examen']}: último {control['ultimo']}, {estado}" + (" ⚠️ resultado alterado" if control["alterado"] else ""))
+    core.acciones_resultado("documento_examenes", correo_paciente)
 
 # --- PESTAÑA 4 ---
 with tab4:
     st.subheader("💬 Chat sobre informe en PDF")
     archivo_pdf = st.file_uploader("Sube un PDF de examen o informe médico", type=["pdf"])
     if archivo_pdf:
-        with st.spinner("Leyendo PDF..."):
-            doc = fitz.open(stream=archivo_pdf.read(), filetype="pdf")
-            texto = ""
-            for page in doc:
-                texto += page.get_text()
-            st.session_state.pdf_texto = texto
-            st.text_area("Texto extraído:", texto, height=200)
-
-    if st.session_state.pdf_texto:
-        pregunta = st.text_input("Haz una pregunta sobre el informe:")
-        if pregunta:
-            with st.spinner("Consultando el documento..."):
-                prompt_chat = f"""
-Eres un asistente clínico. A continuación tienes el texto de un informe médico.
-Responde solo en base a ese contenido.
-
-INFORME:
-{st.session_state.pdf_texto}
-
-PREGUNTA:
-{pregunta}
-"""
-                response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt_chat}],
-                    temperature=0.2
-                )
-                respuesta = response.choices[0].message.content.strip()
-                st.session_state.chat_pdf.append((pregunta, respuesta))
+        if archivo_pdf.size > almacen.max_bytes_sesion:
+            st.warning(f"El PDF supera el límite de {almacen.max_bytes_sesion // 2 ** 20} MB por sesión.")
+        else:
+            with st.spinner("Leyendo PDF..."):
+                datos_pdf = archivo_pdf.getvalue()
+                clave_pdf = core.hash_contenido(datos_pdf)
+                texto = core.texto_documento(clave_pdf)
+                guardado = texto is not None
+                if not guardado:
+                    texto = "".join(core.leer_pdf(datos_pdf, archivo_pdf.name))
+                    guardado = core.guardar_documento(clave_pdf, texto)
+                # Si el texto no cabe en la memoria de la sesión no hay informe sobre el que preguntar
+                st.session_state.pdf_hash = clave_pdf if guardado else ""
+                if not guardado:
+                    st.error(f"El texto del PDF supera el límite de {almacen.max_bytes_sesion // 2 ** 20} MB "
+                             "de memoria por sesión; no se puede usar en el chat.")
+                st.text_area("Texto extraído:", texto, height=200)
+
+    texto_pdf = core.texto_documento(st.session_state.pdf_hash) if st.session_state.pdf_hash else None
+    if st.session_state.pdf_hash and texto_pdf is None:
+        st.info("El informe se liberó de la memoria por inactividad; vuelve a subirlo para seguir preguntando.")
+        st.session_state.pdf_hash = ""
+    if texto_pdf:
+        # En un formulario la pregunta se procesa una sola vez, al enviarla, y no en cada rerun de la página
+        with st.form("chat_pdf_form", clear_on_submit=True):
+            pregunta = st.text_input("Haz una pregunta sobre el informe:", key="pregunta_pdf")
+            enviada = st.form_submit_button("Preguntar")
+        if enviada and pregunta.strip():
+            # Solo se envían los fragmentos más relevantes para la pregunta
+            indice = core.obtener_indice_pdf(st.session_state.pdf_hash, texto_pdf)
+            fragmentos = indice.buscar(pregunta, k=4) or indice.fragmentos[:4]
+            contexto = "\n[...]\n".join(fragmentos)
+            with st.chat_message("assistant"):
+                respuesta = core.completar(core.prompt_chat_pdf(contexto, pregunta), funcion="chat_pdf")
+            st.session_state.chat_pdf.append((pregunta, respuesta))
+            del st.session_state.chat_pdf[:-MAX_PREGUNTAS_CHAT]
+            historial.agregar({
+                "nombre": nombre_paciente,
+                "rut": rut_paciente,
+                "fecha": date.today().isoformat(),
+                "tipo": "Chat PDF",
+                "contenido": f"Pregunta: {pregunta}\n\n{respuesta}"
+            })
 
     for q, r in st.session_state.chat_pdf[::-1]:
         with st.expander(f"❓ {q}"):
@@ -290,55 +338,178 @@ PREGUNTA:
 with tab5:
     st.subheader("📊 Panel clínico de pacientes")
 
-    # Agrupar historial por paciente
-    pacientes = {}
-    for ficha in st.session_state.historial:
-        key = ficha['nombre']
-        if key not in pacientes:
-            pacientes[key] = []
-        pacientes[key].append(ficha)
+    # Búsqueda de texto completo en todas las fichas
+    busqueda = st.text_input("🔎 Buscar en el historial (ej. BI-RADS 3 últimos 6 meses)", key="busqueda_historial")
+    tipos_busqueda = st.multiselect("Tipos de ficha", historial.tipos(), key="busqueda_tipos")
+    if busqueda.strip():
+        resultados = historial.buscar(busqueda, tipos=tipos_busqueda)
+        st.caption(f"{len(resultados)} resultados" + (" (se muestran los 50 más relevantes)" if len(resultados) == 50 else ""))
+        for ficha in resultados:
+            st.markdown(f"- {ficha['fecha']} · **{ficha['nombre'] or '---'}** · {ficha['tipo']}  \n  {ficha['extracto']}")
 
     # Buscar paciente
-    nombres_disponibles = sorted(pacientes.keys())
+    nombres_disponibles = historial.pacientes()
     buscado = st.selectbox("Selecciona un paciente:", [""] + nombres_disponibles)
 
     if buscado:
-        fichas = pacientes[buscado]
+        fichas = historial.por_paciente(buscado)
         st.markdown(f"### 📁 Historial de {buscado}")
+        if st.button("📚 Preparar dossier clínico (PDF)", key="preparar_dossier"):
+            st.download_button(
+                "Descargar dossier clínico (PDF)",
+                data=core.generar_dossier(fichas),
+                file_name=core.nombre_archivo_sesion(core.nombre_dossier(buscado)),
+                mime="application/pdf",
+                key="dossier_paciente"
+            )
+        serie_lab = historial.laboratorio(buscado)
+        if len(serie_lab):
+            st.markdown("#### 🧪 Laboratorio")
+            ultimos = serie_lab.ultimos()
+            fuera = [u for u in ultimos if u["fuera_de_rango"]]
+            if fuera:
+                st.warning("Fuera de rango: " + ", ".join(f"{u['analito']} {u['resultado']} ({u['fecha']})" for u in fuera))
+            st.dataframe(ultimos, use_container_width=True)
+            analito = st.selectbox("Evolución de", serie_lab.analitos(), format_func=core.nombre_analito, key="lab_analito")
+            fechas_lab, valores_serie, _ = serie_lab.serie(analito)
+            if (~np.isnan(valores_serie)).sum() > 1:
+                st.line_chart({"fecha": fechas_lab, core.nombre_analito(analito): valores_serie}, x="fecha")
+            else:
+                st.caption(f"Rango de referencia: {core.rango_referencia(analito) or '---'} · se necesitan al menos dos resultados numéricos para graficar.")
         for ficha in fichas[::-1]:
             with st.expander(f"🗓️ {ficha['fecha']} - {ficha['tipo']}"):
                 st.code(ficha["contenido"], language="yaml")
     else:
         st.markdown("_Selecciona un paciente en el menú desplegable para ver su historial._")
 
-    # Reconfirmación vía WhatsApp
-    for nombre in nombres_disponibles:
-        if not nombre:
-            continue
-        fichas = pacientes[nombre]
-        ultima = fichas[-1]
+    with st.expander("🗓️ Fichas por rango de fechas"):
+        rango = st.date_input("Rango", value=(date.today(), date.today()), key="rango_fichas")
+        if len(rango) == 2:
+            for ficha in historial.por_fechas(rango[0].isoformat(), rango[1].isoformat()):
+                st.markdown(f"- {ficha['fecha']} · **{ficha['nombre'] or '---'}** · {ficha['tipo']}")
+
+    with st.expander("📦 Dossiers de las pacientes de un día"):
+        dia_dossiers = st.date_input("Día", value=date.today(), key="dia_dossiers")
+        if historial.por_fechas(dia_dossiers.isoformat(), dia_dossiers.isoformat()):
+            if st.button("Preparar dossiers del día (.zip)", key="preparar_dossiers_dia"):
+                st.download_button(
+                    "Descargar dossiers del día (.zip)",
+                    data=core.zip_dossiers_dia(historial, dia_dossiers.isoformat()),
+                    file_name=core.nombre_archivo_sesion(f"Dossiers_{dia_dossiers.isoformat()}.zip"),
+                    mime="application/zip",
+                    key="dossiers_dia"
+                )
+        else:
+            st.markdown("_No hay fichas registradas ese día._")
+
+    with st.expander("🏷️ Fichas por código CIE-10"):
+        prefijo_cie10 = st.text_input("Código o prefijo (ej. N95)", key="filtro_cie10")
+        if prefijo_cie10.strip():
+            fichas_cie10 = historial.por_cie10(prefijo_cie10.strip())
+            for ficha in fichas_cie10:
+                partes = [ficha["fecha"], f"**{ficha['nombre'] or '---'}**", ", ".join(c["codigo"] for c in ficha["datos"]["cie10"])]
+                if ficha["datos"]["diagnostico"]:
+                    partes.append(ficha["datos"]["diagnostico"])
+                st.markdown("- " + " · ".join(partes))
+            if not fichas_cie10:
+                st.markdown("_Sin fichas con ese código._")
+
+    with st.expander("⏰ Controles vencidos y próximos"):
+        dias_aviso = st.number_input("Incluir los que vencen en los próximos (días)", min_value=0, max_value=365, value=30, key="dias_controles")
+        pendientes = historial.controles_pendientes(dias=int(dias_aviso))
+        if pendientes:
+            vencidos = sum(1 for p in pendientes if p["dias"] < 0)
+            st.caption(f"{vencidos} vencidos · {len(pendientes) - vencidos} por vencer")
+            st.dataframe([
+                {"paciente": p["nombre"], "examen": p["examen"], "último": p["ultimo"], "vence": p["vence"],
+                 "estado": f"vencido ({-p['dias']} días)" if p["dias"] < 0 else f"en {p['dias']} días",
+                 "resultado alterado": "⚠️" if p["alterado"] else ""}
+                for p in pendientes
+            ], use_container_width=True)
+        else:
+            st.markdown("_No hay controles vencidos ni por vencer._")
+
+    # Reconfirmación vía WhatsApp: solo las pacientes del día elegido, por páginas
+    st.markdown("---")
+    st.markdown("### 📲 Reconfirmación de asistencia")
+    dia_reconf = st.date_input("Pacientes del día", value=date.today(), key="dia_reconf")
+    pacientes_dia = historial.pacientes(dia_reconf.isoformat())
+    paginas_reconf = max(1, -(-len(pacientes_dia) // PACIENTES_POR_PAGINA))
+    pagina_reconf = st.number_input(f"Página (de {paginas_reconf})", min_value=1, max_value=paginas_reconf, value=1, key="pagina_reconf")
+    inicio_pagina = (int(pagina_reconf) - 1) * PACIENTES_POR_PAGINA
+    st.caption(f"{len(pacientes_dia)} pacientes con fichas el {dia_reconf.isoformat()}")
+    reutilizar_mensajes = st.checkbox("Reutilizar mensajes de reconfirmación ya generados (caché)", value=False, key="cache_reconf")
+    for nombre in pacientes_dia[inicio_pagina:inicio_pagina + PACIENTES_POR_PAGINA]:
         st.markdown(f"#### 📌 Reconfirmar asistencia de {nombre}")
         numero_wsp = st.text_input(f"📱 WhatsApp (formato 569...) - {nombre}", key=f"wsp_{nombre}")
-        if st.button(f"🔁 Generar mensaje reconfirmación ({nombre})"):
-            with st.spinner("Generando mensaje personalizado..."):
-                prompt_reconf = f"""
-Eres una asistente médica. A partir de esta ficha clínica, redacta un mensaje breve y cálido para reconfirmar la consulta agendada para hoy. Incluye:
-- Nombre de la paciente
-- Motivo clínico reciente
-- Solicita confirmación con tono humano, cordial y profesional.
-
-Ficha clínica:
-{ultima['contenido']}
-"""
-                response = client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt_reconf}],
-                    temperature=0.7
-                )
-                mensaje = response.choices[0].message.content.strip()
-                st.text_area("📨 Mensaje personalizado", mensaje, height=100, key=f"mensaje_{nombre}")
+        if st.button(f"🔁 Generar mensaje reconfirmación ({nombre})", key=f"reconf_{nombre}"):
+            # Con un triaje estructurado el mensaje se arma localmente, sin llamar al modelo
+            triaje = historial.ultima(nombre, tipo="Triaje")
+            mensaje = core.mensaje_reconfirmacion_local(nombre, triaje and triaje["datos"])
+            if mensaje is None:
+                prompt_reconf = core.prompt_reconfirmacion(historial.ultima(nombre))
+                borrador = st.empty()
+                mensaje = core.completar(prompt_reconf, temperature=0.7, contenedor=borrador.container(), usar_cache=reutilizar_mensajes, funcion="reconfirmacion")
+                borrador.empty()
+            st.text_area("📨 Mensaje personalizado", mensaje, height=100, key=f"mensaje_{nombre}")
+            if numero_wsp:
+                url = core.enlace_whatsapp(numero_wsp, mensaje)
+                st.markdown(f"[📤 Enviar por WhatsApp]({url})", unsafe_allow_html=True)
+
+    # Reconfirmación en lote de todas las pacientes del día elegido (no de todo el historial)
+    pendientes = pacientes_dia
+    if pendientes:
+        st.markdown("---")
+        st.markdown(f"### 🔁 Reconfirmar a todas las pacientes del {dia_reconf.isoformat()}")
+        concurrencia = st.number_input("Solicitudes simultáneas", min_value=1, max_value=16, value=4, key="reconf_concurrencia")
+        if st.button("Generar todos los mensajes", key="reconf_todos"):
+            progreso = st.progress(0.0, text="Generando mensajes...")
+            estado = st.empty()
+            mensajes = {}
+            por_modelo = []
+            for n in pendientes:
+                triaje = historial.ultima(n, tipo="Triaje")
+                mensajes[n] = core.mensaje_reconfirmacion_local(n, triaje and triaje["datos"])
+                if mensajes[n] is None:
+                    por_modelo.append(n)
+            with ThreadPoolExecutor(max_workers=int(concurrencia)) as pool:
+                futuros = {
+                    pool.submit(core.completar_lote, core.prompt_reconfirmacion(historial.ultima(n)), 0.7, reutilizar_mensajes, "reconfirmacion"): n
+                    for n in por_modelo
+                }
+                for i, futuro in enumerate(as_completed(futuros), start=len(pendientes) - len(por_modelo) + 1):
+                    n = futuros[futuro]
+                    try:
+                        mensajes[n] = futuro.result()
+                        estado.markdown(f"✅ {n}")
+                    except Exception as e:
+                        mensajes[n] = None
+                        estado.markdown(f"❌ {n}: {e}")
+                    progreso.progress(i / len(pendientes), text=f"{i}/{len(pendientes)} mensajes")
+            st.session_state["reconf_lote"] = mensajes
+
+        for n, mensaje in st.session_state.get("reconf_lote", {}).items():
+            with st.expander(f"📨 {n}", expanded=True):
+                if mensaje is None:
+                    st.error("No se pudo generar el mensaje.")
+                    continue
+                st.text_area("Mensaje", mensaje, height=100, key=f"mensaje_lote_{n}")
+                numero_wsp = st.session_state.get(f"wsp_{n}")
                 if numero_wsp:
-                    import urllib.parse
-                    mensaje_encoded = urllib.parse.quote(mensaje)
-                    url = f"https://wa.me/{numero_wsp}?text={mensaje_encoded}"
-                    st.markdown(f"[📤 Enviar por WhatsApp]({url})", unsafe_allow_html=True)
\ No newline at end of file
+                    st.markdown(f"[📤 Enviar por WhatsApp]({core.enlace_whatsapp(numero_wsp, mensaje)})", unsafe_allow_html=True)
+                else:
+                    st.caption("Sin número de WhatsApp registrado.")
+
+# --- PESTAÑA 6: Métricas ---
+with tab6:
+    st.subheader("⚙️ Latencia, tokens y costo por función")
+    periodo = st.selectbox("Periodo", ["Últimas 24 horas", "Últimos 7 días", "Todo"], key="metricas_periodo")
+    desde = {"Últimas 24 horas": time.time() - 86400, "Últimos 7 días": time.time() - 7 * 86400, "Todo": None}[periodo]
+    resumen_metricas = core.obtener_metricas().resumen(desde)
+    if resumen_metricas:
+        st.dataframe(resumen_metricas, use_container_width=True)
+        st.metric("Costo total estimado (USD)", f"{sum(r['costo_usd'] for r in resumen_metricas):.4f}")
+    else:
+        st.markdown("_Aún no hay llamadas registradas._")
+
+st.sidebar.caption(f"⏱️ Tiempo de ejecución de la página: {(time.perf_counter() - inicio_rerun) * 1000:.0f} ms")
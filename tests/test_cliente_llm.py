@@ -0,0 +1,38 @@
+import importlib
+
+cache_llm = importlib.import_module("001_triage_preconsulta.cache_llm")
+cliente_llm = importlib.import_module("001_triage_preconsulta.cliente_llm")
+
+
+class _Gateway:
+    modelo = "gpt-4o"
+
+    def __init__(self):
+        self.llamadas = []
+
+    def completar(self, prompt, temperature, prioridad=None, funcion=None, formato_json=False):
+        self.llamadas.append(formato_json)
+        return '{"nivel": "C3"}' if formato_json else "Nivel C3"
+
+
+class _Metricas:
+    def registrar(self, *args, **kwargs):
+        pass
+
+
+def test_clave_distingue_formato_json():
+    assert cache_llm.CacheLLM.clave("gpt-4o", 0.2, "p") != cache_llm.CacheLLM.clave("gpt-4o", 0.2, "p", True)
+    assert cache_llm.CacheLLM.clave("gpt-4o", 0.2, "p") == cache_llm.CacheLLM.clave("gpt-4o", 0.2, "p", False)
+
+
+def test_json_y_texto_libre_no_comparten_entrada(tmp_path):
+    cache = cache_llm.CacheLLM(str(tmp_path / "cache.db"))
+    gateway = _Gateway()
+    cliente = cliente_llm.ClienteLLM(cache, gateway, _Metricas())
+    try:
+        assert cliente.completar("triaje") == "Nivel C3"
+        assert cliente.completar("triaje", formato_json=True) == '{"nivel": "C3"}'
+        assert cliente.completar("triaje", formato_json=True) == '{"nivel": "C3"}'
+        assert gateway.llamadas == [False, True]
+    finally:
+        cache.cerrar()
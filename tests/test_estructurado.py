@@ -0,0 +1,26 @@
+import importlib
+
+estructurado = importlib.import_module("001_triage_preconsulta.estructurado")
+
+
+def test_escalares_donde_se_esperaba_una_lista():
+    datos = estructurado.parsear_triaje('{"edad": "34 años", "sintomas": 3, "antecedentes": true, "preguntas": null}')
+    assert datos["edad"] == 34
+    assert datos["sintomas"] == ["3"]
+    assert datos["antecedentes"] == ["True"]
+    assert datos["preguntas"] == []
+
+
+def test_un_solo_codigo_cie10_como_objeto():
+    datos = estructurado.parsear_diagnostico('{"diagnostico": "Dismenorrea", "cie10": {"codigo": "N94.6", "descripcion": "Dismenorrea"}}')
+    assert [c["codigo"] for c in datos["cie10"]] == ["N94.6"]
+
+
+def test_respuesta_sin_json_se_conserva():
+    assert estructurado.triaje_estructurado("sin datos") == ("sin datos", None)
+
+
+def test_copia_independiente_de_la_cache():
+    texto = '{"sintomas": ["dolor"]}'
+    estructurado.parsear_triaje(texto)["sintomas"].append("otro")
+    assert estructurado.parsear_triaje(texto)["sintomas"] == ["dolor"]
@@ -0,0 +1,71 @@
+import importlib
+
+import pytest
+
+laboratorio = importlib.import_module("001_triage_preconsulta.laboratorio")
+
+HOY = "2026-10-18"
+
+
+def _leidos(texto):
+    return [(v["analito"], v["valor"], v["estado"]) for v in laboratorio.extraer_valores(texto, HOY)]
+
+
+@pytest.mark.parametrize("texto", [
+    "Glicemia 2021",
+    "PAP 2030",
+    "Hemoglobina hace 2 meses",
+])
+def test_plazos_y_anios_no_son_resultados(texto):
+    assert _leidos(texto) == []
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Último PAP hace 3 años, mamografía hace 2 años",
+     [("pap", None, "realizado", "2023-10-18"), ("mamografia", None, "realizado", "2024-10-18")]),
+    ("Mamografía de hace 18 meses", [("mamografia", None, "realizado", "2025-04-18")]),
+    ("Densitometría hace un año: osteopenia", [("dmo", None, "osteopenia", "2025-10-18")]),
+    ("PAP del 02/01/2025 alterado", [("pap", None, "alterado", "2025-01-02")]),
+    ("PAP 2023 normal", [("pap", None, "normal", "2023-01-01")]),
+    ("DMO en 2021", [("dmo", None, "realizado", "2021-01-01")]),
+])
+def test_tamizaje_con_fecha_se_registra_en_el_pasado(texto, esperado):
+    valores = laboratorio.extraer_valores(texto, HOY)
+    assert [(v["analito"], v["valor"], v["estado"], v["fecha"]) for v in valores] == esperado
+
+
+def test_examenes_de_tamizaje_solo_con_resultado_cualitativo():
+    assert _leidos("PAP normal. Mamografía BI-RADS 2. DMO osteopenia, T-score -1,8") == [
+        ("pap", None, "normal"),
+        ("birads", 2.0, None),
+        ("dmo", None, "osteopenia"),
+        ("dmo_tscore", -1.8, None),
+    ]
+
+
+def test_valor_seguido_de_plazo_se_descarta():
+    assert _leidos("TSH 2,1 mUI/L. Hemoglobina hace 2 meses") == [("tsh", 2.1, None)]
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Hemoglobina 12,5 g/dL, ferritina 9 ng/mL", [("hemoglobina", 12.5, None), ("ferritina", 9.0, None)]),
+    ("Colesterol 230", [("colesterol_total", 230.0, None)]),
+    ("Leucocitos 2000", [("leucocitos", 2000.0, None)]),
+    ("Plaquetas 250.000", [("plaquetas", 250000.0, None)]),
+])
+def test_valores_cuantitativos(texto, esperado):
+    assert _leidos(texto) == esperado
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("Triglicéridos 150 mg/dL hace 2 meses", [("trigliceridos", 150.0, "2026-08-18")]),
+    ("Ferritina 9 ng/mL (2024), TSH 2,1", [("ferritina", 9.0, "2024-01-01"), ("tsh", 2.1, HOY)]),
+])
+def test_fecha_escrita_tras_el_valor(texto, esperado):
+    valores = laboratorio.extraer_valores(texto, HOY)
+    assert [(v["analito"], v["valor"], v["fecha"]) for v in valores] == esperado
+
+
+def test_fecha_del_informe():
+    valores = laboratorio.extraer_valores("Informe del 03/02/2025\nFerritina 9 ng/mL", HOY)
+    assert [v["fecha"] for v in valores] == ["2025-02-03"]
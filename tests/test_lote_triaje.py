@@ -0,0 +1,24 @@
+import importlib
+
+lote_triaje = importlib.import_module("001_triage_preconsulta.lote_triaje")
+
+
+def test_jsonl_con_valores_no_textuales():
+    datos = "\n".join([
+        '{"nombre": "Ana", "rut": 12345678, "texto": 123}',
+        '{"nombre": null, "texto": "Dolor pélvico"}',
+        '["no", "es", "un", "objeto"]',
+        '{"nombre": "Sin texto", "texto": null}',
+        '',
+    ]).encode()
+    assert lote_triaje.leer_pacientes(datos, "entradas.jsonl") == [
+        {"nombre": "Ana", "rut": "12345678", "texto": "123"},
+        {"nombre": "", "rut": "", "texto": "Dolor pélvico"},
+    ]
+
+
+def test_csv_con_columnas_faltantes():
+    datos = "﻿nombre,texto\nAna, Dolor pélvico \nBerta,\nCarla\n".encode()
+    assert lote_triaje.leer_pacientes(datos, "entradas.csv") == [
+        {"nombre": "Ana", "rut": "", "texto": "Dolor pélvico"},
+    ]
@@ -0,0 +1,58 @@
+import importlib
+
+import pytest
+
+ordenes = importlib.import_module("001_triage_preconsulta.ordenes")
+
+
+@pytest.mark.parametrize("plan, pendiente", [
+    ("progendo 200 / mamo", "progendo 200"),
+    ("metformina 850", "metformina 850"),
+    ("acido folico 5", "acido folico 5"),
+    ("metformina 850 mg 1", "metformina 850 mg 1"),
+    ("lenzetto 2", "lenzetto 2"),
+    ("metformina 850 mg 10 comprimidos", "metformina 850 mg 10 comprimidos"),
+])
+def test_numero_ambiguo_queda_para_el_modelo(plan, pendiente):
+    documento, pendientes = ordenes.renderizar_plan(plan)
+    assert pendientes == (pendiente,)
+    assert "Receta" not in documento
+
+
+def test_numero_ambiguo_no_impide_el_resto_del_plan():
+    documento, _ = ordenes.renderizar_plan("progendo 200 / mamo")
+    assert documento == "### 🧪 Órdenes de exámenes\n- Mamografía bilateral"
+
+
+@pytest.mark.parametrize("plan, receta", [
+    ("progendo 200 mg 1 capsula en la noche",
+     "**Progesterona micronizada 200 mg, cápsulas (Progendo)** — 1 cápsula en la noche, vía oral."),
+    ("metformina 850 mg 1 comprimido cada 12 horas",
+     "**Metformina 850 mg, comprimidos** — 1 comprimido cada 12 horas, vía oral."),
+    ("oestrogel 1,5% 2 pulsaciones al dia", "**Estradiol gel 1,5% (Oestrogel)** — 2 pulsaciones al día, vía transdérmica."),
+    ("tibolona 2,5 mg 1/2",
+     "**Tibolona 2,5 mg, comprimidos** — ½ comprimido, frecuencia según indicación médica, vía oral."),
+    ("duphaston 10 mg dos",
+     "**Didrogesterona 10 mg, comprimidos (Duphaston)** — 2 comprimidos, frecuencia según indicación médica, vía oral."),
+])
+def test_receta_con_cantidad_y_frecuencia_explicitas(plan, receta):
+    documento, pendientes = ordenes.renderizar_plan(plan)
+    assert pendientes == ()
+    assert documento == f"### 📄 Receta médica\n- {receta}"
+
+
+def test_sin_concentracion_se_avisa_y_no_se_supone_dosis():
+    documento, _ = ordenes.renderizar_plan("inicio metformina")
+    assert "Metformina ____ mg" in documento
+    assert "dosis según indicación médica, frecuencia según indicación médica" in documento
+    assert "Concentración no indicada" in documento
+
+
+def test_examenes_y_control():
+    documento, pendientes = ordenes.renderizar_plan("Mamo - eco / Dmo / Control en 3 meses con exs")
+    assert pendientes == ()
+    assert documento == (
+        "### 🧪 Órdenes de exámenes\n- Mamografía bilateral\n- Ecografía mamaria bilateral\n"
+        "- Densitometría ósea (DMO) de columna lumbar y cadera\n\n"
+        "### 📅 Seguimiento\n- Control en 3 meses con resultados de exámenes."
+    )
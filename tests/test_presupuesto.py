@@ -0,0 +1,43 @@
+import importlib
+
+presupuesto = importlib.import_module("001_triage_preconsulta.presupuesto")
+
+MODELO = "gpt-4"
+LIMITE = presupuesto.presupuesto_tokens(MODELO)
+
+
+def _documento(paginas, palabras_por_pagina=1500):
+    return [" ".join(f"hemoglobina{i}-{j}" for j in range(palabras_por_pagina)) for i in range(paginas)]
+
+
+def test_resumenes_que_no_se_acortan_se_recortan_al_presupuesto(tmp_path):
+    def completar(prompt, funcion):
+        # Un modelo que devuelve resúmenes más largos que el límite
+        return "ferritina baja " * LIMITE
+
+    entrada, resumido = presupuesto.preparar_entrada(
+        [("informe.pdf", "clave", _documento(12))], "", completar, MODELO, cache_dir=str(tmp_path)
+    )
+    assert resumido
+    assert presupuesto.contar_tokens(entrada, MODELO) <= LIMITE
+    assert entrada.endswith(presupuesto.TRUNCADO)
+
+
+def test_resumenes_cortos_se_combinan_sin_recorte(tmp_path):
+    def completar(prompt, funcion):
+        return "Hemoglobina 12,5 g/dL; ferritina 9 ng/mL."
+
+    entrada, resumido = presupuesto.preparar_entrada(
+        [("a.pdf", "a", _documento(12)), ("b.pdf", "b", _documento(12))], "TSH 2,1", completar, MODELO,
+        cache_dir=str(tmp_path),
+    )
+    assert resumido
+    assert presupuesto.TRUNCADO not in entrada
+    assert entrada.startswith("TSH 2,1\n\n[a.pdf]\n")
+
+
+def test_todo_cabe_sin_resumir(tmp_path):
+    entrada, resumido = presupuesto.preparar_entrada(
+        [("a.pdf", "a", ["Ferritina 9 ng/mL"])], "TSH 2,1", lambda p, f: "", MODELO, cache_dir=str(tmp_path)
+    )
+    assert (entrada, resumido) == ("TSH 2,1\nFerritina 9 ng/mL", False)
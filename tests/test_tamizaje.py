@@ -0,0 +1,70 @@
+import importlib
+from datetime import date
+
+laboratorio = importlib.import_module("001_triage_preconsulta.laboratorio")
+tamizaje = importlib.import_module("001_triage_preconsulta.tamizaje")
+historial_db = importlib.import_module("001_triage_preconsulta.historial_db")
+
+HOY = date(2026, 10, 18)
+
+
+def _agenda(*fichas):
+    agenda = tamizaje.AgendaTamizaje()
+    for nombre, texto, fecha in fichas:
+        for v in laboratorio.extraer_valores(texto, fecha):
+            agenda.registrar(nombre, v["fecha"], v["analito"], v["valor"], v["unidad"], v["estado"])
+    return agenda
+
+
+def _resumen(pendientes):
+    return [(p["nombre"], p["examen"], p["ultimo"], p["vence"], p["dias"]) for p in pendientes]
+
+
+def test_pap_atrasado_no_figura_como_recien_hecho():
+    agenda = _agenda(("Ana", "Último PAP hace 4 años", HOY.isoformat()))
+    assert _resumen(agenda.pendientes(HOY)) == [("Ana", "Papanicolaou (PAP)", "2022-10-18", "2025-10-18", -365)]
+
+
+def test_plazos_en_meses_y_semanas():
+    agenda = _agenda(("Ana", "Mamografía hace 18 meses, PAP hace 2 semanas", HOY.isoformat()))
+    assert _resumen(agenda.pendientes(HOY)) == [("Ana", "Mamografía", "2025-04-18", "2026-04-18", -183)]
+
+
+def test_mencion_sin_resultado_ni_fecha_no_cuenta_como_examen():
+    agenda = _agenda(("Ana", "Se solicita PAP y mamografía", HOY.isoformat()))
+    assert agenda.pendientes(HOY, dias=10000) == []
+    assert agenda.de_paciente("Ana", HOY) == []
+
+
+def test_resultado_alterado_adelanta_el_control():
+    agenda = _agenda(("Ana", "PAP alterado", "2026-03-01"), ("Berta", "PAP normal", "2026-03-01"))
+    assert _resumen(agenda.pendientes(HOY)) == [("Ana", "Papanicolaou (PAP)", "2026-03-01", "2026-09-01", -47)]
+
+
+def test_ventana_y_orden_de_vencimientos():
+    agenda = _agenda(
+        ("Carla", "PAP normal", "2023-11-10"),
+        ("Ana", "PAP del 01/06/2023: normal", HOY.isoformat()),
+        ("Berta", "Mamografía hace un año", HOY.isoformat()),
+    )
+    assert [p["nombre"] for p in agenda.pendientes(HOY, dias=0)] == ["Ana", "Berta"]
+    assert [p["nombre"] for p in agenda.pendientes(HOY, dias=30)] == ["Ana", "Berta", "Carla"]
+
+
+def test_examen_nuevo_reemplaza_al_anterior():
+    agenda = _agenda(("Ana", "PAP hace 4 años", HOY.isoformat()), ("Ana", "PAP normal", "2026-10-01"))
+    assert agenda.pendientes(HOY) == []
+    # Un informe más antiguo que llega después no deshace el control al día
+    agenda = _agenda(("Ana", "PAP normal", "2026-10-01"), ("Ana", "PAP hace 4 años", HOY.isoformat()))
+    assert agenda.pendientes(HOY) == []
+
+
+def test_historial_controles_pendientes(tmp_path):
+    historial = historial_db.HistorialDB(str(tmp_path / "historial.db"))
+    historial.controles_pendientes(HOY)
+    valores = laboratorio.extraer_valores("Último PAP hace 3 años, mamografía hace 2 años", HOY.isoformat())
+    historial.agregar({"nombre": "Ana", "fecha": HOY.isoformat(), "tipo": "examenes", "contenido": "",
+                       "datos": {"laboratorio": valores}})
+    assert [(p["examen"], p["vence"]) for p in historial.controles_pendientes(HOY)] == [
+        ("Mamografía", "2025-10-18"), ("Papanicolaou (PAP)", "2026-10-18"),
+    ]